@@ -0,0 +1,119 @@
+"""
+Adaptive micro-batching of single-point prediction requests.
+
+Concurrent calls to /predict/trafficCongestion and /predict/weatherPred each pay the
+fixed per-call cost of feature encoding and model predict. MicroBatcher collects
+single requests for a few milliseconds (or until `max_batch_size` items are waiting),
+runs one batch prediction for the group and hands every caller its own row.
+
+The wait is adaptive: while requests arrive one at a time the batcher dispatches
+immediately, so an idle server adds no latency. Once a batch collects more than one
+request (i.e. calls are overlapping) the next batches wait up to `max_wait_seconds`
+for company.
+
+A batch runs through the endpoint's limiter as one call standing for all of its
+requests (EndpointLimiter.run_batch), so requests held here count as waiting towards
+the endpoint's `max_queue` until their batch runs.
+"""
+
+import asyncio
+import time
+
+
+class MicroBatcher:
+    """
+    Groups concurrent single predictions into batch predictions.
+    """
+
+    def __init__(self, predict_many, limiter, max_batch_size: int, max_wait_seconds: float):
+        """
+        Args:
+            predict_many: Blocking function taking a list of inputs and returning one
+                result row per input, in order.
+            limiter (EndpointLimiter): Runs `predict_many` off the event loop.
+            max_batch_size (int): Maximum number of requests per batch.
+            max_wait_seconds (float): Maximum time a request waits for a batch to fill.
+        """
+        self.predict_many = predict_many
+        self.limiter = limiter
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_seconds
+
+        self._queue = None
+        self._worker = None
+        self._busy = False
+
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, item):
+        """
+        Queue one input and wait for its prediction row.
+        """
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._collect())
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _collect(self):
+        """
+        Form batches from the queue and dispatch them without waiting for the results.
+        """
+        while True:
+            batch = [await self._queue.get()]
+            deadline = time.perf_counter() + (self.max_wait_seconds if self._busy else 0.0)
+
+            while len(batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            self._busy = len(batch) > 1
+            self.batches += 1
+            self.items += len(batch)
+            asyncio.get_running_loop().create_task(self._dispatch(batch))
+
+    async def _dispatch(self, batch):
+        """
+        Run one batch and resolve every caller's future with its own row.
+        """
+        items = [item for item, _ in batch]
+        try:
+            results = await self.limiter.run_batch(len(items), self.predict_many, items)
+        except Exception:
+            # Isolate the failing input(s): retry every request on its own.
+            for item, future in batch:
+                try:
+                    result = await self.limiter.run(self.predict_many, [item])
+                    self._resolve(future, result[0])
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            self._resolve(future, result)
+
+    @staticmethod
+    def _resolve(future, result):
+        if not future.done():
+            future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_seconds": self.max_wait_seconds,
+        }
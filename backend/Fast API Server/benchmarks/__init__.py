@@ -0,0 +1,3 @@
+"""
+Benchmark suite for the FastAPI server; see run.py.
+"""
@@ -0,0 +1,272 @@
+"""
+Benchmark cases: ModelHost methods (in process) and HTTP endpoints (against a server
+subprocess). Each generator yields (name, group, params, run) where `run()` returns a
+summary from measure.py.
+
+Inputs are drawn from a seeded generator, so every run measures the same requests.
+"""
+
+import numpy as np
+import pandas as pd
+import requests
+
+from benchmarks.measure import time_calls, time_concurrent
+
+BATCH_SIZES = (1, 16, 128, 1024)
+ROUTE_LENGTHS = (4, 16, 64)
+SITE_COUNTS = (100, 1000, 10000)
+HTTP_CONCURRENCY = (1, 16)
+HTTP_BATCH_SIZES = (16, 256)
+HEATMAP_GRID_SIZES = (64, 256)
+
+# Bounding box of the bundled traffic and weather sites (Dublin area).
+LAT_RANGE = (53.20, 53.50)
+LON_RANGE = (-6.45, -6.05)
+
+
+def random_points(rng: np.random.Generator, n: int) -> list:
+    """
+    Prediction requests at random places and times inside the site bounding box.
+    """
+    return [
+        {
+            "latitude": float(lat), "longitude": float(lon),
+            "hour": int(hour), "month": int(month), "day": int(day),
+        }
+        for lat, lon, hour, month, day in zip(
+            rng.uniform(*LAT_RANGE, n), rng.uniform(*LON_RANGE, n),
+            rng.integers(0, 24, n), rng.integers(1, 13, n), rng.integers(1, 29, n),
+        )
+    ]
+
+
+def cycle(items):
+    """
+    Function returning the next element of `items` on every call (wrapping around).
+    """
+    position = [0]
+
+    def next_item():
+        item = items[position[0] % len(items)]
+        position[0] += 1
+        return item
+    return next_item
+
+
+def synthetic_route(model_host, route_cls, stop_cls, length: int):
+    """
+    A route with `length` stops taken from the known places (repeating if needed).
+    """
+    places = list(model_host.route_index.places.items())
+    stops = tuple(
+        stop_cls(place, "07:00", lat, lon)
+        for place, (lat, lon) in (places[i % len(places)] for i in range(length))
+    )
+    return route_cls(f"BENCH-{length}", f"Benchmark {length}", "Dublin", "Monday", length * 3, stops)
+
+
+def model_host_cases(server, min_seconds: float, seed: int = 0):
+    """
+    Cases calling ModelHost methods directly.
+
+    Args:
+        server: The imported server module (its `model_host` is benchmarked).
+        min_seconds (float): Minimum time spent timing each case.
+    """
+    from route_index import RouteRecord, RouteStop
+    from route_optimizer import plan_route
+    from spatial_index import SpatialIndex
+
+    host = server.model_host
+    rng = np.random.default_rng(seed)
+    points = random_points(rng, 4096)
+    next_point = cycle(points)
+
+    def timed(fn, **kwargs):
+        return lambda: time_calls(fn, min_seconds, **kwargs)
+
+    yield ("model_host.predict_traffic_congestion", "model_host", {},
+           timed(lambda: host.predict_traffic_congestion(next_point())))
+    yield ("model_host.predict_weather", "model_host", {},
+           timed(lambda: host.predict_weather(next_point())))
+    for hours in (24, 72):
+        def forecast(hours=hours):
+            point = next_point()
+            return host.get_weather_forecast(point["latitude"], point["longitude"], hours=hours)
+        yield (f"model_host.get_weather_forecast[hours={hours}]", "model_host", {"hours": hours},
+               timed(forecast, items_per_call=hours))
+
+    for size in BATCH_SIZES:
+        batch = points[:size]
+        params = {"batch": size}
+        yield (f"model_host.predict_traffic_congestion_batch[batch={size}]", "model_host", params,
+               timed(lambda batch=batch: host.predict_traffic_congestion_batch(batch), items_per_call=size))
+        yield (f"model_host.predict_traffic_congestion_batch_live[batch={size}]", "model_host", params,
+               timed(lambda batch=batch: host.predict_traffic_congestion_batch_live(batch), items_per_call=size))
+        yield (f"model_host.predict_weather_batch[batch={size}]", "model_host", params,
+               timed(lambda batch=batch: host.predict_weather_batch(batch), items_per_call=size))
+
+    # The same batches through an in-process prediction cache (warm after the first call).
+    from prediction_cache import PredictionCache
+    prediction_cache = PredictionCache(max_size=1 << 20, ttl_seconds=3600)
+
+    def cached(fn):
+        def call():
+            host.prediction_cache = prediction_cache
+            try:
+                return fn()
+            finally:
+                host.prediction_cache = None
+        return call
+
+    for size in BATCH_SIZES:
+        batch = points[:size]
+        params = {"batch": size}
+        yield (f"model_host.predict_traffic_congestion_batch_live[batch={size},prediction_cache]", "model_host",
+               params, timed(cached(lambda batch=batch: host.predict_traffic_congestion_batch_live(batch)),
+                             items_per_call=size))
+        yield (f"model_host.predict_weather_batch[batch={size},prediction_cache]", "model_host", params,
+               timed(cached(lambda batch=batch: host.predict_weather_batch(batch)), items_per_call=size))
+
+    for n_sites in SITE_COUNTS:
+        sites = pd.DataFrame({"Lat": rng.uniform(*LAT_RANGE, n_sites), "Long": rng.uniform(*LON_RANGE, n_sites)})
+        index = SpatialIndex(sites)
+        query_lats, query_lons = rng.uniform(*LAT_RANGE, 256), rng.uniform(*LON_RANGE, 256)
+        params = {"sites": n_sites, "queries": 256}
+        yield (f"spatial_index.nearest_many[sites={n_sites}]", "spatial_index", params,
+               timed(lambda index=index: index.nearest_many(query_lats, query_lons), items_per_call=256))
+        yield (f"spatial_index.query_k5[sites={n_sites}]", "spatial_index", params,
+               timed(lambda index=index: index.query(query_lats, query_lons, k=5), items_per_call=256))
+
+    bbox = f"{LAT_RANGE[0]},{LON_RANGE[0]},{LAT_RANGE[1]},{LON_RANGE[1]}"
+    yield ("model_host.get_congestion_heatmap[sites,uncached]", "model_host", {},
+           timed(lambda: host.get_congestion_heatmap(8, 5, 3), setup=host.heatmap_cache.clear))
+    for cells in HEATMAP_GRID_SIZES:
+        yield (f"model_host.get_congestion_heatmap[grid={cells},uncached]", "model_host", {"cells": cells * cells},
+               timed(lambda cells=cells: host.get_congestion_heatmap(8, 5, 3, bbox, cells, cells),
+                     setup=host.heatmap_cache.clear, items_per_call=cells * cells, max_calls=50))
+
+    next_month = cycle(list(range(1, 13)))
+    yield ("model_host.get_recommendations[default_total]", "model_host", {},
+           timed(lambda: host.get_recommendations(next_month())))
+    yield ("model_host.get_recommendations[total=1000]", "model_host", {},
+           timed(lambda: host.get_recommendations(next_month(), 1000)))
+    # Totals 500-900 x 4 growth scenarios x 5 seeds x 12 months, in one call.
+    scenario_growth = [{}, {"Dublin Bus": 0.05}, {"Dublin Bus": 0.1, "Cork city": 0.05}, {"Galway city": -0.1}]
+    scenario_seeds = [None, 1, 2, 3, 4]
+    scenario_totals = list(range(500, 901))
+    yield ("model_host.get_fleet_scenarios[totals=401,growth=4,seeds=5]", "model_host",
+           {"scenarios": len(scenario_totals) * len(scenario_growth) * len(scenario_seeds)},
+           timed(lambda: host.get_fleet_scenarios(scenario_totals, scenario_seeds, scenario_growth),
+                 items_per_call=len(scenario_totals) * len(scenario_growth) * len(scenario_seeds) * 12,
+                 max_calls=50))
+    yield ("model_host.get_fleet_size[llm_cached]", "model_host", {},
+           timed(lambda: host.get_fleet_size({"month": next_month()}), warmup=12))
+    yield ("model_host.get_fleet_size[llm_cold]", "model_host", {},
+           timed(lambda: host.get_fleet_size({"month": next_month()}), setup=host.llm_cache.clear,
+                 max_calls=20, warmup=1))
+
+    for length in ROUTE_LENGTHS:
+        route = synthetic_route(host, RouteRecord, RouteStop, length)
+        params = {"stops": length}
+        yield (f"model_host.route_schedule[stops={length}]", "model_host", params,
+               timed(lambda route=route: host.route_schedule(route), items_per_call=length))
+        yield (f"model_host.collect_route_data[stops={length},aqi_cached]", "model_host", params,
+               timed(lambda route=route: host.collect_route_data(route), items_per_call=length))
+        yield (f"model_host.collect_route_data[stops={length},aqi_cold]", "model_host", params,
+               timed(lambda route=route: host.collect_route_data(route), setup=host.aqi_cache.clear,
+                     items_per_call=length, max_calls=50, warmup=1))
+
+        stops = [stop for stop in route.stops if stop.lat is not None]
+        congestion, aqi = rng.uniform(0, 3, len(stops)), rng.integers(1, 6, len(stops))
+        yield (f"route_optimizer.plan_route[stops={length}]", "route_optimizer", params,
+               timed(lambda stops=stops, congestion=congestion, aqi=aqi: plan_route(
+                   [stop.lat for stop in stops], [stop.lon for stop in stops], congestion, aqi),
+                   items_per_call=length))
+
+    route_ids = sorted(host.route_index.routes)
+    next_route = cycle(route_ids)
+    yield ("model_host.get_trash_pickup_recommendation[cached]", "model_host", {"routes": len(route_ids)},
+           timed(lambda: host.get_trash_pickup_recommendation(next_route(), narrative=True), warmup=len(route_ids)))
+    yield ("model_host.get_trash_pickup_recommendation[templated]", "model_host", {"routes": len(route_ids)},
+           timed(lambda: host.get_trash_pickup_recommendation(next_route(), narrative=False), warmup=len(route_ids)))
+
+
+def http_cases(base_url: str, route_ids: list, min_calls: int, seed: int = 0):
+    """
+    Cases sending requests to a running server.
+
+    Args:
+        base_url (str): e.g. "http://127.0.0.1:8000".
+        route_ids (list): Trash pickup route ids to request.
+        min_calls (int): Requests per case (per concurrency level).
+    """
+    rng = np.random.default_rng(seed)
+    points = random_points(rng, 4096)
+
+    def poster(path, bodies):
+        def make_call():
+            session = requests.Session()
+            next_body = cycle(bodies)
+
+            def call():
+                response = session.post(base_url + path, json=next_body())
+                response.raise_for_status()
+            return call
+        return make_call
+
+    for path in ("/predict/trafficCongestion", "/predict/weatherPred"):
+        for concurrency in HTTP_CONCURRENCY:
+            yield (f"http POST {path}[concurrency={concurrency}]", "http", {"concurrency": concurrency},
+                   lambda path=path, concurrency=concurrency: time_concurrent(
+                       poster(path, points), concurrency, min_calls * max(1, concurrency // 2)))
+
+    for path in ("/predict/trafficCongestion/batch", "/predict/weatherPred/batch"):
+        for size in HTTP_BATCH_SIZES:
+            bodies = [{"points": points[start:start + size]} for start in range(0, len(points), size)]
+            yield (f"http POST {path}[batch={size}]", "http", {"batch": size, "concurrency": 1},
+                   lambda path=path, bodies=bodies, size=size: time_concurrent(
+                       poster(path, bodies), 1, min_calls, items_per_call=size))
+
+    def getter(path, params):
+        def make_call():
+            session = requests.Session()
+
+            def call():
+                response = session.get(base_url + path, params=params)
+                response.raise_for_status()
+            return call
+        return make_call
+
+    heatmap = {"hour": 8, "month": 5, "day": 3}
+    yield ("http GET /predict/trafficCongestion/heatmap[sites,cached]", "http", {"concurrency": 4},
+           lambda: time_concurrent(getter("/predict/trafficCongestion/heatmap", heatmap), 4, min_calls))
+
+    months = [{"month": month} for month in range(1, 13)]
+    yield ("http POST /recommend/fleetsize[llm_cached]", "http", {"concurrency": 4},
+           lambda: time_concurrent(poster("/recommend/fleetsize", months), 4, min_calls))
+
+    routes = [{"route_id": route_id} for route_id in route_ids]
+    yield ("http POST /predict/AQI_TC[aqi_cached]", "http", {"concurrency": 4},
+           lambda: time_concurrent(poster("/predict/AQI_TC", routes), 4, min_calls))
+    def first_stop(path, bodies):
+        # Time until the first per-stop event of a streamed response.
+        def make_call():
+            session = requests.Session()
+            next_body = cycle(bodies)
+
+            def call():
+                with session.post(base_url + path, json=next_body(), stream=True) as response:
+                    response.raise_for_status()
+                    next(line for line in response.iter_lines() if b'"stop"' in line)
+            return call
+        return make_call
+
+    yield ("http POST /predict/AQI_TC/stream[first_stop]", "http", {"concurrency": 1},
+           lambda: time_concurrent(first_stop("/predict/AQI_TC/stream", routes), 1, min(min_calls, 50)))
+
+    narrated = [dict(route, narrative=True) for route in routes]
+    yield ("http POST /recommend/trashpickup[cached]", "http", {"concurrency": 4},
+           lambda: time_concurrent(poster("/recommend/trashpickup", narrated), 4, min_calls))
+    yield ("http POST /recommend/trashpickup[templated]", "http", {"concurrency": 4},
+           lambda: time_concurrent(poster("/recommend/trashpickup", routes), 4, min_calls))
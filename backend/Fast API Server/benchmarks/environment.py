@@ -0,0 +1,203 @@
+"""
+Offline benchmark environment.
+
+The server reads ./data and ./models relative to its working directory, so the
+benchmarks run it in a separate working directory (benchmarks/.workdir) where
+`data` links to the bundled datasets and `models` links to ./models when the trained
+models are present. When they are missing, stand-in LightGBM models with the same
+interface (sklearn preprocessor + model, trained on the bundled feature CSVs against a
+synthetic target) are trained into benchmarks/.workdir/stand_in_models instead, so the
+real models directory is never touched.
+
+Upstream calls (OpenWeatherMap AQI and OpenRouter) go to a local stub server with a
+fixed response delay.
+"""
+
+import http.server
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKDIR = os.path.join(SERVER_DIR, "benchmarks", ".workdir")
+
+# Model directory -> (feature CSV under ./data, number of targets).
+MODELS = {
+    "traffic_congestion": ("traffic_congestion/Additional Features Final v1.csv", 1),
+    "weather_pred": ("weather_pred/Additional Features.csv", 4),
+}
+
+
+def _models_present(models_dir: str) -> bool:
+    return all(
+        os.path.exists(os.path.join(models_dir, name, file_name))
+        for name in MODELS for file_name in ("model.joblib", "preprocessor.joblib")
+    )
+
+
+def _link(target: str, link: str):
+    if os.path.islink(link):
+        if os.readlink(link) == target:
+            return
+        os.remove(link)
+    os.symlink(target, link)
+
+
+def prepare_workdir(workdir: str = WORKDIR, retrain: bool = False) -> dict:
+    """
+    Create the benchmark working directory (training stand-in models if needed).
+
+    Returns:
+        dict: {"workdir", "stand_in_models"}.
+    """
+    os.makedirs(workdir, exist_ok=True)
+    _link(os.path.join(SERVER_DIR, "data"), os.path.join(workdir, "data"))
+
+    models_link = os.path.join(workdir, "models")
+    real_models = os.path.join(SERVER_DIR, "models")
+    if _models_present(real_models) and not retrain:
+        _link(real_models, models_link)
+        return {"workdir": workdir, "stand_in_models": False}
+
+    stand_in_models = os.path.join(workdir, "stand_in_models")
+    if retrain or not _models_present(stand_in_models):
+        train_stand_in_models(os.path.join(SERVER_DIR, "data"), stand_in_models)
+    _link(stand_in_models, models_link)
+    return {"workdir": workdir, "stand_in_models": True}
+
+
+def model_frame(dataset: pd.DataFrame, n_rows: int, rng: np.random.Generator) -> pd.DataFrame:
+    """
+    Random model input rows laid out as ModelHost.add_features builds them.
+    """
+    rows = dataset.iloc[rng.integers(0, len(dataset), n_rows)].reset_index(drop=True)
+    frame = pd.DataFrame({
+        "Lat": rows["Lat"],
+        "Long": rows["Long"],
+        "Hour": rng.integers(0, 24, n_rows),
+        "Day": rng.integers(1, 32, n_rows),
+        "Month": rng.integers(1, 13, n_rows),
+    })
+    frame = pd.concat([frame, rows.drop(columns=["Lat", "Long"]).astype(object)], axis=1)
+    return frame.fillna(0)
+
+
+def train_stand_in_models(data_dir: str, models_dir: str, n_rows: int = 5000, seed: int = 0):
+    """
+    Train stand-in preprocessors and LightGBM models on the bundled feature CSVs.
+    """
+    import joblib
+    from lightgbm import LGBMRegressor
+    from sklearn.compose import ColumnTransformer
+    from sklearn.multioutput import MultiOutputRegressor
+    from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+    rng = np.random.default_rng(seed)
+    for name, (feature_csv, n_targets) in MODELS.items():
+        dataset = pd.read_csv(os.path.join(data_dir, feature_csv))
+        frame = model_frame(dataset, n_rows, rng)
+
+        categorical = [column for column in dataset.columns if not pd.api.types.is_numeric_dtype(dataset[column])]
+        numeric = [column for column in frame.columns if column not in categorical]
+        preprocessor = ColumnTransformer([
+            ("categorical", OneHotEncoder(handle_unknown="ignore"), categorical),
+            ("numeric", StandardScaler(), numeric),
+        ])
+        features = preprocessor.fit_transform(frame)
+
+        # Synthetic daily/seasonal target; only the model's shape and size matter here.
+        hours, months = frame["Hour"].to_numpy(float), frame["Month"].to_numpy(float)
+        base = np.sin(hours / 24 * 2 * np.pi) + np.cos(months / 12 * 2 * np.pi)
+        targets = base[:, None] * np.arange(1, n_targets + 1) + rng.normal(0, 0.1, (n_rows, n_targets))
+
+        if n_targets == 1:
+            model = LGBMRegressor(n_estimators=100, verbose=-1).fit(features, targets[:, 0])
+        else:
+            model = MultiOutputRegressor(LGBMRegressor(n_estimators=100, verbose=-1)).fit(features, targets)
+
+        os.makedirs(os.path.join(models_dir, name), exist_ok=True)
+        joblib.dump(preprocessor, os.path.join(models_dir, name, "preprocessor.joblib"))
+        joblib.dump(model, os.path.join(models_dir, name, "model.joblib"))
+
+
+class _StubHandler(http.server.BaseHTTPRequestHandler):
+    """
+    OpenWeatherMap air-pollution (GET) and OpenRouter chat completions (POST).
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        time.sleep(self.server.delay)
+        self._send_json({"list": [{"main": {"aqi": 2}}]})
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        time.sleep(self.server.delay)
+        text = "Stub recommendation for benchmarking."
+        if not request.get("stream"):
+            self._send_json({
+                "id": "stub", "object": "chat.completion", "created": 0, "model": request.get("model", "stub"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text},
+                             "finish_reason": "stop"}],
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for word in text.split(" "):
+            chunk = {"id": "stub", "object": "chat.completion.chunk", "created": 0, "model": "stub",
+                     "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}]}
+            self.wfile.write(b"data: " + json.dumps(chunk).encode("utf-8") + b"\n\n")
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.close_connection = True
+
+
+class UpstreamStub:
+    """
+    Local stand-in for the AQI and OpenRouter APIs, served from a background thread.
+    """
+
+    def __init__(self, delay_seconds: float):
+        self.httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.delay = delay_seconds
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="upstream-stub", daemon=True)
+        self.thread.start()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def environment(self) -> dict:
+        """
+        Environment variables pointing the server at this stub.
+        """
+        return {
+            "AQI_API_KEY": "benchmark",
+            "AQI_API_URL_TEMPLATE": self.url + "/air_pollution?lat={lat}&lon={lon}&appid={api_key}",
+            "OPENROUTER_API_KEY": "benchmark",
+            "OPENROUTER_BASE_URL": self.url + "/v1",
+        }
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,158 @@
+"""
+Timing helpers and the benchmark result file format.
+
+Every case produces one summary dict (latency percentiles in milliseconds, calls and
+items per second), and a run is saved as JSON:
+
+    {"meta": {...}, "results": {case name: {"group", "params", "p50_ms", ...}}}
+"""
+
+import json
+import os
+import platform
+import subprocess
+import threading
+import time
+
+import numpy as np
+
+
+def summarize(latencies, wall_seconds: float, items_per_call: int = 1) -> dict:
+    """
+    Latency distribution and throughput of a list of call durations (in seconds).
+    """
+    latencies_ms = np.asarray(latencies) * 1000.0
+    calls = len(latencies_ms)
+    return {
+        "calls": calls,
+        "items_per_call": items_per_call,
+        "mean_ms": float(latencies_ms.mean()),
+        "min_ms": float(latencies_ms.min()),
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p90_ms": float(np.percentile(latencies_ms, 90)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+        "max_ms": float(latencies_ms.max()),
+        "calls_per_s": calls / wall_seconds,
+        "items_per_s": calls * items_per_call / wall_seconds,
+    }
+
+
+def time_calls(fn, min_seconds: float, max_calls: int = 1000, min_calls: int = 5,
+               warmup: int = 2, setup=None, items_per_call: int = 1) -> dict:
+    """
+    Call `fn()` repeatedly (at least `min_calls` times, then until `min_seconds` have been
+    spent or `max_calls` is reached) and summarize the call durations.
+
+    Args:
+        setup: Optional callable run before every call, outside the timed region
+            (e.g. to clear a cache for cold-path measurements).
+    """
+    for _ in range(warmup):
+        if setup is not None:
+            setup()
+        fn()
+
+    latencies = []
+    while len(latencies) < max_calls and (len(latencies) < min_calls or sum(latencies) < min_seconds):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - started)
+    return summarize(latencies, sum(latencies), items_per_call)
+
+
+def time_concurrent(make_call, concurrency: int, total_calls: int, items_per_call: int = 1) -> dict:
+    """
+    Run `total_calls` calls from `concurrency` client threads and summarize them.
+
+    Args:
+        make_call: Called once per client thread; returns the function that performs
+            one call (so every thread can hold its own HTTP session).
+    """
+    latencies = []
+    lock = threading.Lock()
+    remaining = [total_calls]
+
+    def client():
+        call = make_call()
+        while True:
+            with lock:
+                if remaining[0] == 0:
+                    return
+                remaining[0] -= 1
+            started = time.perf_counter()
+            call()
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(latencies, time.perf_counter() - started, items_per_call)
+
+
+def run_metadata(extra: dict) -> dict:
+    """
+    Description of the machine and revision the benchmarks ran on.
+    """
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                  cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        revision = None
+    return dict({
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "revision": revision,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }, **extra)
+
+
+def save_results(path: str, meta: dict, results: dict):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as handle:
+        json.dump({"meta": meta, "results": results}, handle, indent=2)
+
+
+def load_results(path: str) -> dict:
+    with open(path) as handle:
+        return json.load(handle)
+
+
+def compare_results(baseline: dict, current: dict, threshold: float, min_delta_ms: float):
+    """
+    Compare two result files case by case.
+
+    A case regresses when its median latency grows by more than `threshold` (relative)
+    and `min_delta_ms` (absolute), or its throughput drops by more than `threshold`.
+
+    Returns:
+        tuple: (rows, regressions) where rows are
+            (case, baseline p50, current p50, change, baseline items/s, current items/s, status).
+    """
+    rows, regressions = [], []
+    for name in sorted(set(baseline["results"]) | set(current["results"])):
+        before, after = baseline["results"].get(name), current["results"].get(name)
+        if before is None or after is None:
+            rows.append((name, before and before["p50_ms"], after and after["p50_ms"], None,
+                         before and before["items_per_s"], after and after["items_per_s"],
+                         "new" if before is None else "missing"))
+            continue
+
+        change = after["p50_ms"] / before["p50_ms"] - 1.0 if before["p50_ms"] else 0.0
+        slower = change > threshold and after["p50_ms"] - before["p50_ms"] > min_delta_ms
+        fewer = after["items_per_s"] < before["items_per_s"] * (1.0 - threshold)
+        status = "REGRESSION" if slower or fewer else ("faster" if change < -threshold else "ok")
+        if status == "REGRESSION":
+            regressions.append(name)
+        rows.append((name, before["p50_ms"], after["p50_ms"], change,
+                     before["items_per_s"], after["items_per_s"], status))
+    return rows, regressions
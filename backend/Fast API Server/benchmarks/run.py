@@ -0,0 +1,159 @@
+"""
+Benchmark suite for the ModelHost hot paths and the HTTP endpoints.
+
+Runs offline (see environment.py): stand-in models are trained when ./models is
+missing, and AQI / OpenRouter calls go to a local stub server.
+
+Usage (from the "Fast API Server" directory):
+
+    python -m benchmarks.run run --output benchmarks/results/baseline.json
+    python -m benchmarks.run run --output benchmarks/results/current.json --quick
+    python -m benchmarks.run compare benchmarks/results/baseline.json benchmarks/results/current.json
+
+`compare` prints a table and exits with status 1 if any case regressed.
+"""
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import requests
+
+from benchmarks.cases import http_cases, model_host_cases
+from benchmarks.environment import SERVER_DIR, UpstreamStub, prepare_workdir
+from benchmarks.measure import compare_results, load_results, run_metadata, save_results
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workdir: str, environment: dict, timeout: float = 120.0):
+    """
+    Start the server in a uvicorn subprocess and wait until every subsystem is loaded.
+
+    Returns:
+        tuple: (process, base_url)
+    """
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--app-dir", SERVER_DIR,
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=workdir, env=dict(os.environ, **environment),
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with status {process.returncode}.")
+        try:
+            if requests.get(base_url + "/ready", timeout=1).status_code == 200:
+                return process, base_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("Server did not become ready in time.")
+
+
+def run(args):
+    output = os.path.abspath(args.output)
+    environment = prepare_workdir(retrain=args.retrain)
+    stub = UpstreamStub(args.upstream_delay_ms / 1000.0)
+    # The model cases measure uncached predictions; the prediction cache has its own cases.
+    server_environment = dict(stub.environment(), SERVER_LAZY_LOAD="false", LOG_LEVEL="ERROR",
+                              PREDICTION_CACHE_ENABLED="false")
+
+    # The server module reads its configuration and data at import.
+    os.environ.update(server_environment)
+    os.chdir(environment["workdir"])
+    sys.path.insert(0, SERVER_DIR)
+    import server
+
+    min_seconds = 0.1 if args.quick else 0.5
+    results = {}
+
+    def record(cases):
+        for name, group, params, measure in cases:
+            if args.filter and args.filter not in name:
+                continue
+            results[name] = dict(measure(), group=group, params=params)
+            result = results[name]
+            print(f"{name:<72} p50 {result['p50_ms']:9.3f} ms  {result['items_per_s']:10.1f} items/s", flush=True)
+
+    record(model_host_cases(server, min_seconds))
+
+    if not args.skip_http:
+        process, base_url = start_server(environment["workdir"], server_environment)
+        try:
+            route_ids = sorted(server.model_host.route_index.routes)
+            record(http_cases(base_url, route_ids, min_calls=50 if args.quick else 200))
+        finally:
+            process.terminate()
+            process.wait()
+    stub.close()
+
+    meta = run_metadata({
+        "stand_in_models": environment["stand_in_models"],
+        "forecast_cube": server.model_host.traffic_forecast_cube is not None,
+        "inference_engine": server.model_host.inference_engine,
+        "upstream_delay_ms": args.upstream_delay_ms,
+        "quick": args.quick,
+    })
+    save_results(output, meta, results)
+    print(f"\nSaved {len(results)} results to {output}")
+
+
+def compare(args):
+    baseline, current = load_results(args.baseline), load_results(args.current)
+    for key in ("stand_in_models", "forecast_cube", "inference_engine", "upstream_delay_ms", "cpu_count"):
+        if baseline["meta"].get(key) != current["meta"].get(key):
+            print(f"Warning: runs differ in {key}: {baseline['meta'].get(key)} vs {current['meta'].get(key)}")
+
+    rows, regressions = compare_results(baseline, current, args.threshold, args.min_delta_ms)
+    print(f"{'case':<72} {'base p50':>10} {'p50':>10} {'change':>8} {'base items/s':>13} {'items/s':>12}  status")
+    for name, before, after, change, before_rate, after_rate, status in rows:
+        print(f"{name:<72} {_format(before, '.3f'):>10} {_format(after, '.3f'):>10} "
+              f"{_format(change, '+.1%'):>8} {_format(before_rate, '.1f'):>13} {_format(after_rate, '.1f'):>12}  {status}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}.")
+        sys.exit(1)
+    print("\nNo regressions.")
+
+
+def _format(value, spec: str) -> str:
+    return "-" if value is None else format(value, spec)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the FastAPI server.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the benchmarks and save the results as JSON.")
+    run_parser.add_argument("--output", default=os.path.join(SERVER_DIR, "benchmarks", "results", "latest.json"))
+    run_parser.add_argument("--quick", action="store_true", help="Shorter timing per case.")
+    run_parser.add_argument("--filter", help="Only run cases whose name contains this string.")
+    run_parser.add_argument("--skip-http", action="store_true", help="Only benchmark ModelHost in process.")
+    run_parser.add_argument("--upstream-delay-ms", type=float, default=20.0,
+                            help="Response delay of the stub AQI/OpenRouter server.")
+    run_parser.add_argument("--retrain", action="store_true", help="Train (and use) stand-in models even if ./models exists.")
+
+    compare_parser = commands.add_parser("compare", help="Compare two result files.")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.2,
+                                help="Relative slowdown (or throughput drop) counted as a regression.")
+    compare_parser.add_argument("--min-delta-ms", type=float, default=0.05,
+                                help="Ignore median slowdowns smaller than this.")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        run(args)
+    else:
+        compare(args)
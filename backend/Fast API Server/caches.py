@@ -0,0 +1,214 @@
+"""
+In-process caches shared by the ModelHost subsystems.
+
+TTLCache is a thread-safe, size-bounded LRU cache with a time-to-live per entry and an
+optional stale-while-revalidate window: an entry past its TTL but still inside the
+stale window is returned immediately while a single background refresh replaces it.
+Concurrent misses for the same key are coalesced with SingleFlight, so only one
+caller runs the loader and the others wait for its result.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls: callers with the same key share one in-flight call.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.shared = 0
+
+    def do(self, key, fn):
+        """
+        Run `fn()` unless a call for `key` is already in flight, in which case wait for
+        and return its result (or raise its exception).
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+            else:
+                self.shared += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache with TTL, stale-while-revalidate and hit/miss counters.
+    """
+
+    def __init__(self, max_size: int, ttl: float, stale_ttl: float = 0.0, executor=None):
+        """
+        Args:
+            max_size  (int):   Maximum number of entries; the least recently used entry is evicted.
+            ttl       (float): Seconds an entry is served as fresh.
+            stale_ttl (float): Extra seconds an expired entry is still served while it is refreshed.
+            executor: concurrent.futures executor used for background refreshes. Without one,
+                stale entries are treated as misses.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.executor = executor
+
+        self._entries = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """
+        Return a fresh cached value, or None.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[1] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        """
+        Store a value, evicting the least recently used entries beyond `max_size`.
+        """
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_many(self, keys) -> dict:
+        """
+        Fresh cached values for several keys under one lock, as {key: value} (misses are left out).
+        """
+        if self.max_size <= 0 or self.ttl <= 0:
+            return {}
+        found = {}
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and now - entry[1] < self.ttl:
+                    self._entries.move_to_end(key)
+                    found[key] = entry[0]
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def set_many(self, items: dict):
+        """
+        Store several values under one lock.
+        """
+        if self.max_size <= 0 or self.ttl <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            for key, value in items.items():
+                self._entries[key] = (value, now)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_load(self, key, loader):
+        """
+        Return the cached value for `key`, calling `loader()` on a miss.
+
+        Stale entries are returned as-is and refreshed in the background. Concurrent
+        misses for the same key share one `loader()` call. Exceptions raised by `loader`
+        on a miss propagate and nothing is cached.
+        """
+        if self.max_size <= 0 or self.ttl <= 0:
+            return loader()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = time.monotonic() - entry[1]
+                if age < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                if age < self.ttl + self.stale_ttl and self.executor is not None:
+                    self._entries.move_to_end(key)
+                    self.stale_hits += 1
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        self.executor.submit(self._refresh, key, loader)
+                    return entry[0]
+            self.misses += 1
+
+        return self._flight.do(key, lambda: self._load(key, loader))
+
+    def _load(self, key, loader):
+        value = loader()
+        self.set(key, value)
+        return value
+
+    def _refresh(self, key, loader):
+        """
+        Reload a stale entry; on failure the stale value is kept until it expires.
+        """
+        try:
+            self.set(key, loader())
+        except Exception as e:
+            logger.warning("[Cache] Background refresh failed for %s: %s", key, e)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Counters and current size, e.g. for metrics or debugging.
+        """
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "coalesced": self._flight.shared,
+                "hit_ratio": (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+            }
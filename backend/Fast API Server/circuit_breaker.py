@@ -0,0 +1,136 @@
+"""
+Circuit breakers for the upstream dependencies (OpenWeatherMap, OpenRouter).
+
+A breaker counts consecutive failed calls to its dependency. After `failure_threshold`
+failures in a row it opens: calls are rejected at once (CircuitOpen), and callers use
+their fallback (AQI 1, the templated narrative) instead of waiting for a timeout.
+After `reset_seconds` one trial call is let through (half-open); it closes the breaker
+if it succeeds and opens it again if it fails.
+
+State changes are logged by the breaker, so callers log calls it rejects at DEBUG
+(see `failure_log_level`) and an outage does not log every request.
+"""
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+STATES = ("closed", "open", "half_open")
+
+
+class CircuitOpen(Exception):
+    """
+    Raised instead of calling a dependency whose breaker is open.
+    """
+
+
+def failure_log_level(error: Exception, level: int = logging.WARNING) -> int:
+    """
+    Level to log a failed upstream call at: DEBUG if an open breaker rejected it, `level` otherwise.
+    """
+    return logging.DEBUG if isinstance(error, CircuitOpen) else level
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker with a single half-open trial call.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        """
+        Args:
+            name (str): Dependency name used in errors and statistics.
+            failure_threshold (int): Consecutive failures that open the breaker.
+            reset_seconds (float): Time the breaker stays open before a trial call.
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+        self.calls = 0
+        self.failures = 0
+        self.rejected = 0
+        self.opened = 0
+
+    def allow(self) -> bool:
+        """
+        Whether a call may go ahead; every allowed call must be followed by
+        `record_success` or `record_failure`.
+        """
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self.state = "half_open"
+                logger.info("[CircuitBreaker] %s is half-open, trying one call.", self.name)
+            if self.state == "closed" or (self.state == "half_open" and not self._trial_in_flight):
+                self._trial_in_flight = self.state == "half_open"
+                self.calls += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != "closed":
+                logger.warning("[CircuitBreaker] %s recovered, circuit closed.", self.name)
+            self.state = "closed"
+            self._consecutive_failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._consecutive_failures += 1
+            if self.state == "half_open" or self._consecutive_failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.opened += 1
+                    logger.warning("[CircuitBreaker] %s opened after %d consecutive failures; "
+                                   "retrying in %ss.", self.name, self._consecutive_failures, self.reset_seconds)
+                self.state = "open"
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def release(self):
+        """
+        End an allowed call that neither succeeded nor failed (e.g. it was interrupted),
+        so that a half-open breaker lets the next trial call through.
+        """
+        with self._lock:
+            self._trial_in_flight = False
+
+    def call(self, fn, *args, **kwargs):
+        """
+        Call `fn(*args, **kwargs)` through the breaker.
+
+        Raises:
+            CircuitOpen: If the breaker is open (`fn` is not called).
+        """
+        if not self.allow():
+            raise CircuitOpen(f"{self.name} is unavailable (circuit open).")
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        except BaseException:
+            # KeyboardInterrupt, SystemExit, ...: not the dependency's failure.
+            self.release()
+            raise
+        self.record_success()
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "state": self.state,
+                "calls": self.calls,
+                "failures": self.failures,
+                "rejected": self.rejected,
+                "opened": self.opened,
+            }
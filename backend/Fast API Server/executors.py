@@ -0,0 +1,260 @@
+"""
+Thread pools and per-endpoint concurrency limits for the blocking parts of the handlers.
+
+The FastAPI handlers are `async def`, but pandas, the sklearn preprocessors, model
+predict, OpenWeatherMap requests and OpenRouter completions all block. Running them on
+the event loop lets one slow upstream call stall every other request on the worker.
+
+Handlers instead hand their blocking work to an EndpointLimiter, which admits at most
+`max_concurrency` calls per endpoint (the rest wait on the event loop, not in a thread)
+and runs admitted calls on a shared thread pool. Cheap predictions and slow upstream
+work use separate pools so that in-flight LLM calls cannot take the threads the
+prediction endpoints need.
+
+When an endpoint's queue is full (`max_queue` requests waiting), AdmissionMiddleware
+rejects its new requests with 503 and Retry-After before their bodies are read, so an
+overloaded worker sheds load instead of queueing without bound. A request is waiting
+from the moment it is admitted until the work it belongs to starts running, wherever
+it waits: for an endpoint slot, or in a MicroBatcher for its batch (whose call counts
+as running all of the batch's requests).
+"""
+
+import asyncio
+import functools
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Returned by next() on the pool when a streamed generator is exhausted.
+_EXHAUSTED = object()
+
+
+class EndpointLimiter:
+    """
+    Admission limit and queueing statistics for one endpoint's blocking work.
+    """
+
+    def __init__(self, name: str, pool: ThreadPoolExecutor, max_concurrency: int, max_queue: int = None):
+        """
+        Args:
+            name (str): Endpoint name used in statistics.
+            pool (ThreadPoolExecutor): Pool that runs the admitted calls.
+            max_concurrency (int): Maximum number of calls running at once.
+            max_queue (int): Waiting requests at which new requests are shed (None: never).
+        """
+        self.name = name
+        self.pool = pool
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._lock = threading.Lock()
+
+        self.queued = 0
+        self.in_flight = 0
+        self.requests = 0
+        self.running_requests = 0
+        self.completed = 0
+        self.failed = 0
+        self.shed = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.run_seconds_total = 0.0
+
+    def admit_request(self) -> bool:
+        """
+        Whether a new request should be admitted: counts it as admitted (until
+        `release_request`) or as shed.
+        """
+        with self._lock:
+            if self.max_queue is None or self.requests - self.running_requests < self.max_queue:
+                self.requests += 1
+                return True
+            self.shed += 1
+            return False
+
+    def release_request(self):
+        """
+        Stop counting an admitted request (its response is complete).
+        """
+        with self._lock:
+            self.requests -= 1
+
+    async def _admit(self, requests: int = 1) -> float:
+        """
+        Wait for a free slot and return the time the call started.
+
+        Args:
+            requests (int): Requests the call runs the work of (see `run_batch`).
+        """
+        enqueued = time.perf_counter()
+        with self._lock:
+            self.queued += 1
+
+        try:
+            await self._semaphore.acquire()
+        finally:
+            with self._lock:
+                self.queued -= 1
+
+        started = time.perf_counter()
+        waited = started - enqueued
+        with self._lock:
+            self.in_flight += 1
+            self.running_requests += requests
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+        return started
+
+    def _finish(self, started: float, failed: bool, requests: int = 1):
+        self._semaphore.release()
+        with self._lock:
+            self.in_flight -= 1
+            self.running_requests -= requests
+            self.completed += 1
+            self.failed += failed
+            self.run_seconds_total += time.perf_counter() - started
+
+    async def run(self, fn, *args, **kwargs):
+        """
+        Wait for a free slot, then run `fn(*args, **kwargs)` on the pool and return its result.
+        """
+        return await self.run_batch(1, fn, *args, **kwargs)
+
+    async def run_batch(self, requests: int, fn, *args, **kwargs):
+        """
+        `run` for a call that does the work of `requests` requests (e.g. one micro-batch);
+        they count as running, not waiting, while it runs.
+        """
+        started = await self._admit(requests)
+        failed = False
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.pool, functools.partial(fn, *args, **kwargs))
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self._finish(started, failed, requests)
+
+    async def stream(self, fn, *args, **kwargs):
+        """
+        Like `run` for a generator function: holds one slot while the generator runs,
+        advancing it on the pool and yielding its items.
+
+        Closing the stream early (e.g. when the client disconnects) closes the generator,
+        once any step still running on the pool has finished.
+        """
+        started = await self._admit()
+        failed = False
+        generator, pending = None, None
+        try:
+            generator = fn(*args, **kwargs)
+            while True:
+                pending = self.pool.submit(next, generator, _EXHAUSTED)
+                item = await asyncio.wrap_future(pending)
+                if item is _EXHAUSTED:
+                    break
+                yield item
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            if generator is not None:
+                if pending is not None and not pending.done():
+                    pending.add_done_callback(lambda _: generator.close())
+                else:
+                    generator.close()
+            self._finish(started, failed)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "queued": self.queued,
+                "in_flight": self.in_flight,
+                "waiting_requests": max(self.requests - self.running_requests, 0),
+                "completed": self.completed,
+                "failed": self.failed,
+                "shed": self.shed,
+                "wait_seconds_total": self.wait_seconds_total,
+                "wait_seconds_max": self.wait_seconds_max,
+                "run_seconds_total": self.run_seconds_total,
+            }
+
+
+class EndpointExecutors:
+    """
+    Named thread pools plus one EndpointLimiter per endpoint.
+    """
+
+    def __init__(self, pools: dict):
+        """
+        Args:
+            pools (dict): Pool name -> number of worker threads.
+        """
+        self.pools = {
+            name: ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"{name}-pool")
+            for name, workers in pools.items()
+        }
+        self.limiters = {}
+
+    def limiter(self, endpoint: str, pool: str, max_concurrency: int, max_queue: int = None) -> EndpointLimiter:
+        """
+        Create (or return) the limiter for an endpoint, running on the named pool.
+        """
+        if endpoint not in self.limiters:
+            self.limiters[endpoint] = EndpointLimiter(endpoint, self.pools[pool], max_concurrency, max_queue)
+        return self.limiters[endpoint]
+
+    def stats(self) -> dict:
+        return {
+            "pools": {name: pool._max_workers for name, pool in self.pools.items()},
+            "endpoints": {name: limiter.stats() for name, limiter in self.limiters.items()},
+        }
+
+    def shutdown(self):
+        for pool in self.pools.values():
+            pool.shutdown(wait=False)
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware answering 503 to requests whose endpoint's queue is full.
+    """
+
+    def __init__(self, app, limiters: dict, retry_after_seconds: int = 1):
+        """
+        Args:
+            app: The wrapped ASGI application.
+            limiters (dict): Request path -> EndpointLimiter of the endpoint's blocking work.
+            retry_after_seconds (int): Retry-After of the 503 responses.
+        """
+        self.app = app
+        self.limiters = limiters
+        self.retry_after_seconds = retry_after_seconds
+
+    async def __call__(self, scope, receive, send):
+        limiter = self.limiters.get(scope["path"]) if scope["type"] == "http" else None
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+        if limiter.admit_request():
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                limiter.release_request()
+            return
+
+        body = json.dumps({"detail": f"{limiter.name} is overloaded; retry later."}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("ascii")),
+                (b"retry-after", str(self.retry_after_seconds).encode("ascii")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,246 @@
+"""
+Pre-encoded per-site feature rows for the traffic and weather preprocessors.
+
+A prediction row is made of the site coordinates, three time columns (Hour, Day,
+Month) and the static features of the site from the "Additional Features" CSVs.
+Only the time columns change between requests, so the static part of every site
+is run through the sklearn preprocessor once at startup. The encoded output of
+each time value is tabulated as well, and a request only has to copy the site row
+into a preallocated array and drop in the hour/day/month columns.
+
+This relies on the preprocessor encoding every input column independently
+(one-hot encoders, scalers, passthrough), which is what the ColumnTransformer
+pipelines do. The store probes the preprocessor and verifies itself against
+`preprocessor.transform` at build time; if the encoding turns out not to be
+separable it disables itself and callers fall back to the DataFrame path. Within a
+batch, only the rows the store cannot serve (unknown sites, untabulated time values)
+take the DataFrame path (see `encode_rows`).
+"""
+
+import numpy as np
+import pandas as pd
+
+TIME_COLUMNS = ("Hour", "Day", "Month")
+
+# Value ranges tabulated for each time column. Requests outside of them use the
+# DataFrame path.
+TIME_RANGES = {
+    "Hour": range(0, 24),
+    "Day": range(1, 32),
+    "Month": range(1, 13),
+}
+
+# Tolerance used when checking the store against `preprocessor.transform`.
+PARITY_TOLERANCE = 1e-9
+
+
+def _dense(matrix) -> np.ndarray:
+    """
+    Convert a preprocessor output (ndarray, sparse matrix or DataFrame) to a float64 ndarray.
+    """
+    if hasattr(matrix, "toarray"):
+        matrix = matrix.toarray()
+    return np.asarray(matrix, dtype=np.float64)
+
+
+class SiteFeatureStore:
+    """
+    Encoded static features for every (Lat, Long) site of a dataset.
+    """
+
+    def __init__(self, dataset: pd.DataFrame, preprocessor):
+        """
+        Encode every site of `dataset` and tabulate the time columns.
+
+        Args:
+            dataset (pd.DataFrame): Additional features with 'Lat' and 'Long' columns.
+            preprocessor: Fitted sklearn transformer used by the model.
+        """
+        self.preprocessor = preprocessor
+
+        # The DataFrame path only ever predicts with the first row of a site.
+        sites = dataset.drop_duplicates(["Lat", "Long"], keep="first").reset_index(drop=True)
+        self.site_keys = {
+            (lat, long): position
+            for position, (lat, long) in enumerate(zip(sites["Lat"], sites["Long"]))
+        }
+        self.feature_columns = [column for column in sites.columns if column not in ("Lat", "Long")]
+        self._sites = sites
+
+        self.static_rows = _dense(self.preprocessor.transform(self.frame(np.arange(len(sites)))))
+        self.time_columns = {}
+        self.time_tables = {}
+        self.enabled = self._tabulate_time_columns() and self._check_parity()
+
+    def frame(self, positions, hours=None, months=None, days=None) -> pd.DataFrame:
+        """
+        Build the DataFrame `ModelHost.add_features` would build for the given sites.
+
+        Args:
+            positions (array-like): Store positions of the sites.
+            hours, months, days (array-like, optional): Time columns; defaults to the
+                first tabulated value of each column.
+
+        Returns:
+            pd.DataFrame: One row per position, in the preprocessor's column layout.
+        """
+        positions = np.asarray(positions, dtype=np.intp)
+        sites = self._sites.iloc[positions].reset_index(drop=True)
+
+        def column(values, name):
+            if values is None:
+                return np.full(len(positions), TIME_RANGES[name][0])
+            return np.broadcast_to(np.asarray(values), len(positions))
+
+        input_df = pd.DataFrame({
+            "Lat": sites["Lat"],
+            "Long": sites["Long"],
+            "Hour": column(hours, "Hour"),
+            "Day": column(days, "Day"),
+            "Month": column(months, "Month"),
+        })
+        feature_df = sites[self.feature_columns].astype(object)
+        return pd.concat([input_df, feature_df], axis=1)
+
+    def _tabulate_time_columns(self) -> bool:
+        """
+        Find the output columns driven by each time column and tabulate their values.
+
+        Returns:
+            bool: False if the preprocessor does not encode the time columns independently.
+        """
+        probe_sites = np.unique([0, len(self._sites) - 1])
+        claimed = np.zeros(self.static_rows.shape[1], dtype=bool)
+
+        for name in TIME_COLUMNS:
+            values = np.array(TIME_RANGES[name])
+            tables = []
+            for site in probe_sites:
+                kwargs = {name.lower() + "s": values}
+                frame = self.frame(np.full(len(values), site), **kwargs)
+                tables.append(_dense(self.preprocessor.transform(frame)))
+
+            dependent = np.ptp(tables[0], axis=0) > 0
+            if claimed[dependent].any():
+                return False
+            # The encoded time columns must not depend on the site.
+            if not all(np.array_equal(table[:, dependent], tables[0][:, dependent]) for table in tables):
+                return False
+
+            claimed |= dependent
+            self.time_columns[name] = np.flatnonzero(dependent)
+            self.time_tables[name] = tables[0][:, dependent]
+
+        return True
+
+    def _check_parity(self, samples: int = 64) -> bool:
+        """
+        Compare encoded rows against `preprocessor.transform` on a deterministic sample.
+        """
+        rng = np.random.default_rng(0)
+        positions = rng.integers(0, len(self._sites), samples)
+        hours = rng.choice(TIME_RANGES["Hour"], samples)
+        months = rng.choice(TIME_RANGES["Month"], samples)
+        days = rng.choice(TIME_RANGES["Day"], samples)
+
+        expected = _dense(self.preprocessor.transform(self.frame(positions, hours, months, days)))
+        actual = self._encode(positions, hours, months, days)
+        return bool(np.allclose(actual, expected, rtol=0.0, atol=PARITY_TOLERANCE))
+
+    def supported(self, positions, hours, months, days) -> np.ndarray:
+        """
+        Mask of the rows the store can encode: known sites and tabulated time values.
+        """
+        positions = np.asarray(positions)
+        if not self.enabled:
+            return np.zeros(len(positions), dtype=bool)
+        mask = positions >= 0
+        for name, values in (("Hour", hours), ("Month", months), ("Day", days)):
+            values = np.asarray(values)
+            value_range = TIME_RANGES[name]
+            mask &= (values >= value_range.start) & (values < value_range.stop)
+        return mask
+
+    def positions(self, lats, longs) -> np.ndarray:
+        """
+        Store positions for arrays of site coordinates (-1 for unknown sites).
+        """
+        return np.array(
+            [self.site_keys.get((lat, long), -1) for lat, long in zip(lats, longs)],
+            dtype=np.intp,
+        )
+
+    def _encode(self, positions, hours, months, days) -> np.ndarray:
+        """
+        Merge the tabulated time columns into a copy of the encoded site rows.
+        """
+        encoded = self.static_rows[positions]
+        for name, values in (("Hour", hours), ("Month", months), ("Day", days)):
+            offset = np.asarray(values) - TIME_RANGES[name].start
+            encoded[:, self.time_columns[name]] = self.time_tables[name][offset]
+        return encoded
+
+    def encode_many(self, positions, hours, months, days):
+        """
+        Encoded model inputs for many (site, time) rows.
+
+        Args:
+            positions (array-like): Store positions of the sites (see `positions`).
+            hours, months, days (array-like): Time columns, one value per row.
+
+        Returns:
+            np.ndarray | None: Array of shape (n, n_features), or None if the store cannot
+            serve the rows and the DataFrame path should be used.
+        """
+        positions = np.asarray(positions, dtype=np.intp)
+        if not self.supported(positions, hours, months, days).all():
+            return None
+        return self._encode(positions, hours, months, days)
+
+    def encode_rows(self, positions, hours, months, days, fallback):
+        """
+        Encoded model inputs for many rows, encoding only the rows the store cannot serve
+        with `fallback`, so that one such row does not slow down the rest of a batch.
+
+        Args:
+            positions, hours, months, days: As for `encode_many`.
+            fallback: Called with the indices of the rows the store cannot serve
+                (np.ndarray); returns their preprocessor output.
+
+        Returns:
+            One encoded row per input row: an np.ndarray, or the output of `fallback` if
+            the store can serve none of the rows.
+        """
+        positions = np.asarray(positions, dtype=np.intp)
+        hours, months, days = (np.asarray(values) for values in (hours, months, days))
+        supported = self.supported(positions, hours, months, days)
+        if supported.all():
+            return self._encode(positions, hours, months, days)
+        unsupported = np.flatnonzero(~supported)
+        if not supported.any():
+            return fallback(unsupported)
+
+        encoded = np.empty((len(positions), self.static_rows.shape[1]))
+        encoded[supported] = self._encode(positions[supported], hours[supported], months[supported], days[supported])
+        encoded[unsupported] = _dense(fallback(unsupported))
+        return encoded
+
+    def encode(self, lat: float, long: float, hour: int, month: int, day: int):
+        """
+        Encoded model input for a single site and time.
+
+        Args:
+            lat   (float): Latitude of the nearest known location.
+            long  (float): Longitude of the nearest known location.
+            hour  (int):   Hour of the day (0-23).
+            month (int):   Month (1-12).
+            day   (int):   Day of the month (1-31).
+
+        Returns:
+            np.ndarray | None: Array of shape (1, n_features), or None if the store cannot
+            serve the row and the DataFrame path should be used.
+        """
+        position = self.site_keys.get((lat, long))
+        if position is None:
+            return None
+        return self.encode_many([position], [hour], [month], [day])
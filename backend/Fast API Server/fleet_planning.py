@@ -0,0 +1,116 @@
+"""
+Vectorized fleet-size apportionment over the monthly bus service data.
+
+The recommendation for a month only depends on the month: each operator's bus demand
+(passengers divided by the mean passenger-to-bus ratio, summed over the days of the
+week) is varied by a month-seeded random factor and the fleet total is split between
+operators in proportion to it. The helpers here compute the demand for every month at
+once and apportion any number of totals with the largest-remainder method.
+
+What-if scenarios (`scenario_allocations`) vary the total, the variability seed and a
+passenger growth factor per operator. As the passenger-to-bus ratios are kept, an
+operator's demand grows with its passengers.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Total number of buses split between operators when no total is requested.
+DEFAULT_TOTAL_BUSES = 711
+
+# Range of the month-seeded random variability applied to every operator's demand.
+VARIABILITY_RANGE = (0.9, 1.1)
+
+
+def fleet_demand(fleet_df: pd.DataFrame):
+    """
+    Recommended buses per month and operator, before variability and scaling.
+
+    Args:
+        fleet_df (pd.DataFrame): Monthly data with a 'Passenger-to-Bus Ratio' column.
+
+    Returns:
+        tuple: (months, cities, demand) where `demand` has shape (len(months), len(cities))
+        and is NaN where an operator has no data for a month.
+    """
+    grouped = fleet_df.groupby(["Month", "Bus City Services", "Day of Week"]).agg(
+        ratio=("Passenger-to-Bus Ratio", "mean"),
+        passengers=("Number of passengers", "sum"),
+    )
+    recommended = (grouped["passengers"] / grouped["ratio"]).groupby(level=[0, 1]).sum()
+    demand = recommended.unstack("Bus City Services")
+    return demand.index.to_numpy(), demand.columns.to_numpy(), demand.to_numpy(dtype=np.float64)
+
+
+def variability(months, demand: np.ndarray, seed: int = None) -> np.ndarray:
+    """
+    Month-seeded random variability factors per month and operator.
+
+    Each month draws one factor per operator with data, in operator order, from a
+    generator seeded with the month number (and `seed`, if given).
+
+    Args:
+        months (array-like): Month numbers, one per row of `demand`.
+        demand (np.ndarray): Demand matrix from `fleet_demand`.
+        seed (int): Scenario seed; None gives the factors of the published recommendations.
+
+    Returns:
+        np.ndarray: Factors in VARIABILITY_RANGE (NaN where there is no data).
+    """
+    factors = np.full(demand.shape, np.nan)
+    for row, month in enumerate(months):
+        present = ~np.isnan(demand[row])
+        random_state = np.random.RandomState(int(month) if seed is None else [int(seed), int(month)])
+        factors[row, present] = random_state.uniform(
+            *VARIABILITY_RANGE, size=int(present.sum())
+        )
+    return factors
+
+
+def apportion(weights: np.ndarray, totals) -> np.ndarray:
+    """
+    Split integer totals in proportion to weights with the largest-remainder method.
+
+    Every total is first split into floored quotas; the buses left over go one each to
+    the operators with the largest fractional parts (ties go to the earlier operator).
+    NaN weights get nothing.
+
+    Args:
+        weights (np.ndarray): Weights with operators on the last axis, shape (..., n).
+        totals (array-like): Totals broadcastable to weights.shape[:-1].
+
+    Returns:
+        np.ndarray: Integer allocations of shape broadcast(weights, totals[..., None]);
+        every row sums to its total.
+    """
+    weights = np.nan_to_num(np.asarray(weights, dtype=np.float64), nan=0.0)
+    totals = np.asarray(totals, dtype=np.int64)
+
+    quotas = weights / weights.sum(axis=-1, keepdims=True) * totals[..., None]
+    floors = np.floor(quotas)
+    remainders = np.rint(totals - floors.sum(axis=-1)).astype(np.int64)
+
+    # Rank operators by fractional part (0 = largest) and give the leftover buses out in rank order.
+    order = np.argsort(-(quotas - floors), axis=-1, kind="stable")
+    ranks = np.argsort(order, axis=-1, kind="stable")
+    return floors.astype(np.int64) + (ranks < remainders[..., None])
+
+
+def scenario_allocations(demand: np.ndarray, factors: np.ndarray, growth: np.ndarray, totals) -> np.ndarray:
+    """
+    Apportion every total under every combination of variability and passenger growth.
+
+    Args:
+        demand (np.ndarray): Demand matrix from `fleet_demand`, shape (months, operators).
+        factors (np.ndarray): Variability factors per seed, shape (seeds, months, operators).
+        growth (np.ndarray): Passenger growth per scenario and operator (0.05 for +5%),
+            shape (growth scenarios, operators).
+        totals (array-like): Fleet totals, shape (totals,).
+
+    Returns:
+        np.ndarray: Buses of shape (totals, growth scenarios, seeds, months, operators);
+        every (total, growth, seed, month) row sums to its total.
+    """
+    weights = demand[None, None] * factors[None] * (1.0 + growth)[:, None, None, :]
+    totals = np.asarray(totals, dtype=np.int64)
+    return apportion(weights, totals[:, None, None, None])
@@ -0,0 +1,212 @@
+"""
+Precomputed traffic congestion "forecast cube".
+
+The traffic model only sees a site, an hour, a day and a month, so its whole output
+space is finite: every site in the location table x 366 days (leap-year calendar)
+x 24 hours. This module evaluates the model over that space offline and stores the
+result as a float32 .npy file that the server memory-maps, turning a prediction into
+an array lookup. All worker processes share the mapped file through the page cache.
+
+A JSON sidecar records the traffic model version (prediction_cache.model_version: a hash
+of the model, preprocessor, feature table and location table files) and the location
+table hash; a cube built from different files is ignored and the server uses live
+inference.
+
+Build it with:
+    python forecast_cube.py build
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CUBE_PATH = "./models/traffic_congestion/forecast_cube.npy"
+
+HOURS = 24
+# Days per month in a leap year, so that 29 February has its own slot.
+DAYS_IN_MONTH = np.array([31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+DAYS = int(DAYS_IN_MONTH.sum())
+# Day-of-year offset of the first day of each month (index 0 is January).
+MONTH_OFFSETS = np.concatenate([[0], np.cumsum(DAYS_IN_MONTH)[:-1]])
+
+
+def file_sha256(path: str) -> str:
+    """
+    Hex SHA-256 of a file's contents.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def sites_sha256(lats: np.ndarray, longs: np.ndarray) -> str:
+    """
+    Hex SHA-256 of the site coordinates, in table order.
+    """
+    coordinates = np.stack([lats, longs]).astype(np.float64)
+    return hashlib.sha256(coordinates.tobytes()).hexdigest()
+
+
+def day_of_year(months, days):
+    """
+    Leap-year day-of-year index (0-365) for arrays of months and days.
+
+    Returns:
+        tuple: (indices, valid) where `valid` marks real calendar dates.
+    """
+    months = np.asarray(months)
+    days = np.asarray(days)
+    valid = (months >= 1) & (months <= 12)
+    month_index = np.where(valid, months - 1, 0)
+    valid &= (days >= 1) & (days <= DAYS_IN_MONTH[month_index])
+    return np.where(valid, MONTH_OFFSETS[month_index] + days - 1, 0), valid
+
+
+class ForecastCube:
+    """
+    Memory-mapped congestion predictions indexed by [site, day_of_year, hour].
+    """
+
+    def __init__(self, values: np.ndarray):
+        self.values = values
+
+    @classmethod
+    def load(cls, path: str, version: str, lats: np.ndarray, longs: np.ndarray):
+        """
+        Memory-map a cube file if it exists and matches the current model, data and sites.
+
+        Args:
+            path (str): Path of the .npy cube file.
+            version (str): Traffic model version the cube must have been built for.
+            lats, longs (np.ndarray): Coordinates of the traffic location table.
+
+        Returns:
+            ForecastCube | None: The cube, or None if no usable cube file is present.
+        """
+        if not os.path.exists(path):
+            return None
+
+        try:
+            with open(path + ".json") as handle:
+                metadata = json.load(handle)
+            values = np.load(path, mmap_mode="r")
+        except (OSError, ValueError) as e:
+            logger.warning("[ForecastCube] Could not load %s: %s", path, e)
+            return None
+
+        if values.shape != (len(lats), DAYS, HOURS):
+            logger.warning("[ForecastCube] Ignoring %s: shape %s does not match the site table.", path, values.shape)
+            return None
+        if metadata.get("sites_sha256") != sites_sha256(lats, longs):
+            logger.warning("[ForecastCube] Ignoring %s: built for a different location table.", path)
+            return None
+        if metadata.get("model_version") != version:
+            logger.warning("[ForecastCube] Ignoring %s: built for a different model or feature table.", path)
+            return None
+
+        return cls(values)
+
+    def lookup_many(self, sites, hours, months, days):
+        """
+        Look up predictions for arrays of site positions and times.
+
+        Returns:
+            tuple: (values, valid) where `values` is float64 and `valid` marks the rows the
+            cube covers (rows with an invalid hour or calendar date need live inference).
+        """
+        hours = np.asarray(hours)
+        day_index, valid = day_of_year(months, days)
+        valid &= (hours >= 0) & (hours < HOURS)
+        hour_index = np.where(valid, hours, 0)
+        return self.values[np.asarray(sites), day_index, hour_index].astype(np.float64), valid
+
+    def lookup(self, site: int, hour: int, month: int, day: int):
+        """
+        Look up the prediction for one site position and time.
+
+        Returns:
+            float | None: The congestion index, or None if the time is outside the cube.
+        """
+        values, valid = self.lookup_many([site], [hour], [month], [day])
+        return float(values[0]) if valid[0] else None
+
+
+def build_forecast_cube(model_host, path: str = DEFAULT_CUBE_PATH, chunk_sites: int = 16):
+    """
+    Evaluate the traffic model over every site, day and hour and write the cube file.
+
+    Args:
+        model_host (ModelHost): Host with the traffic model, preprocessor and feature store.
+        path (str): Output .npy path; the metadata sidecar is written to `path + ".json"`.
+        chunk_sites (int): Number of sites predicted per model call.
+    """
+    location_index = model_host.traffic_location_index
+    feature_store = model_host.traffic_feature_store
+    n_sites = len(location_index)
+
+    # All (day_of_year, hour) combinations for one site, in cube order.
+    months = np.repeat(np.repeat(np.arange(1, 13), DAYS_IN_MONTH), HOURS)
+    days = np.repeat(np.concatenate([np.arange(1, n + 1) for n in DAYS_IN_MONTH]), HOURS)
+    hours = np.tile(np.arange(HOURS), DAYS)
+
+    positions = feature_store.positions(location_index.lats, location_index.longs)
+    if (positions < 0).any():
+        missing = int((positions < 0).sum())
+        raise ValueError(f"No feature data found for {missing} traffic locations.")
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp.npy"
+    cube = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32, shape=(n_sites, DAYS, HOURS))
+
+    for start in range(0, n_sites, chunk_sites):
+        chunk = positions[start:start + chunk_sites]
+        rows = np.repeat(chunk, DAYS * HOURS)
+        chunk_hours = np.tile(hours, len(chunk))
+        chunk_months = np.tile(months, len(chunk))
+        chunk_days = np.tile(days, len(chunk))
+
+        transformed_data = feature_store.encode_many(rows, chunk_hours, chunk_months, chunk_days)
+        if transformed_data is None:
+            frame = feature_store.frame(rows, chunk_hours, chunk_months, chunk_days)
+            transformed_data = model_host.traffic_congestion_preprocessor.transform(frame)
+
+        predictions = model_host.traffic_congestion_predictor.predict(transformed_data)
+        cube[start:start + len(chunk)] = np.asarray(predictions, dtype=np.float32).reshape(len(chunk), DAYS, HOURS)
+        logger.info("[ForecastCube] %d/%d sites", min(start + chunk_sites, n_sites), n_sites)
+
+    cube.flush()
+    del cube
+
+    metadata = {
+        "shape": [n_sites, DAYS, HOURS],
+        "model_version": model_host.traffic_model_version,
+        "sites_sha256": sites_sha256(location_index.lats, location_index.longs),
+    }
+    with open(path + ".json.tmp", "w") as handle:
+        json.dump(metadata, handle)
+
+    # Replace the cube and its metadata only once both are complete.
+    os.replace(tmp_path, path)
+    os.replace(path + ".json.tmp", path + ".json")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the traffic congestion forecast cube.")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--output", default=os.getenv("TRAFFIC_FORECAST_CUBE", DEFAULT_CUBE_PATH))
+    parser.add_argument("--chunk-sites", type=int, default=16)
+    args = parser.parse_args()
+
+    from server import model_host
+
+    # The server logs at WARNING by default; the build reports its progress at INFO.
+    logger.setLevel(logging.INFO)
+    build_forecast_cube(model_host, args.output, chunk_sites=args.chunk_sites)
@@ -0,0 +1,52 @@
+"""
+Multi-worker serving mode:
+
+    gunicorn -c gunicorn.conf.py server:app
+
+The app is imported once in the gunicorn master (`preload_app`), so the models,
+preprocessors, datasets and indexes built by ModelHost are loaded before the workers
+are forked and shared between them copy-on-write. The forecast cube is memory-mapped
+and shared through the page cache either way. GET /stats/memory reports the RSS/PSS of
+the master and every worker.
+
+GET /metrics adds up the request and stage metrics of all workers through the files in
+PROMETHEUS_MULTIPROC_DIR (see metrics.py).
+"""
+
+import gc
+import glob
+import os
+import tempfile
+
+# Lets memory_stats report the sibling workers as well.
+os.environ["SERVER_WORKER_MODE"] = "gunicorn"
+# Load everything in the master before forking; lazily loaded subsystems would be
+# loaded separately (and not shared) in every worker.
+os.environ["SERVER_LAZY_LOAD"] = "false"
+# Per-worker metric files; set before the app (and prometheus_client) is imported, and
+# emptied so that the figures of a previous run are not added in.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "prometheus_multiproc"))
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+for stale in glob.glob(os.path.join(os.environ["PROMETHEUS_MULTIPROC_DIR"], "*.db")):
+    os.remove(stale)
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = int(os.getenv("WORKER_TIMEOUT", "120"))
+
+
+def when_ready(server):
+    # Move everything loaded so far into the permanent GC generation so that garbage
+    # collections in the workers do not write to (and un-share) those pages.
+    gc.collect()
+    gc.freeze()
+
+
+def child_exit(server, worker):
+    # Drop the live gauges (requests in flight) of the exited worker; its counters and
+    # histograms stay in the totals.
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
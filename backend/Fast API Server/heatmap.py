@@ -0,0 +1,179 @@
+"""
+Congestion heatmaps for the map frontend.
+
+A heatmap is the predicted congestion for one time slice (hour, day, month), either at
+every traffic site or rasterized over a bounding box. Grid cells take the inverse
+distance weighted mean of the nearest sites; cells further than MAX_SITE_DISTANCE_KM
+from every site have no value.
+
+Two encodings are supported:
+    - "json": columnar arrays ({"lat": [...], "lon": [...], "congestion": [...]} for
+      sites, or a row-major "congestion" array of the grid's "shape").
+    - "binary": little-endian float32, row-major. Sites are a (3, n) array of lat, lon
+      and congestion rows; a grid is (rows, cols) with NaN for cells without a value.
+      Rows run from north to south and columns from west to east.
+"""
+
+import hashlib
+import json
+
+import numpy as np
+
+from forecast_cube import day_of_year
+from spatial_index import EARTH_RADIUS_KM
+
+FORMATS = ("json", "binary")
+MEDIA_TYPES = {"json": "application/json", "binary": "application/octet-stream"}
+
+# Neighbouring sites blended per grid cell, and the distance beyond which a cell is empty.
+GRID_NEIGHBOURS = 4
+MAX_SITE_DISTANCE_KM = 5.0
+
+
+class InvalidHeatmapRequest(ValueError):
+    """
+    Raised for a heatmap request with an invalid time slice, bounding box, grid or format.
+    """
+
+
+class Heatmap:
+    """
+    An encoded heatmap response.
+    """
+
+    def __init__(self, body: bytes, encoding: str, shape: tuple, bbox: tuple = None):
+        self.body = body
+        self.media_type = MEDIA_TYPES[encoding]
+        self.shape = shape
+        self.bbox = bbox
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+    def headers(self) -> dict:
+        """
+        ETag and layout headers of the response.
+        """
+        headers = {"ETag": self.etag, "X-Heatmap-Shape": ",".join(str(size) for size in self.shape)}
+        if self.bbox is not None:
+            headers["X-Heatmap-Bbox"] = ",".join(str(value) for value in self.bbox)
+        return headers
+
+
+def check_time_slice(hour: int, month: int, day: int):
+    """
+    Reject an hour outside 0-23 or a date that does not exist in a leap year (e.g. 30 February).
+    """
+    _, valid = day_of_year([month], [day])
+    if not (valid[0] and 0 <= hour < 24):
+        raise InvalidHeatmapRequest(f"Invalid time slice: hour {hour}, month {month}, day {day}.")
+
+
+def parse_bbox(bbox: str) -> tuple:
+    """
+    Parse "south,west,north,east" (degrees).
+    """
+    try:
+        south, west, north, east = (float(value) for value in bbox.split(","))
+    except ValueError:
+        raise InvalidHeatmapRequest(f"Invalid bbox {bbox}: expected south,west,north,east.")
+    if not (-90 <= south < north <= 90 and -180 <= west < east <= 180):
+        raise InvalidHeatmapRequest(f"Invalid bbox {bbox}: expected south < north and west < east.")
+    return south, west, north, east
+
+
+def grid_centres(bbox: tuple, rows: int, cols: int):
+    """
+    Latitudes and longitudes of the cell centres, each of shape (rows, cols), north row first.
+    """
+    south, west, north, east = bbox
+    lats = north - (np.arange(rows) + 0.5) * (north - south) / rows
+    lons = west + (np.arange(cols) + 0.5) * (east - west) / cols
+    return np.repeat(lats[:, None], cols, axis=1), np.repeat(lons[None, :], rows, axis=0)
+
+
+def grid_neighbours(site_lats: np.ndarray, site_lons: np.ndarray, bbox: tuple, rows: int, cols: int,
+                    k: int = GRID_NEIGHBOURS, block_size: int = 1 << 22):
+    """
+    The k nearest sites (haversine) of every grid cell centre.
+
+    The haversine term sin^2(dlat/2) + cos(lat) cos(lat_site) sin^2(dlon/2) only depends
+    on the cell's row through its latitude and on its column through its longitude, so
+    the trigonometry is evaluated per row and per column and combined with one multiply-
+    add per (cell, site).
+
+    Returns:
+        tuple: (indices, distances_km), both of shape (rows * cols, k), in no particular order.
+    """
+    lats, lons = grid_centres(bbox, rows, cols)
+    row_lat, col_lon = np.radians(lats[:, 0]), np.radians(lons[0])
+    site_lat, site_lon = np.radians(site_lats), np.radians(site_lons)
+    k = min(k, len(site_lats))
+
+    row_term = np.sin((site_lat[None, :] - row_lat[:, None]) / 2.0) ** 2
+    row_scale = np.cos(row_lat)[:, None] * np.cos(site_lat)[None, :]
+    col_term = np.sin((site_lon[None, :] - col_lon[:, None]) / 2.0) ** 2
+
+    indices = np.empty((rows, cols, k), dtype=np.intp)
+    haversine = np.empty((rows, cols, k), dtype=np.float64)
+    step = max(1, block_size // (cols * len(site_lats)))
+    for start in range(0, rows, step):
+        stop = start + step
+        a = row_term[start:stop, None, :] + row_scale[start:stop, None, :] * col_term[None, :, :]
+        if k < a.shape[2]:
+            nearest = np.argpartition(a, k - 1, axis=2)[:, :, :k]
+        else:
+            nearest = np.broadcast_to(np.arange(k), a.shape)
+        indices[start:stop] = nearest
+        haversine[start:stop] = np.take_along_axis(a, nearest, axis=2)
+
+    distances = 2.0 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(haversine, 0.0, 1.0)))
+    return indices.reshape(-1, k), distances.reshape(-1, k)
+
+
+def rasterize(location_index, site_values: np.ndarray, bbox: tuple, rows: int, cols: int) -> np.ndarray:
+    """
+    Inverse distance weighted site values on a (rows, cols) grid over `bbox`.
+
+    Args:
+        location_index (SpatialIndex): Index over the sites.
+        site_values (np.ndarray): One value per site.
+
+    Returns:
+        np.ndarray: float32 grid, NaN where no site is within MAX_SITE_DISTANCE_KM.
+    """
+    indices, distances = grid_neighbours(location_index.lats, location_index.longs, bbox, rows, cols)
+    weights = 1.0 / np.maximum(distances, 1e-3) ** 2
+    values = (weights * site_values[indices]).sum(axis=1) / weights.sum(axis=1)
+    values[distances.min(axis=1) > MAX_SITE_DISTANCE_KM] = np.nan
+    return values.reshape(rows, cols).astype(np.float32)
+
+
+def _rounded(values: np.ndarray, decimals: int) -> list:
+    values = np.round(values.astype(np.float64), decimals)
+    return [None if np.isnan(value) else value for value in values.tolist()]
+
+
+def encode_sites(lats: np.ndarray, lons: np.ndarray, values: np.ndarray, encoding: str) -> Heatmap:
+    """
+    Encode site coordinates and congestion.
+    """
+    shape = (3, len(values))
+    if encoding == "binary":
+        body = np.stack([lats, lons, values]).astype("<f4").tobytes()
+    else:
+        body = json.dumps({
+            "lat": _rounded(lats, 5), "lon": _rounded(lons, 5), "congestion": _rounded(values, 3),
+        }, separators=(",", ":")).encode("utf-8")
+    return Heatmap(body, encoding, shape)
+
+
+def encode_grid(grid: np.ndarray, bbox: tuple, encoding: str) -> Heatmap:
+    """
+    Encode a rasterized grid.
+    """
+    if encoding == "binary":
+        body = grid.astype("<f4").tobytes()
+    else:
+        body = json.dumps({
+            "bbox": list(bbox), "shape": list(grid.shape), "congestion": _rounded(grid.ravel(), 3),
+        }, separators=(",", ":")).encode("utf-8")
+    return Heatmap(body, encoding, grid.shape, bbox)
@@ -0,0 +1,74 @@
+"""
+Per-process memory statistics for the multi-worker serving mode.
+
+When gunicorn preloads the app (see gunicorn.conf.py), the models and datasets are
+loaded once in the master and the forked workers share those pages copy-on-write.
+RSS counts shared pages in every process, so the figures that show the saving are
+PSS (shared pages divided between the processes that map them) and the
+shared/private split, read from /proc/<pid>/smaps_rollup (Linux only).
+"""
+
+import os
+
+# smaps_rollup fields reported, in kB.
+FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+
+def process_memory(pid: int) -> dict:
+    """
+    Memory figures of one process in kB (empty if /proc is not readable).
+    """
+    stats = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as handle:
+            for line in handle:
+                name, _, value = line.partition(":")
+                if name in FIELDS:
+                    stats[name.lower() + "_kb"] = int(value.split()[0])
+    except OSError:
+        return {}
+    return stats
+
+
+def child_pids(parent_pid: int) -> list:
+    """
+    PIDs of the direct children of a process.
+    """
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as handle:
+                # The command name (field 2) may contain spaces, so split after its closing ')'.
+                fields = handle.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == parent_pid:
+            children.append(int(entry))
+    return sorted(children)
+
+
+def worker_memory_report() -> dict:
+    """
+    Memory of this worker, its siblings and their parent (the gunicorn master).
+
+    Outside of gunicorn (see gunicorn.conf.py) only this process is reported.
+
+    Returns:
+        dict: {"pid", "master": {...}, "workers": {pid: {...}}, "total_pss_kb"}.
+    """
+    if os.getenv("SERVER_WORKER_MODE") != "gunicorn":
+        stats = process_memory(os.getpid())
+        return {"pid": os.getpid(), "master": None, "workers": {os.getpid(): stats},
+                "total_pss_kb": stats.get("pss_kb", 0)}
+
+    master_pid = os.getppid()
+    workers = {pid: process_memory(pid) for pid in child_pids(master_pid)}
+    master = process_memory(master_pid)
+    return {
+        "pid": os.getpid(),
+        "master": dict(master, pid=master_pid),
+        "workers": workers,
+        "total_pss_kb": sum(stats.get("pss_kb", 0) for stats in workers.values()) + master.get("pss_kb", 0),
+    }
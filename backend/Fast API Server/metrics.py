@@ -0,0 +1,248 @@
+"""
+Prometheus metrics for the FastAPI server (served at GET /metrics).
+
+- Request latency histograms and in-flight gauges per endpoint (MetricsMiddleware),
+  labelled with the route template rather than the raw URL.
+- Per-stage latency histograms for the work inside ModelHost (`stage`).
+- Cache, endpoint queue and shedding, circuit breaker, micro-batching, subsystem and
+  reload figures, read from the existing `stats()` methods at scrape time
+  (ServerStatsCollector), so the request path does no extra bookkeeping for them.
+
+Under gunicorn, gunicorn.conf.py sets PROMETHEUS_MULTIPROC_DIR and prometheus_client
+keeps the request and stage metrics of every worker in files there; a scrape, whichever
+worker answers it, adds them up across workers (MultiProcessCollector). The stats read
+at scrape time only exist in the answering worker, and carry its "pid" label.
+"""
+
+import os
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.multiprocess import MultiProcessCollector
+from starlette.routing import Match
+
+from circuit_breaker import STATES
+
+# Stages timed inside ModelHost.
+STAGES = ("nearest", "features", "preprocess", "predict", "cube", "aqi", "llm")
+
+# Set (by gunicorn.conf.py) before this module is imported in multi-worker mode.
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+STAGE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Request latency by endpoint.",
+    ["endpoint", "method", "status"], buckets=STAGE_BUCKETS,
+)
+REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests being handled by endpoint.", ["endpoint"],
+                           multiprocess_mode="livesum")
+STAGE_SECONDS = Histogram(
+    "model_host_stage_duration_seconds", "Latency of the stages of request handling in ModelHost.",
+    ["stage"], buckets=STAGE_BUCKETS,
+)
+
+_stage_histograms = {name: STAGE_SECONDS.labels(name) for name in STAGES}
+
+
+def stage(name: str):
+    """
+    Context manager timing one stage (one of STAGES) into model_host_stage_duration_seconds.
+    """
+    return _stage_histograms[name].time()
+
+
+_server_stats = None
+
+
+def register_server_stats(caches, executors, batchers: dict, model_reloader, breakers: dict):
+    """
+    Register a ServerStatsCollector for the given components with the default registry.
+    """
+    global _server_stats
+    _server_stats = ServerStatsCollector(caches, executors, batchers, model_reloader, breakers)
+    REGISTRY.register(_server_stats)
+
+
+def metrics_response():
+    """
+    Body and content type of the /metrics response.
+    """
+    if not MULTIPROCESS:
+        return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+    registry = CollectorRegistry()
+    MultiProcessCollector(registry)
+    if _server_stats is not None:
+        registry.register(WorkerLabelled(_server_stats))
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+class WorkerLabelled:
+    """
+    A collector whose samples get a "pid" label with the id of the collecting process.
+    """
+
+    def __init__(self, collector):
+        self.collector = collector
+
+    def collect(self):
+        pid = str(os.getpid())
+        for family in self.collector.collect():
+            family.samples = [sample._replace(labels=dict(sample.labels, pid=pid)) for sample in family.samples]
+            yield family
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-endpoint latency and in-flight requests.
+    """
+
+    def __init__(self, app, routes):
+        """
+        Args:
+            app: The wrapped ASGI application.
+            routes (list): The application's routes (used to label requests by route template).
+        """
+        self.app = app
+        self.routes = routes
+        self._templates = {}
+
+    def endpoint(self, scope) -> str:
+        key = (scope["method"], scope["path"])
+        template = self._templates.get(key)
+        if template is None:
+            template, match = "unmatched", Match.NONE
+            for route in self.routes:
+                match, _ = route.matches(scope)
+                if match != Match.NONE:
+                    template = route.path
+                    break
+            if match == Match.FULL and "{" not in template:
+                # Only fixed paths are cached, so unknown URLs cannot grow the table.
+                self._templates[key] = template
+        return template
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        endpoint = self.endpoint(scope)
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight = REQUESTS_IN_FLIGHT.labels(endpoint)
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_flight.dec()
+            REQUEST_SECONDS.labels(endpoint, scope["method"], str(status)).observe(time.perf_counter() - started)
+
+
+class ServerStatsCollector:
+    """
+    Exposes the server's cache, queue, batching and load statistics at scrape time.
+    """
+
+    def __init__(self, caches, executors, batchers: dict, model_reloader, breakers: dict):
+        """
+        Args:
+            caches: Returns the caches of the serving ModelHost generation (name -> TTLCache).
+            executors (EndpointExecutors): Thread pools and endpoint limiters.
+            batchers (dict): Endpoint name -> MicroBatcher.
+            model_reloader (ModelReloader): The serving ModelHost generation and reload counts.
+            breakers (dict): Upstream dependency name -> CircuitBreaker.
+        """
+        self.caches = caches
+        self.executors = executors
+        self.batchers = batchers
+        self.model_reloader = model_reloader
+        self.breakers = breakers
+
+    def collect(self):
+        cache_counters = {
+            field: CounterMetricFamily(f"cache_{field}", f"Cache {field.replace('_', ' ')}.", labels=["cache"])
+            for field in ("hits", "stale_hits", "misses", "evictions", "coalesced")
+        }
+        cache_size = GaugeMetricFamily("cache_size", "Entries in the cache.", labels=["cache"])
+        cache_hit_ratio = GaugeMetricFamily("cache_hit_ratio", "Share of lookups served from the cache.",
+                                            labels=["cache"])
+        for name, cache in self.caches().items():
+            stats = cache.stats()
+            for field, metric in cache_counters.items():
+                metric.add_metric([name], stats[field])
+            cache_size.add_metric([name], stats["size"])
+            cache_hit_ratio.add_metric([name], stats["hit_ratio"])
+        yield from cache_counters.values()
+        yield cache_size
+        yield cache_hit_ratio
+
+        queued = GaugeMetricFamily("endpoint_queued", "Calls waiting for an endpoint slot.", labels=["endpoint"])
+        waiting = GaugeMetricFamily("endpoint_waiting_requests",
+                                    "Admitted requests not running yet (limited by max_queue).", labels=["endpoint"])
+        running = GaugeMetricFamily("endpoint_running", "Calls running on the endpoint's thread pool.",
+                                    labels=["endpoint"])
+        wait = CounterMetricFamily("endpoint_wait_seconds", "Time spent waiting for an endpoint slot.",
+                                   labels=["endpoint"])
+        failed = CounterMetricFamily("endpoint_failed", "Calls that raised.", labels=["endpoint"])
+        shed = CounterMetricFamily("endpoint_shed", "Requests rejected with 503 because the queue was full.",
+                                   labels=["endpoint"])
+        for name, stats in self.executors.stats()["endpoints"].items():
+            queued.add_metric([name], stats["queued"])
+            waiting.add_metric([name], stats["waiting_requests"])
+            running.add_metric([name], stats["in_flight"])
+            wait.add_metric([name], stats["wait_seconds_total"])
+            failed.add_metric([name], stats["failed"])
+            shed.add_metric([name], stats["shed"])
+        yield from (queued, waiting, running, wait, failed, shed)
+
+        circuit_state = GaugeMetricFamily("circuit_breaker_state", "1 for the breaker's current state.",
+                                          labels=["dependency", "state"])
+        circuit_counters = {
+            field: CounterMetricFamily(f"circuit_breaker_{field}", description, labels=["dependency"])
+            for field, description in (
+                ("calls", "Calls let through the breaker."),
+                ("failures", "Calls that failed."),
+                ("rejected", "Calls rejected (fallback used) while the breaker was open."),
+                ("opened", "Times the breaker opened."),
+            )
+        }
+        for name, breaker in self.breakers.items():
+            stats = breaker.stats()
+            for state in STATES:
+                circuit_state.add_metric([name, state], 1.0 if stats["state"] == state else 0.0)
+            for field, metric in circuit_counters.items():
+                metric.add_metric([name], stats[field])
+        yield circuit_state
+        yield from circuit_counters.values()
+
+        batches = CounterMetricFamily("microbatch_batches", "Batches dispatched.", labels=["endpoint"])
+        items = CounterMetricFamily("microbatch_items", "Requests dispatched in batches.", labels=["endpoint"])
+        for name, batcher in self.batchers.items():
+            stats = batcher.stats()
+            batches.add_metric([name], stats["batches"])
+            items.add_metric([name], stats["items"])
+        yield from (batches, items)
+
+        warm = GaugeMetricFamily("model_host_subsystem_warm", "1 if the subsystem is loaded.", labels=["subsystem"])
+        for name, state in self.model_reloader.current.subsystem_state.items():
+            warm.add_metric([name], 1.0 if state == "warm" else 0.0)
+        yield warm
+
+        reloads = self.model_reloader.status()
+        yield GaugeMetricFamily("model_host_generation", "ModelHost generation being served (1 until the first reload).",
+                                value=reloads["generation"])
+        reload_count = CounterMetricFamily("model_host_reloads", "Reloads of the models and data.", labels=["result"])
+        reload_count.add_metric(["succeeded"], reloads["succeeded"])
+        reload_count.add_metric(["failed"], reloads["failed"])
+        yield reload_count
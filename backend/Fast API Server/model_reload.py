@@ -0,0 +1,159 @@
+"""
+Hot reload of the models and datasets.
+
+A reload builds a new ModelHost generation next to the serving one, loads all of its
+subsystems and warms its caches, then swaps it in with a single assignment. Requests
+that already hold the old generation finish on it, and it is freed when the last of
+them completes. If the new generation fails to load, the old one keeps serving. Until
+the swap, both generations are held in memory.
+
+A reload is triggered by POST /admin/reload (in the worker that serves the request) or,
+with MODEL_RELOAD_WATCH_SECONDS > 0, by a change to any file under ./models or ./data
+(every worker watches for itself). Files must be unchanged for one more poll interval
+before they are loaded, so that half-copied files are not picked up.
+"""
+
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ReloadInProgress(Exception):
+    """
+    Raised when a reload is requested while another one is running.
+    """
+
+
+def file_signature(directories) -> dict:
+    """
+    Modification time and size of every file under `directories`, by path.
+    """
+    signature = {}
+    for directory in directories:
+        for root, _, files in os.walk(directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    # Removed while walking; the next poll sees the final state.
+                    continue
+                signature[path] = (stat.st_mtime_ns, stat.st_size)
+    return signature
+
+
+class ModelReloader:
+    """
+    Builds, warms and swaps in ModelHost generations.
+    """
+
+    def __init__(self, current, build, install, watch_directories=("./models", "./data")):
+        """
+        Args:
+            current (ModelHost): The serving generation.
+            build: Called with the serving generation; returns a new, loaded and warmed one.
+            install: Called with the new generation to make it the serving one.
+            watch_directories (tuple): Directories whose files make up the models and data.
+        """
+        self.current = current
+        self.generation = 1
+        self.succeeded = 0
+        self.failed = 0
+        self.last_reload = None
+        self._build = build
+        self._install = install
+        self._watch_directories = watch_directories
+        self._signature = file_signature(watch_directories)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def reload(self, reason: str = "manual") -> dict:
+        """
+        Build a new generation and swap it in.
+
+        Returns:
+            dict: The reload's outcome (see `status`).
+
+        Raises:
+            ReloadInProgress: If another reload is running.
+        """
+        if not self._lock.acquire(blocking=False):
+            raise ReloadInProgress("A reload is already in progress.")
+        try:
+            # Files changed from here on trigger another reload.
+            self._signature = file_signature(self._watch_directories)
+            started = time.perf_counter()
+            try:
+                host = self._build(self.current)
+            except Exception as e:
+                self.failed += 1
+                self.last_reload = {
+                    "reason": reason, "succeeded": False, "error": str(e),
+                    "seconds": time.perf_counter() - started, "finished_at": time.time(),
+                }
+                logger.error("[Reload] Generation %s failed to load, keeping generation %s: %s",
+                             self.generation + 1, self.generation, e)
+                raise
+
+            self.current = host
+            self._install(host)
+            self.generation += 1
+            self.succeeded += 1
+            self.last_reload = {
+                "reason": reason, "succeeded": True, "error": None,
+                "seconds": time.perf_counter() - started, "finished_at": time.time(),
+            }
+            logger.warning("[Reload] Generation %s is serving (%s, loaded in %.1fs).",
+                           self.generation, reason, self.last_reload["seconds"])
+        finally:
+            self._lock.release()
+        return self.status()
+
+    def status(self) -> dict:
+        """
+        Serving generation, reload counts and the outcome of the last reload.
+        """
+        return {
+            "generation": self.generation,
+            "reloading": self._lock.locked(),
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "last_reload": self.last_reload,
+        }
+
+    def watch(self, interval_seconds: float):
+        """
+        Reload whenever the watched files change, polling every `interval_seconds` (in a daemon thread).
+        """
+        threading.Thread(
+            target=self._watch, args=(interval_seconds,), name="model-reload-watch", daemon=True
+        ).start()
+
+    def stop(self):
+        """
+        Stop watching for file changes.
+        """
+        self._stop.set()
+
+    def _watch(self, interval_seconds: float):
+        pending = None
+        while not self._stop.wait(interval_seconds):
+            signature = file_signature(self._watch_directories)
+            if signature == self._signature:
+                pending = None
+                continue
+            if signature != pending:
+                # Changed since the last poll: wait until the files are stable.
+                pending = signature
+                continue
+            pending = None
+            try:
+                self.reload("files changed")
+            except ReloadInProgress:
+                pass
+            except Exception:
+                # Logged by `reload`; the same files are not retried until they change again.
+                pass
@@ -0,0 +1,189 @@
+"""
+Prediction cache shared by the workers and replicas of the server.
+
+Every prediction request is snapped to one of the model's sites, so a prediction is
+fully determined by (model version, site, hour, month, day) and the key space is small
+(~827 traffic and ~19 weather sites x 24 hours x 366 days). Predictions are cached
+under that key in two levels:
+
+    - L1: an in-process TTLCache per worker.
+    - L2: Redis (optional, PREDICTION_CACHE_REDIS_URL), shared by every worker and replica.
+      Batches are looked up with one MGET and stored with one pipelined SET.
+
+The model version is a hash of the model, preprocessor, feature table and location
+table files, so a changed model or dataset reads and writes new keys; old keys expire
+after the TTL. Redis is best effort: when it is unreachable, lookups fall through to
+the model and Redis is skipped for REDIS_RETRY_SECONDS.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+
+import numpy as np
+
+from caches import TTLCache
+from forecast_cube import file_sha256
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "prediction"
+REDIS_RETRY_SECONDS = 5.0
+
+
+def model_version(*paths) -> str:
+    """
+    Short hash identifying a model by the contents of its files.
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(file_sha256(path).encode("ascii"))
+    return digest.hexdigest()[:16]
+
+
+def connect_redis(url: str, timeout_seconds: float):
+    """
+    Redis client for `url`, or None if no URL is given or the redis package is missing.
+    """
+    if not url:
+        return None
+    try:
+        import redis
+    except ImportError:
+        logger.warning("[PredictionCache] PREDICTION_CACHE_REDIS_URL is set but the redis package is not "
+                       "installed; only the in-process cache is used.")
+        return None
+    return redis.Redis.from_url(url, socket_timeout=timeout_seconds, socket_connect_timeout=timeout_seconds)
+
+
+class RedisStats:
+    """
+    Hit/miss counters of the Redis level, in the shape of TTLCache.stats().
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": 0, "hits": self.hits, "stale_hits": 0, "misses": self.misses, "evictions": 0,
+            "coalesced": 0, "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class PredictionCache:
+    """
+    Two-level (in-process, then Redis) cache of per-site predictions.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float, redis_client=None):
+        """
+        Args:
+            max_size (int): Entries kept in the in-process cache.
+            ttl_seconds (float): Lifetime of entries in both levels.
+            redis_client: redis.Redis client for the shared level, or None.
+        """
+        self.local = TTLCache(max_size=max_size, ttl=ttl_seconds)
+        self.redis = redis_client
+        self.ttl_seconds = ttl_seconds
+        self.redis_stats = RedisStats()
+        self._redis_retry_at = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def keys(model: str, version: str, sites, hours, months, days) -> list:
+        """
+        Cache keys of per-site predictions.
+        """
+        return [
+            f"{KEY_PREFIX}:{model}:{version}:{site}:{hour}:{month}:{day}"
+            for site, hour, month, day in zip(np.asarray(sites).tolist(), np.asarray(hours).tolist(),
+                                              np.asarray(months).tolist(), np.asarray(days).tolist())
+        ]
+
+    def _redis_available(self) -> bool:
+        return self.redis is not None and time.monotonic() >= self._redis_retry_at
+
+    def _redis_failed(self, e: Exception):
+        with self._lock:
+            self.redis_stats.errors += 1
+            self._redis_retry_at = time.monotonic() + REDIS_RETRY_SECONDS
+        logger.warning("[PredictionCache] Redis unavailable, retrying in %ss: %s", REDIS_RETRY_SECONDS, e)
+
+    def get_many(self, keys: list) -> dict:
+        """
+        Cached predictions for `keys` as {key: np.ndarray} (misses are left out).
+        """
+        found = self.local.get_many(keys)
+        missing = [key for key in keys if key not in found]
+        if not missing or not self._redis_available():
+            return found
+
+        try:
+            values = self.redis.mget(missing)
+        except Exception as e:
+            self._redis_failed(e)
+            return found
+
+        fetched = {key: np.frombuffer(value, dtype="<f8") for key, value in zip(missing, values) if value is not None}
+        with self._lock:
+            self.redis_stats.hits += len(fetched)
+            self.redis_stats.misses += len(missing) - len(fetched)
+        self.local.set_many(fetched)
+        found.update(fetched)
+        return found
+
+    def set_many(self, items: dict):
+        """
+        Store predictions (one 1-d float array per key) in both levels.
+        """
+        items = {key: np.asarray(value, dtype="<f8").reshape(-1) for key, value in items.items()}
+        self.local.set_many(items)
+        if not items or not self._redis_available():
+            return
+
+        try:
+            pipeline = self.redis.pipeline(transaction=False)
+            for key, value in items.items():
+                pipeline.set(key, value.tobytes(), ex=max(1, int(self.ttl_seconds)))
+            pipeline.execute()
+        except Exception as e:
+            self._redis_failed(e)
+
+    def lookup(self, keys: list, compute, multi_output: bool = False) -> np.ndarray:
+        """
+        Predictions for `keys`, computing only the rows whose key is not cached.
+
+        Args:
+            keys (list): One key per row (see `keys`); repeated keys are computed once.
+            compute: Called with the positions of the rows to predict (np.ndarray); returns
+                one prediction (or one row of predictions) per position.
+            multi_output (bool): Whether predictions are rows of several values.
+
+        Returns:
+            np.ndarray: Shape (n,) or (n, n_outputs), in row order.
+        """
+        first_rows = {}
+        for row, key in enumerate(keys):
+            first_rows.setdefault(key, row)
+
+        values = self.get_many(list(first_rows))
+        missing = [key for key in first_rows if key not in values]
+        if missing:
+            computed = np.asarray(compute(np.array([first_rows[key] for key in missing], dtype=np.intp)))
+            new_values = {key: np.reshape(value, -1) for key, value in zip(missing, computed)}
+            self.set_many(new_values)
+            values.update(new_values)
+
+        result = np.stack([values[key] for key in keys]) if keys else np.empty((0, 1))
+        return result if multi_output else result[:, 0]
+
+    def stats(self) -> dict:
+        """
+        In-process cache statistics (TTLCache.stats()).
+        """
+        return self.local.stats()
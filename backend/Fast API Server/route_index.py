@@ -0,0 +1,105 @@
+"""
+Startup-time index of the trash pickup routes and place coordinates.
+
+routes.csv stores every route's stops as a JSON string of {"place", "pickup_time"}
+entries, and the stop coordinates live in place_coordinates.csv. The index parses
+the routes once, resolves every stop to its coordinates and keeps hash lookups by
+route_id and place name, so the request path never scans or parses the CSVs.
+"""
+
+import ast
+import json
+import logging
+from typing import NamedTuple, Optional, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class RouteStop(NamedTuple):
+    """
+    One stop of a route; lat/lon are None if the place has no coordinates.
+    """
+    place: str
+    pickup_time: str
+    lat: Optional[float]
+    lon: Optional[float]
+
+
+class RouteRecord(NamedTuple):
+    """
+    A pickup route with its stops resolved to coordinates.
+    """
+    route_id: str
+    route_name: str
+    county: str
+    pickup_day: str
+    pickup_duration_min: int
+    stops: Tuple[RouteStop, ...]
+
+
+def parse_pickup_times(value):
+    """
+    Parse the place_pickup_times column (JSON, or a Python literal as a fallback).
+    """
+    if not isinstance(value, str):
+        return value
+    try:
+        return json.loads(value)
+    except ValueError:
+        return ast.literal_eval(value)
+
+
+class RouteIndex:
+    """
+    Hash indexes over routes (by route_id) and place coordinates (by place name).
+    """
+
+    def __init__(self, routes_df: pd.DataFrame, coordinates_df: pd.DataFrame):
+        """
+        Args:
+            routes_df (pd.DataFrame): Contents of routes.csv.
+            coordinates_df (pd.DataFrame): Contents of place_coordinates.csv.
+        """
+        # The first row wins for duplicated place names and route ids, as in the original lookups.
+        self.places = {}
+        for place, lat, lon in zip(coordinates_df["Place Name"], coordinates_df["Latitude"],
+                                   coordinates_df["Longitude"]):
+            self.places.setdefault(place, (float(lat), float(lon)))
+
+        self.routes = {}
+        self.unknown_places = set()
+        for row in routes_df.itertuples(index=False):
+            if row.route_id in self.routes:
+                continue
+
+            stops = []
+            for entry in parse_pickup_times(row.place_pickup_times):
+                place = entry.get("place")
+                lat, lon = self.places.get(place, (None, None))
+                if lat is None:
+                    self.unknown_places.add(place)
+                stops.append(RouteStop(place, entry.get("pickup_time"), lat, lon))
+
+            self.routes[row.route_id] = RouteRecord(
+                route_id=row.route_id,
+                route_name=row.route_name,
+                county=row.county,
+                pickup_day=row.pickup_day,
+                pickup_duration_min=int(row.pickup_duration_min),
+                stops=tuple(stops),
+            )
+
+        if self.unknown_places:
+            logger.warning("[Routes] No coordinates for %d places: %s", len(self.unknown_places),
+                           ", ".join(sorted(map(str, self.unknown_places))))
+
+    def route(self, route_id: str) -> RouteRecord:
+        """
+        Look up a route by id (raises ValueError for unknown ids).
+        """
+        record = self.routes.get(route_id)
+        if record is None:
+            raise ValueError(f"No route found with route_id {route_id}.")
+        return record
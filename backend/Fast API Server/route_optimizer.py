@@ -0,0 +1,187 @@
+"""
+Local re-ordering of trash pickup routes.
+
+Stops are re-ordered to minimise a weighted travel cost: the haversine distance of
+every leg, scaled up by the predicted traffic congestion and AQI at both of its ends,
+so the route spends less of its driving near congested or polluted stops. The first
+stop stays first (it is where the route starts); the rest is ordered with a nearest
+neighbour tour improved by 2-opt and Or-opt moves, within a time budget. The published
+order is improved the same way and the cheaper result wins, so the plan is never worse
+than the published route.
+"""
+
+import time
+from typing import NamedTuple
+
+import numpy as np
+
+from spatial_index import EARTH_RADIUS_KM
+
+DEFAULT_TIME_BUDGET_SECONDS = 0.05
+
+# Extra cost per unit of congestion index / per AQI step above 1 (AQI is 1-5).
+CONGESTION_WEIGHT = 0.5
+AQI_WEIGHT = 0.25
+
+
+class RoutePlan(NamedTuple):
+    """
+    Suggested stop order (positions into the input arrays) and its cost against the published order.
+    """
+    order: np.ndarray
+    cost: float
+    original_cost: float
+    distance_km: float
+    original_distance_km: float
+
+
+def distance_matrix(latitudes, longitudes) -> np.ndarray:
+    """
+    Haversine distances in km between all pairs of points, shape (n, n).
+    """
+    lat = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lon = np.radians(np.asarray(longitudes, dtype=np.float64))
+    dlat = lat[:, None] - lat[None, :]
+    dlon = lon[:, None] - lon[None, :]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def cost_matrix(distances: np.ndarray, congestion, aqi,
+                congestion_weight: float = CONGESTION_WEIGHT, aqi_weight: float = AQI_WEIGHT) -> np.ndarray:
+    """
+    Symmetric leg costs: distance times the mean penalty of the two stops.
+    """
+    penalty = (1.0 + congestion_weight * np.maximum(np.asarray(congestion, dtype=np.float64), 0.0)
+               + aqi_weight * np.maximum(np.asarray(aqi, dtype=np.float64) - 1.0, 0.0))
+    return distances * (penalty[:, None] + penalty[None, :]) / 2.0
+
+
+def path_cost(cost: np.ndarray, order) -> float:
+    """
+    Cost of visiting the stops in `order` (an open path).
+    """
+    order = np.asarray(order)
+    return float(cost[order[:-1], order[1:]].sum())
+
+
+def nearest_neighbour_order(cost: np.ndarray) -> np.ndarray:
+    """
+    Greedy tour starting at stop 0.
+    """
+    n = len(cost)
+    order = [0]
+    visited = np.zeros(n, dtype=bool)
+    visited[0] = True
+    for _ in range(n - 1):
+        candidates = np.where(visited, np.inf, cost[order[-1]])
+        nearest = int(np.argmin(candidates))
+        order.append(nearest)
+        visited[nearest] = True
+    return np.array(order)
+
+
+def two_opt(cost: np.ndarray, order: np.ndarray, deadline: float) -> np.ndarray:
+    """
+    Improve an open path by segment reversals (the first stop stays in place) until no
+    reversal helps or `deadline` (a time.perf_counter() value) passes.
+    """
+    order = order.copy()
+    n = len(order)
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for i in range(1, n - 1):
+            # Reversing order[i..j] replaces legs (a, b) and (c, d) with (a, c) and (b, d).
+            a, b = order[i - 1], order[i]
+            c = order[i + 1:]
+            delta = cost[a, c] - cost[a, b]
+            d = order[i + 2:]
+            delta[:-1] += cost[b, d] - cost[c[:-1], d]
+
+            j = int(np.argmin(delta))
+            if delta[j] < -1e-9:
+                order[i:i + j + 2] = order[i:i + j + 2][::-1].copy()
+                improved = True
+    return order
+
+
+def or_opt(cost: np.ndarray, order: np.ndarray, deadline: float, max_segment: int = 3) -> np.ndarray:
+    """
+    Improve an open path by moving segments of up to `max_segment` stops (possibly
+    reversed) elsewhere in the path, until no move helps or `deadline` passes.
+    """
+    order = order.copy()
+    n = len(order)
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for length in range(1, min(max_segment, n - 2) + 1):
+            for i in range(1, n - length + 1):
+                segment = order[i:i + length]
+                first, last = segment[0], segment[-1]
+                before = order[i - 1]
+                removed = cost[before, first]
+                if i + length < n:
+                    after = order[i + length]
+                    removed += cost[last, after] - cost[before, after]
+
+                # Insert after rest[k], keeping or reversing the segment's direction.
+                rest = np.concatenate([order[:i], order[i + length:]])
+                forward, backward = cost[rest, first], cost[rest, last]
+                bridged = cost[rest[:-1], rest[1:]]
+                forward[:-1] += cost[last, rest[1:]] - bridged
+                backward[:-1] += cost[first, rest[1:]] - bridged
+
+                delta = np.minimum(forward, backward) - removed
+                k = int(np.argmin(delta))
+                if delta[k] < -1e-9:
+                    moved = segment if forward[k] <= backward[k] else segment[::-1]
+                    order = np.concatenate([rest[:k + 1], moved, rest[k + 1:]])
+                    improved = True
+    return order
+
+
+def improve(cost: np.ndarray, order: np.ndarray, deadline: float) -> np.ndarray:
+    """
+    Alternate 2-opt and Or-opt until neither improves the path or `deadline` passes.
+    """
+    current = path_cost(cost, order)
+    while time.perf_counter() < deadline:
+        order = or_opt(cost, two_opt(cost, order, deadline), deadline)
+        improved = path_cost(cost, order)
+        if improved >= current - 1e-9:
+            break
+        current = improved
+    return order
+
+
+def plan_route(latitudes, longitudes, congestion, aqi,
+               time_budget_seconds: float = DEFAULT_TIME_BUDGET_SECONDS) -> RoutePlan:
+    """
+    Re-order a route's stops (given in published order) by weighted travel cost.
+
+    Args:
+        latitudes, longitudes (array-like): Stop coordinates.
+        congestion (array-like): Predicted congestion index per stop.
+        aqi (array-like): AQI per stop.
+        time_budget_seconds (float): Time allowed for the improvement moves.
+
+    Returns:
+        RoutePlan: The suggested order and its cost against the published order.
+    """
+    distances = distance_matrix(latitudes, longitudes)
+    cost = cost_matrix(distances, congestion, aqi)
+    original = np.arange(len(cost))
+    original_cost, original_distance = path_cost(cost, original), path_cost(distances, original)
+    if len(cost) < 3:
+        # With the first stop fixed there is nothing to re-order.
+        return RoutePlan(original, original_cost, original_cost, original_distance, original_distance)
+
+    deadline = time.perf_counter() + time_budget_seconds
+    candidates = [improve(cost, nearest_neighbour_order(cost), deadline), improve(cost, original, deadline)]
+    order = min(candidates, key=lambda candidate: path_cost(cost, candidate))
+    if path_cost(cost, order) >= original_cost:
+        order = original
+
+    return RoutePlan(order, path_cost(cost, order), original_cost, path_cost(distances, order), original_distance)
@@ -0,0 +1,106 @@
+"""
+Pickup schedules of the trash routes as model inputs.
+
+Every route in routes.csv has a pickup day and a pickup time per stop. A schedule
+resolves them to concrete timestamps (the next date falling on the pickup day), and
+also shifts the whole route by a range of start offsets (by default -2 h to +2 h in
+15-minute steps) so that the least congested departure window can be picked. All
+stops x offsets become one array of (hour, day, month) inputs for a single batch
+prediction.
+
+The traffic model works at hour resolution, so offsets only change a stop's
+prediction when they move it into another hour.
+"""
+
+import datetime
+from typing import NamedTuple
+
+import numpy as np
+
+WEEKDAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+DEFAULT_WINDOW_MINUTES = 120
+DEFAULT_STEP_MINUTES = 15
+MAX_WINDOW_MINUTES = 12 * 60
+
+
+class RouteSchedule(NamedTuple):
+    """
+    Predicted congestion of a route's stops for every start offset.
+
+    `times` and `congestion` have shape (n_offsets, n_stops); row `scheduled` is the
+    published schedule (offset 0) and row `best` the least congested start.
+    """
+    date: datetime.date
+    offsets_minutes: np.ndarray
+    times: np.ndarray
+    congestion: np.ndarray
+    scheduled: int
+    best: int
+
+
+def start_offsets(window_minutes: int = DEFAULT_WINDOW_MINUTES, step_minutes: int = DEFAULT_STEP_MINUTES):
+    """
+    Start offsets in minutes from -window to +window in `step_minutes` steps (always including 0).
+    """
+    if not 0 <= window_minutes <= MAX_WINDOW_MINUTES or step_minutes <= 0:
+        raise ValueError(f"window_minutes must be between 0 and {MAX_WINDOW_MINUTES} "
+                         f"and step_minutes must be positive.")
+    steps = window_minutes // step_minutes
+    return np.arange(-steps, steps + 1) * step_minutes
+
+
+def pickup_date(pickup_day: str, today: datetime.date = None) -> datetime.date:
+    """
+    The next date (today included) falling on `pickup_day`, e.g. "Thursday".
+    """
+    if pickup_day not in WEEKDAYS:
+        raise ValueError(f"Unknown pickup day {pickup_day}.")
+    today = today or datetime.date.today()
+    return today + datetime.timedelta(days=(WEEKDAYS.index(pickup_day) - today.weekday()) % 7)
+
+
+def minutes_of_day(pickup_time: str) -> int:
+    """
+    Minutes since midnight of an "HH:MM" pickup time.
+    """
+    try:
+        hours, minutes = (int(part) for part in str(pickup_time).split(":"))
+    except ValueError:
+        raise ValueError(f"Invalid pickup time {pickup_time}.")
+    if not (0 <= hours < 24 and 0 <= minutes < 60):
+        raise ValueError(f"Invalid pickup time {pickup_time}.")
+    return hours * 60 + minutes
+
+
+def schedule_times(date: datetime.date, pickup_times, offsets_minutes) -> np.ndarray:
+    """
+    Timestamps of every stop for every start offset.
+
+    Returns:
+        np.ndarray: datetime64[m] array of shape (n_offsets, n_stops).
+    """
+    stop_minutes = np.array([minutes_of_day(time) for time in pickup_times], dtype="timedelta64[m]")
+    offsets = np.asarray(offsets_minutes).astype("timedelta64[m]")
+    return np.datetime64(date, "m") + stop_minutes[None, :] + offsets[:, None]
+
+
+def time_features(times: np.ndarray):
+    """
+    (hours, months, days) model inputs of datetime64[m] timestamps.
+    """
+    dates = times.astype("datetime64[D]")
+    month_starts = times.astype("datetime64[M]")
+    hours = (times - dates).astype("timedelta64[h]").astype(int)
+    months = month_starts.astype(int) % 12 + 1
+    days = (dates - month_starts).astype(int) + 1
+    return hours, months, days
+
+
+def best_offset(congestion: np.ndarray, offsets_minutes) -> int:
+    """
+    Row of the offset with the lowest mean congestion (ties go to the smallest shift).
+    """
+    mean = congestion.mean(axis=1)
+    candidates = np.flatnonzero(np.isclose(mean, mean.min()))
+    return int(candidates[np.argmin(np.abs(np.asarray(offsets_minutes)[candidates]))])
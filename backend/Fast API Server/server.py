@@ -9,29 +9,151 @@ This module defines:
        - /predict/weatherPred for weather predictions (temperature, humidity, wind speed, pressure).
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query, Response
 import uvicorn
 from pydantic import BaseModel
+from typing import Dict, List, Optional
 import pandas as pd
-import joblib
-from geopy.distance import geodesic
 import requests
 import numpy as np
-from openai import OpenAI
 import json
 from dotenv import load_dotenv
 import os
 from fastapi.middleware.cors import CORSMiddleware
+import asyncio
 import datetime
-import ast
-
+import hashlib
+import hmac
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+
+from batching import MicroBatcher
+from caches import TTLCache
+from circuit_breaker import CircuitBreaker, CircuitOpen, failure_log_level
+from executors import AdmissionMiddleware, EndpointExecutors
+from feature_store import SiteFeatureStore
+from fleet_planning import DEFAULT_TOTAL_BUSES, apportion, fleet_demand, scenario_allocations, variability
+from forecast_cube import DEFAULT_CUBE_PATH, ForecastCube, day_of_year
+from heatmap import (FORMATS, Heatmap, InvalidHeatmapRequest, check_time_slice, encode_grid, encode_sites,
+                     parse_bbox, rasterize)
+from memory_stats import worker_memory_report
+from metrics import MetricsMiddleware, metrics_response, register_server_stats, stage
+from model_reload import ModelReloader, ReloadInProgress
+from prediction_cache import PredictionCache, connect_redis, model_version
+from route_index import RouteIndex, RouteRecord
+from route_optimizer import plan_route
+from route_schedule import (DEFAULT_STEP_MINUTES, DEFAULT_WINDOW_MINUTES, RouteSchedule, best_offset, pickup_date,
+                            schedule_times, start_offsets, time_features)
+from spatial_index import SpatialIndex
+from streaming import stream_events
+from tree_inference import inference_model
+from weather_forecast import columnar, forecast_times
 
 load_dotenv()
 
+# Log level of the server's own messages (per-request details are logged at DEBUG).
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "WARNING").upper(),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+)
+logger = logging.getLogger("server")
+
 # Store the OpenRouter API key in a variable – use the same key name as in your .env file
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 AQI_API_KEY = os.getenv("AQI_API_KEY")
 
+# Per-call timeout (seconds) for OpenWeatherMap requests and the number of route stops
+# looked up concurrently (also the size of the pooled HTTP connection pool).
+AQI_TIMEOUT_SECONDS = float(os.getenv("AQI_TIMEOUT_SECONDS", "5"))
+ROUTE_STOP_CONCURRENCY = int(os.getenv("ROUTE_STOP_CONCURRENCY", "8"))
+AQI_API_URL_TEMPLATE = os.getenv(
+    "AQI_API_URL_TEMPLATE",
+    "http://api.openweathermap.org/data/2.5/air_pollution?lat={lat}&lon={lon}&appid={api_key}"
+)
+
+# Air-quality cache: AQI is cached per grid cell of AQI_CACHE_CELL_DEGREES, served fresh
+# for AQI_CACHE_TTL_SECONDS and then stale (while refreshing) for AQI_CACHE_STALE_SECONDS.
+AQI_CACHE_CELL_DEGREES = float(os.getenv("AQI_CACHE_CELL_DEGREES", "0.05"))
+AQI_CACHE_TTL_SECONDS = float(os.getenv("AQI_CACHE_TTL_SECONDS", "900"))
+AQI_CACHE_STALE_SECONDS = float(os.getenv("AQI_CACHE_STALE_SECONDS", "3600"))
+AQI_CACHE_MAX_SIZE = int(os.getenv("AQI_CACHE_MAX_SIZE", "4096"))
+
+# OpenRouter chat completions are cached per (model, prompt) for LLM_CACHE_TTL_SECONDS.
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "3600"))
+LLM_CACHE_MAX_SIZE = int(os.getenv("LLM_CACHE_MAX_SIZE", "256"))
+# Deadline of an OpenRouter call (also the longest wait between streamed chunks), total
+# deadline of a streamed completion, and retries of failed calls.
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "20"))
+LLM_STREAM_DEADLINE_SECONDS = float(os.getenv("LLM_STREAM_DEADLINE_SECONDS", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "0"))
+
+# Circuit breakers for OpenWeatherMap and OpenRouter (see circuit_breaker.py): open after
+# CIRCUIT_FAILURE_THRESHOLD consecutive failures, retry after CIRCUIT_RESET_SECONDS. While
+# open, AQI falls back to 1 and narratives to their templated text.
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+
+# Thread pools for blocking handler work: "predict" for model inference, "upstream" for
+# handlers that wait on OpenWeatherMap/OpenRouter. Per-endpoint limits cap how many calls
+# of each endpoint run at once; the rest queue on the event loop.
+PREDICT_POOL_WORKERS = int(os.getenv("PREDICT_POOL_WORKERS", str(os.cpu_count() or 4)))
+UPSTREAM_POOL_WORKERS = int(os.getenv("UPSTREAM_POOL_WORKERS", "32"))
+PREDICT_CONCURRENCY = int(os.getenv("PREDICT_CONCURRENCY", "64"))
+RECOMMEND_CONCURRENCY = int(os.getenv("RECOMMEND_CONCURRENCY", "16"))
+# Waiting requests per endpoint at which new requests get 503 (see executors.AdmissionMiddleware).
+PREDICT_MAX_QUEUE = int(os.getenv("PREDICT_MAX_QUEUE", "256"))
+RECOMMEND_MAX_QUEUE = int(os.getenv("RECOMMEND_MAX_QUEUE", "64"))
+
+# Micro-batching of concurrent single-point predictions (see batching.py).
+MICROBATCH_ENABLED = os.getenv("MICROBATCH_ENABLED", "true").lower() in ("1", "true", "yes")
+MICROBATCH_MAX_SIZE = int(os.getenv("MICROBATCH_MAX_SIZE", "64"))
+MICROBATCH_MAX_WAIT_MS = float(os.getenv("MICROBATCH_MAX_WAIT_MS", "2"))
+
+# Precomputed congestion predictions (see forecast_cube.py); live inference is used when absent.
+TRAFFIC_FORECAST_CUBE = os.getenv("TRAFFIC_FORECAST_CUBE", DEFAULT_CUBE_PATH)
+# Congestion heatmaps are cached per (time slice, bbox, grid, format) for HEATMAP_CACHE_TTL_SECONDS;
+# grids are limited to HEATMAP_MAX_GRID_CELLS cells.
+HEATMAP_CACHE_TTL_SECONDS = float(os.getenv("HEATMAP_CACHE_TTL_SECONDS", "3600"))
+HEATMAP_CACHE_MAX_SIZE = int(os.getenv("HEATMAP_CACHE_MAX_SIZE", "512"))
+HEATMAP_MAX_GRID_CELLS = int(os.getenv("HEATMAP_MAX_GRID_CELLS", "65536"))
+
+# Time allowed for re-ordering a trash pickup route (see route_optimizer.py), and whether
+# /recommend/trashpickup asks the LLM for a narrative by default (otherwise the
+# recommendation is a templated summary of the plan).
+ROUTE_OPTIMIZER_BUDGET_MS = float(os.getenv("ROUTE_OPTIMIZER_BUDGET_MS", "50"))
+TRASH_PICKUP_NARRATIVE = os.getenv("TRASH_PICKUP_NARRATIVE", "false").lower() in ("1", "true", "yes")
+# Per-site prediction cache (see prediction_cache.py): PREDICTION_CACHE_MAX_SIZE entries per
+# worker, shared across workers and replicas through Redis when PREDICTION_CACHE_REDIS_URL is set.
+PREDICTION_CACHE_ENABLED = os.getenv("PREDICTION_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+PREDICTION_CACHE_MAX_SIZE = int(os.getenv("PREDICTION_CACHE_MAX_SIZE", "100000"))
+PREDICTION_CACHE_TTL_SECONDS = float(os.getenv("PREDICTION_CACHE_TTL_SECONDS", "86400"))
+PREDICTION_CACHE_REDIS_URL = os.getenv("PREDICTION_CACHE_REDIS_URL")
+PREDICTION_CACHE_REDIS_TIMEOUT_SECONDS = float(os.getenv("PREDICTION_CACHE_REDIS_TIMEOUT_SECONDS", "0.1"))
+# Longest horizon of /predict/weatherPred/forecast.
+WEATHER_FORECAST_MAX_HOURS = int(os.getenv("WEATHER_FORECAST_MAX_HOURS", "336"))
+# Largest fleet scenario grid (totals x growth scenarios x seeds x months x operators) per request.
+FLEET_SCENARIO_MAX_CELLS = int(os.getenv("FLEET_SCENARIO_MAX_CELLS", "1000000"))
+# Hot reload of the models and data (see model_reload.py): poll ./models and ./data every
+# MODEL_RELOAD_WATCH_SECONDS (0 disables), and the token POST /admin/reload requires
+# (the endpoint is disabled without one).
+MODEL_RELOAD_WATCH_SECONDS = float(os.getenv("MODEL_RELOAD_WATCH_SECONDS", "0"))
+MODEL_RELOAD_TOKEN = os.getenv("MODEL_RELOAD_TOKEN")
+
+# "native" calls the LightGBM/XGBoost boosters directly, "sklearn" the pickled wrappers' predict
+# (see tree_inference.py).
+INFERENCE_ENGINE = os.getenv("INFERENCE_ENGINE", "native").lower()
+# Load models and datasets on first use / in a background warm-up instead of at import.
+SERVER_LAZY_LOAD = os.getenv("SERVER_LAZY_LOAD", "true").lower() == "true"
+# Background warm-up order: the pandas-only subsystems first, so that the readiness probe
+# (/ready?require=fleet,trash) passes within a second of startup; traffic and weather
+# import sklearn/lightgbm to unpickle their models (~1.3 s). Requests that need them
+# before they are warm wait for the load.
+WARM_UP_ORDER = ("fleet", "trash", "traffic", "weather")
+
 class CongestionRequest(BaseModel):
     """
     Schema for incoming JSON requests (traffic congestion).
@@ -67,24 +189,216 @@ class WeatherRequest(BaseModel):
     month: int
     day: int
 
+class CongestionBatchRequest(BaseModel):
+    """
+    Schema for batch traffic congestion requests.
+
+    Attributes:
+        points (List[CongestionRequest]): Locations and times, predicted in order.
+    """
+    points: List[CongestionRequest]
+
+
+class WeatherBatchRequest(BaseModel):
+    """
+    Schema for batch weather prediction requests.
+
+    Attributes:
+        points (List[WeatherRequest]): Locations and times, predicted in order.
+    """
+    points: List[WeatherRequest]
+
+class WeatherForecastRequest(BaseModel):
+    """
+    Schema for multi-hour weather forecasts (see weather_forecast.py).
+
+    Attributes:
+        latitude  (float):    Latitude of the location.
+        longitude (float):    Longitude of the location.
+        start     (datetime): First hour of the forecast (default: the current hour).
+        hours     (int):      Horizon in hours (default 24), or
+        end       (datetime): Last hour of the forecast (inclusive).
+        step_hours (int):     Hours between forecast times.
+    """
+    latitude: float
+    longitude: float
+    start: Optional[datetime.datetime] = None
+    hours: Optional[int] = None
+    end: Optional[datetime.datetime] = None
+    step_hours: int = 1
+
 class FleetRequest(BaseModel):
     month: int
+    total_buses: Optional[int] = None
+
+class FleetScenarioRequest(BaseModel):
+    totals: List[int] = [DEFAULT_TOTAL_BUSES]
+    # Variability seeds; null is the published month-seeded variability.
+    seeds: List[Optional[int]] = [None]
+    # Passenger growth per scenario, by operator ('Bus City Services'); e.g. {"Dublin Bus": 0.05}.
+    growth: List[Dict[str, float]] = [{}]
+    months: Optional[List[int]] = None
 
 class AQIandTrafficCongestion(BaseModel):
     place: str
 
 class TrashPickupRecommendation(BaseModel):
     route_id: str
+    narrative: Optional[bool] = None
+
+class RouteScheduleRequest(BaseModel):
+    """
+    Schema for scheduled congestion of a trash pickup route.
+
+    Attributes:
+        route_id (str): Route to evaluate.
+        date (datetime.date): Pickup date (default: the next date on the route's pickup day).
+        window_minutes (int): Largest start shift scanned, earlier and later.
+        step_minutes (int): Step between scanned start shifts.
+    """
+    route_id: str
+    date: Optional[datetime.date] = None
+    window_minutes: int = DEFAULT_WINDOW_MINUTES
+    step_minutes: int = DEFAULT_STEP_MINUTES
 
 class ModelHost:
     """
     Encapsulates model loading, data loading, and inference logic.
     """
 
-    def __init__(self):
+    # Attributes provided by each lazily loaded subsystem (see `load_subsystem`).
+    SUBSYSTEMS = {
+        "traffic": (
+            "traffic_congestion_model", "traffic_congestion_predictor", "traffic_congestion_preprocessor",
+            "traffic_model_version", "traffic_dataset",
+            "traffic_location_df", "traffic_location_index", "traffic_feature_store", "traffic_forecast_cube",
+        ),
+        "weather": (
+            "weather_prediction_model", "weather_prediction_predictor", "weather_prediction_preprocessor",
+            "weather_model_version", "weather_dataset",
+            "weather_location_df", "weather_location_index", "weather_feature_store",
+        ),
+        "fleet": (
+            "fleet_df", "fleet_months", "fleet_cities", "fleet_demand_matrix", "fleet_varied_demand",
+            "fleet_recommendations",
+        ),
+        "trash": (
+            "trashpickuproutes", "trashpickupcoordinates", "route_index",
+        ),
+    }
+    ATTRIBUTE_SUBSYSTEMS = {
+        attribute: subsystem for subsystem, attributes in SUBSYSTEMS.items() for attribute in attributes
+    }
+
+    def __init__(self, lazy: bool = False, shared: "ModelHost" = None):
         """
         Initialize the ModelHost by loading the trained models, preprocessors, and supporting data.
+
+        Args:
+            lazy (bool): Defer loading each subsystem (traffic, weather, fleet, trash) until
+                it is first used or `warm_up` is called.
+            shared (ModelHost): Generation this one replaces (see model_reload.py); its HTTP
+                session, route lookup pool, LLM client, circuit breakers and AQI, LLM and
+                prediction caches are reused, as none of them depend on the models or data.
+        """
+        self.subsystem_state = {name: "cold" for name in self.SUBSYSTEMS}
+        self.inference_engine = INFERENCE_ENGINE
+        self._subsystem_locks = {name: threading.Lock() for name in self.SUBSYSTEMS}
+
+        self.AQI_API_URL_TEMPLATE = AQI_API_URL_TEMPLATE
+
+        # Heatmaps are computed from the models, so every generation has its own.
+        self.heatmap_cache = TTLCache(max_size=HEATMAP_CACHE_MAX_SIZE, ttl=HEATMAP_CACHE_TTL_SECONDS)
+        if shared is not None:
+            for attribute in ("http_session", "route_stop_executor", "aqi_cache", "_llm_client",
+                              "_llm_client_lock", "llm_cache", "prediction_cache", "aqi_breaker", "llm_breaker"):
+                setattr(self, attribute, getattr(shared, attribute))
+            if not lazy:
+                self.warm_up()
+            return
+
+        # One pooled HTTP session and a bounded pool of workers shared by all route lookups.
+        self.http_session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=ROUTE_STOP_CONCURRENCY, pool_maxsize=ROUTE_STOP_CONCURRENCY)
+        self.http_session.mount("http://", adapter)
+        self.http_session.mount("https://", adapter)
+        self.route_stop_executor = ThreadPoolExecutor(
+            max_workers=ROUTE_STOP_CONCURRENCY, thread_name_prefix="route-stop"
+        )
+        self.aqi_cache = TTLCache(
+            max_size=AQI_CACHE_MAX_SIZE,
+            ttl=AQI_CACHE_TTL_SECONDS,
+            stale_ttl=AQI_CACHE_STALE_SECONDS,
+            executor=ThreadPoolExecutor(max_workers=2, thread_name_prefix="aqi-refresh"),
+        )
+        self.aqi_breaker = CircuitBreaker("OpenWeatherMap", CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_SECONDS)
+        self.llm_breaker = CircuitBreaker("OpenRouter", CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_SECONDS)
+
+        # One OpenRouter client for the process (created on first use) and a response cache.
+        self._llm_client = None
+        self._llm_client_lock = threading.Lock()
+        self.llm_cache = TTLCache(max_size=LLM_CACHE_MAX_SIZE, ttl=LLM_CACHE_TTL_SECONDS)
+        self.prediction_cache = PredictionCache(
+            max_size=PREDICTION_CACHE_MAX_SIZE,
+            ttl_seconds=PREDICTION_CACHE_TTL_SECONDS,
+            redis_client=connect_redis(PREDICTION_CACHE_REDIS_URL, PREDICTION_CACHE_REDIS_TIMEOUT_SECONDS),
+        ) if PREDICTION_CACHE_ENABLED else None
+
+        if not lazy:
+            self.warm_up()
+
+    def __getattr__(self, name):
+        """
+        Load the subsystem that provides `name` on first access (lazy mode).
         """
+        subsystem = ModelHost.ATTRIBUTE_SUBSYSTEMS.get(name)
+        if subsystem is None or "_subsystem_locks" not in self.__dict__:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+        self.load_subsystem(subsystem)
+        return self.__dict__[name]
+
+    def load_subsystem(self, name: str):
+        """
+        Load one subsystem (once; concurrent callers wait for the same load).
+        """
+        if self.subsystem_state[name] == "warm":
+            return
+        with self._subsystem_locks[name]:
+            if self.subsystem_state[name] == "warm":
+                return
+            self.subsystem_state[name] = "loading"
+            try:
+                getattr(self, f"_load_{name}")()
+            except Exception:
+                self.subsystem_state[name] = "failed"
+                raise
+            self.subsystem_state[name] = "warm"
+
+    def warm_up(self):
+        """
+        Load every subsystem that is not loaded yet.
+        """
+        for name in self.SUBSYSTEMS:
+            self.load_subsystem(name)
+
+    def warm_caches(self, now: datetime.datetime = None):
+        """
+        Predict every traffic and weather site for the current hour (through the prediction
+        cache) and build its congestion heatmap, so that the first requests after a reload
+        find the models and caches warm.
+        """
+        now = now or datetime.datetime.now()
+        self.get_congestion_heatmap(now.hour, now.month, now.day)
+        for model, location_index in (("traffic", self.traffic_location_index),
+                                      ("weather", self.weather_location_index)):
+            n_sites = len(location_index)
+            self.predict_sites(model, np.arange(n_sites), np.full(n_sites, now.hour),
+                               np.full(n_sites, now.month), np.full(n_sites, now.day))
+
+    def _load_weather(self):
+        # Imported here: joblib (and the sklearn/lightgbm modules the models unpickle) is
+        # the slowest part of importing the server.
+        import joblib
 
         # ---------------------------
         # Weather Prediction Setup
@@ -95,8 +409,19 @@ class ModelHost:
         self.weather_prediction_preprocessor = joblib.load(
             "./models/weather_pred/preprocessor.joblib"
         )
+        self.weather_prediction_predictor = inference_model(self.weather_prediction_model, self.inference_engine)
+        self.weather_model_version = model_version(
+            "./models/weather_pred/model.joblib", "./models/weather_pred/preprocessor.joblib",
+            "./data/weather_pred/Additional Features.csv",
+            "./data/weather_pred/Final_lat_long.csv"
+        )
         self.weather_dataset = pd.read_csv("./data/weather_pred/Additional Features.csv")
         self.weather_location_df = pd.read_csv("./data/weather_pred/Final_lat_long.csv")
+        self.weather_location_index = SpatialIndex(self.weather_location_df)
+        self.weather_feature_store = SiteFeatureStore(self.weather_dataset, self.weather_prediction_preprocessor)
+
+    def _load_traffic(self):
+        import joblib
 
         # ---------------------------
         # Traffic Congestion Setup
@@ -107,24 +432,41 @@ class ModelHost:
         self.traffic_congestion_preprocessor = joblib.load(
             "./models/traffic_congestion/preprocessor.joblib"
         )
+        self.traffic_congestion_predictor = inference_model(self.traffic_congestion_model, self.inference_engine)
+        self.traffic_model_version = model_version(
+            "./models/traffic_congestion/model.joblib", "./models/traffic_congestion/preprocessor.joblib",
+            "./data/traffic_congestion/Additional Features Final v1.csv",
+            "./data/traffic_congestion/Final Lat Longl v1.csv"
+        )
         self.traffic_dataset = pd.read_csv("./data/traffic_congestion/Additional Features Final v1.csv")
         self.traffic_location_df = pd.read_csv("./data/traffic_congestion/Final Lat Longl v1.csv")
+        self.traffic_location_index = SpatialIndex(self.traffic_location_df)
+        self.traffic_feature_store = SiteFeatureStore(self.traffic_dataset, self.traffic_congestion_preprocessor)
+        self.traffic_forecast_cube = ForecastCube.load(
+            TRAFFIC_FORECAST_CUBE, self.traffic_model_version,
+            self.traffic_location_index.lats, self.traffic_location_index.longs
+        )
 
-        
+    def _load_fleet(self):
         # ---------------------------
         # Fleet Recommendation Setup
         # ---------------------------
         self.fleet_df = pd.read_csv("./data/fleet_recommendation/Monthly_Data.csv")
         self.fleet_df['Passenger-to-Bus Ratio'] = self.fleet_df['Number of passengers'] / self.fleet_df['Number of buses']
 
+        # Varied bus demand for every month and operator, and the default recommendations
+        # for all twelve months, computed in one pass.
+        self.fleet_months, self.fleet_cities, self.fleet_demand_matrix = fleet_demand(self.fleet_df)
+        self.fleet_varied_demand = self.fleet_demand_matrix * variability(self.fleet_months, self.fleet_demand_matrix)
+        self.fleet_recommendations = apportion(self.fleet_varied_demand, DEFAULT_TOTAL_BUSES)
+
+    def _load_trash(self):
         # ---------------------------
         # Trash Pickup Recommendation Setup
         # ---------------------------
         self.trashpickuproutes = pd.read_csv("./data/trash_pickup_recommendation/routes.csv")
         self.trashpickupcoordinates = pd.read_csv("./data/trash_pickup_recommendation/place_coordinates.csv")
-        self.TRAFFIC_API_URL = "http://127.0.0.1/predict/trafficCongestion"
-        self.AQI_API_URL_TEMPLATE = "http://api.openweathermap.org/data/2.5/air_pollution?lat={lat}&lon={lon}&appid={api_key}"
-
+        self.route_index = RouteIndex(self.trashpickuproutes, self.trashpickupcoordinates)
 
     def get_params(self, query_params: dict):
         """
@@ -147,45 +489,110 @@ class ModelHost:
     def get_fleet_recommendation_params(self, query_params: dict):
 
         month = int(query_params["month"])
+        if not 1 <= month <= 12:
+            raise ValueError(f"month must be between 1 and 12, got {month}.")
+        total_buses = query_params.get("total_buses")
+        total_buses = DEFAULT_TOTAL_BUSES if total_buses is None else int(total_buses)
+        if total_buses < 0:
+            raise ValueError("total_buses must not be negative.")
 
-        return month
-    
-    def get_recommendations(self, month):
-        month_data = self.fleet_df[self.fleet_df['Month'] == month]
-        
-        city_day_ratios = month_data.groupby(['Bus City Services', 'Day of Week'])['Passenger-to-Bus Ratio'].mean().reset_index()
-        city_day_totals = month_data.groupby(['Bus City Services', 'Day of Week'])['Number of passengers'].sum().reset_index()
-        
-        city_day_recommendations = pd.merge(city_day_ratios, city_day_totals, on=['Bus City Services', 'Day of Week'])
-        
-        city_day_recommendations['Recommended Buses'] = city_day_recommendations['Number of passengers'] / city_day_recommendations['Passenger-to-Bus Ratio']
-        
-        city_totals = city_day_recommendations.groupby('Bus City Services')['Recommended Buses'].sum().reset_index()
+        return month, total_buses
 
-        np.random.seed(month)  # Ensure consistency for each month
-        variability_factor = np.random.uniform(0.9, 1.1, size=city_totals.shape[0])  # Random variability between 90% and 110%
-        city_totals['Varied Recommended Buses'] = city_totals['Recommended Buses'] * variability_factor
-        
-        total_recommended_buses = city_totals['Varied Recommended Buses'].sum()
-        scaling_factor = 711 / total_recommended_buses
-        city_totals['Scaled Recommended Buses'] = city_totals['Varied Recommended Buses'] * scaling_factor
-        
-        city_totals['Scaled Recommended Buses'] = city_totals['Scaled Recommended Buses'].round().astype(int)
-        
-        remainder = 711 - city_totals['Scaled Recommended Buses'].sum()
-        
-        while remainder != 0:
-            if remainder > 0:
-                city_totals.loc[city_totals['Varied Recommended Buses'].idxmax(), 'Scaled Recommended Buses'] += 1
-                remainder -= 1
-            elif remainder < 0:
-                city_totals.loc[city_totals['Varied Recommended Buses'].idxmin(), 'Scaled Recommended Buses'] -= 1
-                remainder += 1
-
-        return city_totals[['Bus City Services', 'Scaled Recommended Buses']]
-    
+    def get_recommendations(self, month, total_buses=DEFAULT_TOTAL_BUSES):
+        """
+        Recommended buses per operator for a month.
+
+        The default total is served from the table precomputed at startup; other totals
+        are apportioned from the same varied demand with the largest-remainder method.
+
+        Args:
+            month (int): Month (1-12).
+            total_buses (int): Total fleet size to split between operators.
+
+        Returns:
+            pd.DataFrame: Columns 'Bus City Services' and 'Scaled Recommended Buses'.
+        """
+        rows = np.flatnonzero(self.fleet_months == month)
+        if len(rows) == 0:
+            raise ValueError(f"No fleet data found for month {month}.")
+        row = rows[0]
+
+        if total_buses == DEFAULT_TOTAL_BUSES:
+            buses = self.fleet_recommendations[row]
+        else:
+            buses = apportion(self.fleet_varied_demand[row], total_buses)
+
+        present = ~np.isnan(self.fleet_varied_demand[row])
+        return pd.DataFrame({
+            'Bus City Services': self.fleet_cities[present],
+            'Scaled Recommended Buses': buses[present],
+        })
+
+    def get_fleet_scenarios(self, totals: list, seeds: list, growth: list, months: list = None) -> bytes:
+        """
+        Recommended buses for every month under a grid of what-if scenarios.
+
+        All combinations are evaluated in one broadcast over the monthly demand matrix.
+        With seed None, no growth and the default total, the result matches the published
+        recommendations.
+
+        Args:
+            totals (list): Fleet totals.
+            seeds (list): Variability seeds (None for the published variability).
+            growth (list): Passenger growth scenarios, each {operator: growth} (0.05 for +5%);
+                operators left out do not grow.
+            months (list): Months to evaluate (default: all).
 
-    def generate_dialogue_recommendations(self, recommendations, month_input): 
+        Returns:
+            bytes: JSON with the axes ("total", "growth", "seed", "month", "operator"), their
+            values, the "shape" and the row-major "buses" matrix (0 where an operator has
+            no data for the month).
+        """
+        if not (totals and seeds and growth):
+            raise ValueError("totals, seeds and growth must not be empty.")
+        if min(totals) < 0:
+            raise ValueError("Totals must not be negative.")
+
+        if months is None:
+            rows = np.arange(len(self.fleet_months))
+        else:
+            missing = sorted(set(months) - set(self.fleet_months.tolist()))
+            if missing:
+                raise ValueError(f"No fleet data found for months {missing}.")
+            rows = np.array([np.flatnonzero(self.fleet_months == month)[0] for month in months])
+
+        operators = {operator: column for column, operator in enumerate(self.fleet_cities.tolist())}
+        growth_matrix = np.zeros((len(growth), len(operators)))
+        for scenario, rates in enumerate(growth):
+            unknown = sorted(set(rates) - set(operators))
+            if unknown:
+                raise ValueError(f"Unknown operators {unknown}; expected some of {list(operators)}.")
+            for operator, rate in rates.items():
+                if rate <= -1:
+                    raise ValueError("Passenger growth must be greater than -1 (-100%).")
+                growth_matrix[scenario, operators[operator]] = rate
+
+        shape = (len(totals), len(growth), len(seeds), len(rows), len(operators))
+        if np.prod(shape) > FLEET_SCENARIO_MAX_CELLS:
+            raise ValueError(f"The scenario grid has {int(np.prod(shape))} cells; at most "
+                             f"{FLEET_SCENARIO_MAX_CELLS} are allowed.")
+
+        demand = self.fleet_demand_matrix[rows]
+        fleet_months = self.fleet_months[rows]
+        factors = np.stack([variability(fleet_months, demand, seed) for seed in seeds])
+        buses = scenario_allocations(demand, factors, growth_matrix, totals)
+
+        return json.dumps({
+            "axes": ["total", "growth", "seed", "month", "operator"],
+            "totals": list(totals), "growth": list(growth), "seeds": list(seeds),
+            "months": fleet_months.tolist(), "operators": list(operators),
+            "shape": list(shape), "buses": buses.ravel().tolist(),
+        }, separators=(",", ":")).encode("utf-8")
+
+    def fleet_size_prompt(self, recommendations, month_input):
+        """
+        Chat completion arguments (model, extra_body, messages) for the fleet size dialogue.
+        """
         # List of month names to map month numbers
         month_names = [
             'January', 'February', 'March', 'April', 'May', 'June', 
@@ -198,13 +605,7 @@ class ModelHost:
         dialogue = f"Based on your input for month {month_name}, here are the bus distribution recommendations:\n"
         for _, row in recommendations.iterrows():
             dialogue += f"In {row['Bus City Services']}, it is recommended to deploy {row['Recommended Buses']} buses.\n"
-                    
-        # Instantiate the OpenAI client with the OpenRouter API details
-        openai_client = OpenAI(
-            base_url="https://openrouter.ai/api/v1",
-            api_key=OPENROUTER_API_KEY,  # Use the API key stored in the variable
-        )
-        
+
         # Build the messages list with separate system and user messages
         messages = [
             {"role": "system", "content": "You are a mediator. You need to rephrase the context given in a manner that these are recommendations for the new bus allotments which will make it more sustainable."},
@@ -212,47 +613,135 @@ class ModelHost:
         ]
         
         
-        # Create the chat completion using the OpenAI client
-        completion = openai_client.chat.completions.create(
-            model="openai/gpt-4o",
-            extra_body={
+        return {
+            "model": "openai/gpt-4o",
+            "extra_body": {
                 "models": ["anthropic/claude-3.5-sonnet", "gryphe/mythomax-l2-13b"],
             },
-            messages=messages
-        )
-        
-        # Attempt to extract and return the response message from the completion
+            "messages": messages,
+        }
+
+    def generate_dialogue_recommendations(self, recommendations, month_input):
+        prompt = self.fleet_size_prompt(recommendations, month_input)
         try:
+            # Create the chat completion (cached, shared with identical in-flight requests)
+            completion = self.chat_completion(**prompt)
             response_message = completion.choices[0].message.content
             return response_message
         except Exception as e:
-            print("Error fetching response:", e)
-            return "Error fetching the response"
+            logger.log(failure_log_level(e, logging.ERROR), "Error fetching response: %s", e)
+            # Fall back to the templated dialogue the LLM would have rephrased.
+            return prompt["messages"][-1]["content"]
+
+    def get_llm_client(self):
+        """
+        Return the process-wide OpenAI client for OpenRouter, creating it on first use.
+        """
+        with self._llm_client_lock:
+            if self._llm_client is None:
+                from openai import OpenAI
+
+                self._llm_client = OpenAI(
+                    base_url=OPENROUTER_BASE_URL,
+                    api_key=OPENROUTER_API_KEY,
+                    timeout=LLM_TIMEOUT_SECONDS,
+                    max_retries=LLM_MAX_RETRIES,
+                )
+            return self._llm_client
+
+    def llm_cache_key(self, model: str, messages: list, extra_body: dict = None):
+        """
+        Cache key of a chat completion: the model and a hash of the prompt.
+        """
+        prompt = json.dumps({"messages": messages, "extra_body": extra_body}, sort_keys=True)
+        return (model, hashlib.sha256(prompt.encode("utf-8")).hexdigest())
 
-    def nearest_location(self, location_df: pd.DataFrame, latitude: float, longitude: float):
+    def chat_completion(self, model: str, messages: list, extra_body: dict = None):
         """
-        Find the nearest location from `location_df` to the given (latitude, longitude).
+        Create an OpenRouter chat completion, cached on the model and a hash of the prompt.
+
+        Identical concurrent requests share one upstream call. Errors are not cached. Calls
+        go through the OpenRouter circuit breaker (CircuitOpen while it is open).
 
         Args:
-            location_df (pd.DataFrame): DataFrame containing columns 'Lat' and 'Long'.
-            latitude (float):  Latitude of the user-provided location.
-            longitude (float): Longitude of the user-provided location.
+            model (str): Primary model name.
+            messages (list): Chat messages.
+            extra_body (dict): Extra OpenRouter parameters (e.g. fallback models).
 
         Returns:
-            tuple: (nearest_lat, nearest_long)
+            ChatCompletion: The completion returned by the client.
         """
-        user_location = (latitude, longitude)
-        min_distance = float('inf')
-        nearest_point = None
+        key = self.llm_cache_key(model, messages, extra_body)
 
-        for _, row in location_df.iterrows():
-            point = (row['Lat'], row['Long'])
-            distance = geodesic(user_location, point).kilometers
-            if distance < min_distance:
-                min_distance = distance
-                nearest_point = point
+        def create():
+            with stage("llm"):
+                return self.llm_breaker.call(
+                    self.get_llm_client().chat.completions.create,
+                    model=model,
+                    extra_body=extra_body,
+                    messages=messages
+                )
 
-        return nearest_point
+        return self.llm_cache.get_or_load(key, create)
+
+    def chat_completion_stream(self, model: str, messages: list, extra_body: dict = None):
+        """
+        Stream the text of an OpenRouter chat completion as it arrives.
+
+        A cached completion (see `chat_completion`) is yielded in one piece; a streamed
+        completion is cached once it has been received in full. Streams go through the
+        OpenRouter circuit breaker and fail after LLM_STREAM_DEADLINE_SECONDS.
+
+        Yields:
+            str: Pieces of the completion text.
+        """
+        key = self.llm_cache_key(model, messages, extra_body)
+        completion = self.llm_cache.get(key)
+        if completion is not None:
+            yield completion.choices[0].message.content
+            return
+
+        from openai.types.chat import ChatCompletion
+
+        if not self.llm_breaker.allow():
+            raise CircuitOpen(f"{self.llm_breaker.name} is unavailable (circuit open).")
+        deadline = time.perf_counter() + LLM_STREAM_DEADLINE_SECONDS
+        parts = []
+        failed = True
+        try:
+            with stage("llm"):
+                stream = self.get_llm_client().chat.completions.create(
+                    model=model,
+                    extra_body=extra_body,
+                    messages=messages,
+                    stream=True
+                )
+
+            with stream:
+                for chunk in stream:
+                    text = chunk.choices[0].delta.content if chunk.choices else None
+                    if text:
+                        parts.append(text)
+                        yield text
+                    if time.perf_counter() > deadline:
+                        raise TimeoutError(f"The completion took longer than {LLM_STREAM_DEADLINE_SECONDS}s.")
+            failed = False
+        except GeneratorExit:
+            # Closed by the consumer: only a stream that never produced text counts as failed.
+            failed = not parts
+            raise
+        finally:
+            if failed:
+                self.llm_breaker.record_failure()
+            else:
+                self.llm_breaker.record_success()
+
+        self.llm_cache.set(key, ChatCompletion.model_validate({
+            "id": "stream", "object": "chat.completion", "created": int(datetime.datetime.now().timestamp()),
+            "model": model,
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": "".join(parts)}}],
+        }))
 
     def add_features(self, lat: float, long: float, hour: int, month: int, day: int, dataset: pd.DataFrame) -> pd.DataFrame:
         """
@@ -302,6 +791,302 @@ class ModelHost:
         complete_df.fillna(0, inplace=True)
         return complete_df
 
+    def encode_features(self, feature_store: SiteFeatureStore, preprocessor, dataset: pd.DataFrame,
+                        lat: float, long: float, hour: int, month: int, day: int):
+        """
+        Build the preprocessed model input for one site and time.
+
+        Uses the pre-encoded rows of `feature_store` and falls back to `add_features`
+        followed by `preprocessor.transform` when the store cannot serve the request.
+
+        Args:
+            feature_store (SiteFeatureStore): Pre-encoded features for `dataset`.
+            preprocessor: Fitted sklearn preprocessor for the model.
+            dataset (pd.DataFrame): Additional features DataFrame.
+            lat, long, hour, month, day: As for `add_features`.
+
+        Returns:
+            np.ndarray: The transformed feature matrix.
+        """
+        with stage("features"):
+            transformed_data = feature_store.encode(lat, long, hour, month, day)
+            if transformed_data is None:
+                # A site listed more than once is predicted with its first row, as in the
+                # feature store and the batch path.
+                df = self.add_features(lat, long, hour, month, day, dataset).iloc[[0]]
+        if transformed_data is None:
+            with stage("preprocess"):
+                transformed_data = preprocessor.transform(df)
+        return transformed_data
+
+    def get_params_many(self, input_data: list):
+        """
+        Extract the parameters of a list of requests as arrays.
+
+        Returns:
+            tuple: (latitudes, longitudes, hours, months, days) as NumPy arrays.
+        """
+        params = [self.get_params(item) for item in input_data]
+        return tuple(np.array(column) for column in zip(*params))
+
+    def encode_features_many(self, location_index: SpatialIndex, feature_store: SiteFeatureStore,
+                             preprocessor, dataset: pd.DataFrame, latitudes, longitudes, hours, months, days):
+        """
+        Build the preprocessed model input for many points and times in one pass.
+
+        Runs a single nearest-site lookup for all points and a single encoding step
+        (the feature store, or one `preprocessor.transform` over all rows as fallback).
+
+        Args:
+            location_index (SpatialIndex): Index over the model's location table.
+            feature_store (SiteFeatureStore): Pre-encoded features for `dataset`.
+            preprocessor: Fitted sklearn preprocessor for the model.
+            dataset (pd.DataFrame): Additional features DataFrame.
+            latitudes, longitudes, hours, months, days (np.ndarray): One entry per point.
+
+        Returns:
+            np.ndarray: The transformed feature matrix, one row per point.
+        """
+        with stage("nearest"):
+            nearest = location_index.nearest_many(latitudes, longitudes)
+        return self.encode_site_features(location_index, feature_store, preprocessor, dataset,
+                                         nearest, hours, months, days)
+
+    def encode_site_features(self, location_index: SpatialIndex, feature_store: SiteFeatureStore,
+                             preprocessor, dataset: pd.DataFrame, sites, hours, months, days):
+        """
+        Like `encode_features_many`, for points already snapped to site positions of `location_index`.
+        """
+        nearest_lats, nearest_longs = location_index.lats[sites], location_index.longs[sites]
+
+        hours, months, days = (np.asarray(values) for values in (hours, months, days))
+
+        def encode_with_dataframe(rows):
+            # Only the first row of each site is predicted, as in `encode_features`.
+            df = pd.concat([
+                self.add_features(lat, long, hour, month, day, dataset).iloc[[0]]
+                for lat, long, hour, month, day in zip(nearest_lats[rows], nearest_longs[rows],
+                                                       hours[rows], months[rows], days[rows])
+            ], ignore_index=True)
+            with stage("preprocess"):
+                return preprocessor.transform(df)
+
+        with stage("features"):
+            positions = feature_store.positions(nearest_lats, nearest_longs)
+            return feature_store.encode_rows(positions, hours, months, days, encode_with_dataframe)
+
+    def predict_sites(self, model: str, sites, hours, months, days) -> np.ndarray:
+        """
+        Run the traffic or weather model for arrays of site positions and times, through
+        the prediction cache when it is enabled.
+
+        Args:
+            model (str): "traffic" or "weather".
+            sites (np.ndarray): Positions in the model's location table.
+            hours, months, days (np.ndarray): One entry per row.
+
+        Returns:
+            np.ndarray: Shape (n,) for traffic, (n, 4) for weather.
+        """
+        if model == "traffic":
+            location_index, feature_store = self.traffic_location_index, self.traffic_feature_store
+            preprocessor, dataset = self.traffic_congestion_preprocessor, self.traffic_dataset
+            predictor, version = self.traffic_congestion_predictor, self.traffic_model_version
+        else:
+            location_index, feature_store = self.weather_location_index, self.weather_feature_store
+            preprocessor, dataset = self.weather_prediction_preprocessor, self.weather_dataset
+            predictor, version = self.weather_prediction_predictor, self.weather_model_version
+        sites, hours, months, days = (np.asarray(values) for values in (sites, hours, months, days))
+
+        def compute(rows):
+            transformed_data = self.encode_site_features(
+                location_index, feature_store, preprocessor, dataset, sites[rows], hours[rows], months[rows], days[rows]
+            )
+            with stage("predict"):
+                return predictor.predict(transformed_data)
+
+        if self.prediction_cache is None:
+            return compute(np.arange(len(sites)))
+        keys = PredictionCache.keys(model, version, sites, hours, months, days)
+        return self.prediction_cache.lookup(keys, compute, multi_output=model == "weather")
+
+    def cached_prediction(self, model: str, version: str, site: int, hour: int, month: int, day: int, compute):
+        """
+        Single-point prediction through the prediction cache; `compute()` runs the model.
+        """
+        if self.prediction_cache is None:
+            return compute()
+        key = PredictionCache.keys(model, version, [site], [hour], [month], [day])[0]
+        cached = self.prediction_cache.get_many([key]).get(key)
+        if cached is not None:
+            return cached.reshape(1, -1) if model == "weather" else cached
+
+        prediction = compute()
+        self.prediction_cache.set_many({key: prediction[0]})
+        return prediction
+
+    def predict_traffic_congestion_batch(self, input_data: list):
+        """
+        Generate congestion index predictions for many locations and times at once.
+
+        Args:
+            input_data (list): Dictionaries with keys 'latitude', 'longitude', 'hour', 'month', 'day'.
+
+        Returns:
+            np.ndarray: One congestion index per request, in request order.
+        """
+        return self.predict_traffic_congestion_many(*self.get_params_many(input_data))
+
+    def predict_traffic_congestion_batch_live(self, input_data: list):
+        """
+        Run the traffic model for many locations and times, bypassing the forecast cube.
+
+        Args:
+            input_data (list): Dictionaries with keys 'latitude', 'longitude', 'hour', 'month', 'day'.
+
+        Returns:
+            np.ndarray: One congestion index per request, in request order.
+        """
+        return self.predict_traffic_congestion_many_live(*self.get_params_many(input_data))
+
+    def predict_traffic_congestion_many(self, latitudes, longitudes, hours, months, days):
+        """
+        Congestion index for arrays of points and times (forecast cube first, then the model).
+
+        Returns:
+            np.ndarray: One congestion index per point.
+        """
+        if self.traffic_forecast_cube is None:
+            return self.predict_traffic_congestion_many_live(latitudes, longitudes, hours, months, days)
+
+        latitudes, longitudes, hours, months, days = (
+            np.asarray(values) for values in (latitudes, longitudes, hours, months, days)
+        )
+        with stage("nearest"):
+            sites = self.traffic_location_index.nearest_many(latitudes, longitudes)
+        with stage("cube"):
+            congestion_index, valid = self.traffic_forecast_cube.lookup_many(sites, hours, months, days)
+        if valid.all():
+            return congestion_index
+        # Times outside the cube (e.g. invalid dates) fall back to live inference.
+        live = ~valid
+        congestion_index[live] = self.predict_traffic_congestion_many_live(
+            latitudes[live], longitudes[live], hours[live], months[live], days[live]
+        )
+        return congestion_index
+
+    def predict_traffic_congestion_many_live(self, latitudes, longitudes, hours, months, days):
+        """
+        Run the traffic model for arrays of points and times, bypassing the forecast cube.
+
+        Returns:
+            np.ndarray: One congestion index per point.
+        """
+        with stage("nearest"):
+            sites = self.traffic_location_index.nearest_many(latitudes, longitudes)
+        return self.predict_sites("traffic", sites, hours, months, days)
+
+    def predict_site_congestion(self, hour: int, month: int, day: int) -> np.ndarray:
+        """
+        Congestion index at every traffic site for one time slice.
+
+        Returns:
+            np.ndarray: One value per row of the traffic location table.
+        """
+        _, valid = day_of_year([month], [day])
+        if not (valid[0] and 0 <= hour < 24):
+            raise ValueError(f"Invalid time slice: hour {hour}, month {month}, day {day}.")
+
+        n_sites = len(self.traffic_location_index)
+        if self.traffic_forecast_cube is not None:
+            with stage("cube"):
+                return self.traffic_forecast_cube.lookup_many(
+                    np.arange(n_sites), np.full(n_sites, hour), np.full(n_sites, month), np.full(n_sites, day)
+                )[0]
+        return self.predict_traffic_congestion_many_live(
+            self.traffic_location_index.lats, self.traffic_location_index.longs,
+            np.full(n_sites, hour), np.full(n_sites, month), np.full(n_sites, day)
+        )
+
+    def get_congestion_heatmap(self, hour: int, month: int, day: int, bbox: str = None,
+                               rows: int = 64, cols: int = 64, encoding: str = "json") -> Heatmap:
+        """
+        Encoded congestion heatmap for one time slice, at the traffic sites or on a grid.
+
+        Site predictions are cached per time slice and encoded responses per request.
+
+        Args:
+            hour, month, day (int): The time slice.
+            bbox (str): "south,west,north,east" to rasterize over; all sites if None.
+            rows, cols (int): Grid size (with `bbox`).
+            encoding (str): "json" or "binary" (see heatmap.py).
+
+        Returns:
+            Heatmap: Body, media type and ETag.
+
+        Raises:
+            InvalidHeatmapRequest: For an invalid time slice, bbox, grid size or format.
+        """
+        check_time_slice(hour, month, day)
+        if encoding not in FORMATS:
+            raise InvalidHeatmapRequest(
+                f"Unknown heatmap format {encoding}; expected one of {', '.join(FORMATS)}."
+            )
+        box = parse_bbox(bbox) if bbox else None
+        if box is not None and not (0 < rows * cols <= HEATMAP_MAX_GRID_CELLS and rows > 0 and cols > 0):
+            raise InvalidHeatmapRequest(f"Grid size must be positive and at most {HEATMAP_MAX_GRID_CELLS} cells.")
+
+        def site_values():
+            return self.heatmap_cache.get_or_load(
+                ("sites", hour, month, day), lambda: self.predict_site_congestion(hour, month, day)
+            )
+
+        def encode():
+            index = self.traffic_location_index
+            if box is None:
+                return encode_sites(index.lats, index.longs, site_values(), encoding)
+            return encode_grid(rasterize(index, site_values(), box, rows, cols), box, encoding)
+
+        key = ("heatmap", hour, month, day, box, (rows, cols) if box else None, encoding)
+        return self.heatmap_cache.get_or_load(key, encode)
+
+    def predict_weather_batch(self, input_data: list):
+        """
+        Generate weather predictions for many locations and times at once.
+
+        Args:
+            input_data (list): Dictionaries with keys 'latitude', 'longitude', 'hour', 'month', 'day'.
+
+        Returns:
+            np.ndarray: The predicted values (array of shape [n_requests, 4]), in request order.
+        """
+        latitudes, longitudes, hours, months, days = self.get_params_many(input_data)
+        with stage("nearest"):
+            sites = self.weather_location_index.nearest_many(latitudes, longitudes)
+        return self.predict_sites("weather", sites, hours, months, days)
+
+    def get_weather_forecast(self, latitude: float, longitude: float, start: datetime.datetime = None,
+                             hours: int = None, end: datetime.datetime = None, step_hours: int = 1) -> dict:
+        """
+        Weather predictions at one location for a range of hours, in one batch.
+
+        Args:
+            latitude, longitude (float): The location (resolved to its nearest weather site once).
+            start, hours, end, step_hours: The forecast times (see weather_forecast.forecast_times).
+
+        Returns:
+            dict: The site's "latitude" and "longitude", and the columns "time", "temperature",
+            "humidity", "wind_speed" and "pressure".
+        """
+        times = forecast_times(start, hours, end, step_hours, WEATHER_FORECAST_MAX_HOURS)
+        with stage("nearest"):
+            site = self.weather_location_index.nearest_many([latitude], [longitude])[0]
+        site_lat, site_long = self.weather_location_index.site(site)
+
+        hour_values, months, days = time_features(times)
+        predictions = self.predict_sites("weather", np.full(len(times), site), hour_values, months, days)
+        return dict({"latitude": float(site_lat), "longitude": float(site_long)}, **columnar(times, predictions))
+
     def predict_traffic_congestion(self, input_data: dict):
         """
         Generate a congestion index prediction based on input parameters.
@@ -313,25 +1098,35 @@ class ModelHost:
         Returns:
             np.ndarray: The predicted congestion index (array).
         """
-        print("Entered predict_traffic_congestion method")
+        logger.debug("Entered predict_traffic_congestion method")
 
         # Extract validated parameters.
         latitude, longitude, hour, month, day = self.get_params(input_data)
 
         # Find the nearest location from the traffic dataset's location DataFrame.
-        nearest_lat, nearest_long = self.nearest_location(self.traffic_location_df, latitude, longitude)
-
-        # Create a DataFrame for prediction features.
-        df = self.add_features(nearest_lat, nearest_long, hour, month, day, self.traffic_dataset)
-
-
-        # Transform the DataFrame using the preprocessor.
-        transformed_data = self.traffic_congestion_preprocessor.transform(df)
+        with stage("nearest"):
+            site = self.traffic_location_index.nearest_many([latitude], [longitude])[0]
+        nearest_lat, nearest_long = self.traffic_location_index.site(site)
+
+        # Serve from the precomputed forecast cube when one is loaded.
+        if self.traffic_forecast_cube is not None:
+            with stage("cube"):
+                congestion_index = self.traffic_forecast_cube.lookup(site, hour, month, day)
+            if congestion_index is not None:
+                return np.array([congestion_index])
+
+        def compute():
+            # Encode the prediction features (site features are pre-encoded at startup).
+            transformed_data = self.encode_features(
+                self.traffic_feature_store, self.traffic_congestion_preprocessor, self.traffic_dataset,
+                nearest_lat, nearest_long, hour, month, day
+            )
 
-        # Predict using the LightGBM model.
-        congestion_index = self.traffic_congestion_model.predict(transformed_data)
+            # Predict using the LightGBM model.
+            with stage("predict"):
+                return self.traffic_congestion_predictor.predict(transformed_data)
 
-        return congestion_index
+        return self.cached_prediction("traffic", self.traffic_model_version, site, hour, month, day, compute)
 
     def predict_weather(self, input_data: dict):
         """
@@ -344,154 +1139,337 @@ class ModelHost:
         Returns:
             np.ndarray: The predicted values (array of shape [n_samples, 4]).
         """
-        print("Entered predict_weather method")
+        logger.debug("Entered predict_weather method")
 
         # Extract validated parameters.
         latitude, longitude, hour, month, day = self.get_params(input_data)
-        print(f"Extracted Parameters => Lat: {latitude}, Long: {longitude}, "
-              f"Hour: {hour}, Month: {month}, Day: {day}")
+        logger.debug("Extracted Parameters => Lat: %s, Long: %s, Hour: %s, Month: %s, Day: %s",
+                     latitude, longitude, hour, month, day)
 
         # Find the nearest location from the weather dataset's location DataFrame.
-        nearest_lat, nearest_long = self.nearest_location(self.weather_location_df, latitude, longitude)
-        print(f"Nearest Location => ({nearest_lat}, {nearest_long})")
-
-        # Create a DataFrame for prediction features.
-        df = self.add_features(nearest_lat, nearest_long, hour, month, day, self.weather_dataset)
-
+        with stage("nearest"):
+            site = self.weather_location_index.nearest_many([latitude], [longitude])[0]
+        nearest_lat, nearest_long = self.weather_location_index.site(site)
+        logger.debug("Nearest Location => (%s, %s)", nearest_lat, nearest_long)
+
+        def compute():
+            # Encode the prediction features (site features are pre-encoded at startup).
+            transformed_data = self.encode_features(
+                self.weather_feature_store, self.weather_prediction_preprocessor, self.weather_dataset,
+                nearest_lat, nearest_long, hour, month, day
+            )
+            logger.debug("Weather feature encoding complete.")
 
-        # Transform the DataFrame using the weather preprocessor.
-        transformed_data = self.weather_prediction_preprocessor.transform(df)
-        print("Weather preprocessor transformation complete.")
+            # Predict using the LightGBM model (multi-output).
+            # Likely returns shape (1, 4) if you're predicting for one sample.
+            with stage("predict"):
+                return self.weather_prediction_predictor.predict(transformed_data)
 
-        # Predict using the LightGBM model (multi-output).
-        # Likely returns shape (1, 4) if you're predicting for one sample.
-        pred = self.weather_prediction_model.predict(transformed_data)
-        print("Weather prediction successful:", pred)
+        pred = self.cached_prediction("weather", self.weather_model_version, site, hour, month, day, compute)
+        logger.debug("Weather prediction successful: %s", pred)
 
         return pred
     
     def get_fleet_size(self, input_data:dict):
 
-        month = self.get_fleet_recommendation_params(input_data)
+        month, total_buses = self.get_fleet_recommendation_params(input_data)
 
-        recommendations = self.get_recommendations(month)
+        recommendations = self.get_recommendations(month, total_buses)
         recommendations = recommendations.rename(columns={"Scaled Recommended Buses" : "Recommended Buses"})
         dialogue_response = self.generate_dialogue_recommendations(recommendations, month)
 
         return (recommendations, dialogue_response)
 
-    def get_traffic_congestion(self, lat, lon):
-        now = datetime.datetime.now()
-        payload = {
-            "latitude": lat,
-            "longitude": lon,
-            "hour": now.hour,
-            "month": now.month,
-            "day": now.day
-        }
-        try:
-            response = self.predict_traffic_congestion(payload)
-            response = response[0]
-            return response
-        except (requests.RequestException, KeyError, IndexError) as e:
-            print(f"[Traffic] Error fetching congestion for ({lat}, {lon}): {e}")
-            return 1  # Default value in case of error
-    
-    def get_air_pollution(self, lat, lon):
+    def fetch_air_pollution(self, lat, lon):
+        """
+        Fetch the AQI for a coordinate from OpenWeatherMap (raises on errors).
+        """
         url = self.AQI_API_URL_TEMPLATE.format(lat=lat, lon=lon, api_key=AQI_API_KEY)
+        with stage("aqi"):
+            response = self.http_session.get(url, timeout=AQI_TIMEOUT_SECONDS)
+        response.raise_for_status()
+        return response.json()["list"][0]["main"]["aqi"]
+
+    def get_air_pollution(self, lat, lon):
+        """
+        AQI for a coordinate, cached per grid cell (defaults to 1 if the lookup fails or the
+        OpenWeatherMap circuit breaker is open).
+
+        All coordinates in a cell share one cached value, fetched at the cell centre.
+        """
+        cell = (round(float(lat) / AQI_CACHE_CELL_DEGREES), round(float(lon) / AQI_CACHE_CELL_DEGREES))
+        cell_lat = round(cell[0] * AQI_CACHE_CELL_DEGREES, 6)
+        cell_lon = round(cell[1] * AQI_CACHE_CELL_DEGREES, 6)
         try:
-            response = requests.get(url)
-            response.raise_for_status()
-            return response.json()["list"][0]["main"]["aqi"]
-        except (requests.RequestException, KeyError, IndexError) as e:
-            print(f"[AQI] Error fetching AQI for ({lat}, {lon}): {e}")
+            return self.aqi_cache.get_or_load(
+                cell, lambda: self.aqi_breaker.call(self.fetch_air_pollution, cell_lat, cell_lon)
+            )
+        except (requests.RequestException, KeyError, IndexError, CircuitOpen) as e:
+            logger.log(failure_log_level(e), "[AQI] Error fetching AQI for (%s, %s): %s", lat, lon, e)
             return 1
 
-    def get_AQI_TC(self, place_name):
-        match = self.trashpickupcoordinates[self.trashpickupcoordinates["Place Name"] == place_name]
-        lat = match.iloc[0]["Latitude"]
-        lon = match.iloc[0]["Longitude"]
-        
-        tc = self.get_traffic_congestion(lat, lon)
-        aqi = self.get_air_pollution(lat, lon)
+    def get_air_pollution_many(self, stops):
+        """
+        Look up the AQI for several route stops concurrently.
+
+        Args:
+            stops (list): RouteStop entries with resolved coordinates.
+
+        Returns:
+            list: One AQI per stop, in the same order as `stops`.
+        """
+        return list(self.route_stop_executor.map(lambda stop: self.get_air_pollution(stop.lat, stop.lon), stops))
+
+    def route_schedule(self, route: RouteRecord, date: datetime.date = None,
+                       window_minutes: int = DEFAULT_WINDOW_MINUTES,
+                       step_minutes: int = DEFAULT_STEP_MINUTES) -> RouteSchedule:
+        """
+        Predict congestion at every located stop of a route at its scheduled pickup time,
+        and with the whole route shifted by each start offset, in one batch prediction.
+
+        Args:
+            route (RouteRecord): The route.
+            date (datetime.date): Pickup date (default: the next date on the route's pickup day).
+            window_minutes (int): Largest start shift scanned, in both directions.
+            step_minutes (int): Step between scanned start shifts.
+
+        Returns:
+            RouteSchedule: Congestion of shape (n_offsets, n_located_stops).
+        """
+        stops = [stop for stop in route.stops if stop.lat is not None]
+        if not stops:
+            raise ValueError(f"No stops with coordinates on route {route.route_id}.")
+
+        date = date or pickup_date(route.pickup_day)
+        offsets = start_offsets(window_minutes, step_minutes)
+        times = schedule_times(date, [stop.pickup_time for stop in stops], offsets)
+        hours, months, days = time_features(times)
+        latitudes = np.broadcast_to(np.array([stop.lat for stop in stops]), times.shape)
+        longitudes = np.broadcast_to(np.array([stop.lon for stop in stops]), times.shape)
+
+        congestion = self.predict_traffic_congestion_many(
+            latitudes.ravel(), longitudes.ravel(), hours.ravel(), months.ravel(), days.ravel()
+        ).reshape(times.shape)
+
+        scheduled = int(np.flatnonzero(offsets == 0)[0])
+        return RouteSchedule(date, offsets, times, congestion, scheduled, best_offset(congestion, offsets))
+
+    def get_route_schedule(self, route_id, date: datetime.date = None,
+                           window_minutes: int = DEFAULT_WINDOW_MINUTES, step_minutes: int = DEFAULT_STEP_MINUTES):
+        """
+        Scheduled congestion per stop and the least congested start offset of a route.
+
+        Returns:
+            dict: Per-stop congestion at the published and at the best start, and the mean
+                congestion for every scanned offset.
+        """
+        route = self.route_index.route(route_id)
+        schedule = self.route_schedule(route, date, window_minutes, step_minutes)
+        stops = [stop for stop in route.stops if stop.lat is not None]
+        best_times = schedule.times[schedule.best]
+
+        return {
+            "route_id": route.route_id,
+            "pickup_day": route.pickup_day,
+            "date": schedule.date.isoformat(),
+            "places": [stop.place for stop in stops],
+            "pickup_times": [stop.pickup_time for stop in stops],
+            "scheduled_congestion": schedule.congestion[schedule.scheduled].tolist(),
+            "offsets_minutes": schedule.offsets_minutes.tolist(),
+            "mean_congestion": schedule.congestion.mean(axis=1).tolist(),
+            "best_offset_minutes": int(schedule.offsets_minutes[schedule.best]),
+            "best_pickup_times": [str(time)[11:16] for time in best_times],
+            "best_congestion": schedule.congestion[schedule.best].tolist(),
+            "places_without_coordinates": [stop.place for stop in route.stops if stop.lat is None],
+        }
+
+    def route_stop_events(self, route: RouteRecord, schedule: RouteSchedule = None):
+        """
+        AQI and congestion of every stop of a route, yielded as each AQI lookup completes.
+
+        Congestion comes from one batch prediction; AQI lookups run concurrently and the
+        pending ones are cancelled if the generator is closed early.
+
+        Yields:
+            dict: {"index", "place", "pickup_time", "aqi", "tc"}, or "error" instead of
+                "aqi" and "tc" for stops without coordinates.
+        """
+        located = []
+        for index, stop in enumerate(route.stops):
+            if stop.lat is None:
+                yield {"index": index, "place": stop.place, "pickup_time": stop.pickup_time,
+                       "error": "Coordinates not found"}
+            else:
+                located.append((index, stop))
+        if not located:
+            return
+
+        # Only the scheduled row is read here, so skip the start offset scan.
+        schedule = schedule or self.route_schedule(route, window_minutes=0)
+        futures = {
+            self.route_stop_executor.submit(self.get_air_pollution, stop.lat, stop.lon): (index, stop, float(congestion))
+            for (index, stop), congestion in zip(located, schedule.congestion[schedule.scheduled])
+        }
+        try:
+            for future in as_completed(futures):
+                index, stop, congestion = futures[future]
+                yield {"index": index, "place": stop.place, "pickup_time": stop.pickup_time,
+                       "aqi": future.result(), "tc": congestion}
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def stream_AQI_TC(self, route_id):
+        """
+        Streamed `get_list_of_AQI_TC`: a "route" event, one "stop" event per stop in
+        completion order (see `route_stop_events`), then "done".
+        """
+        route = self.route_index.route(route_id)
+        yield "route", {"route_id": route.route_id, "stops": len(route.stops)}
+        for item in self.route_stop_events(route):
+            yield "stop", item
+        yield "done", {"stops": len(route.stops)}
 
-        return (aqi, tc)
-    
     def get_list_of_AQI_TC(self, route_id):
-        
-        row = self.trashpickuproutes[self.trashpickuproutes["route_id"] == route_id]
+
+        route = self.route_index.route(route_id)
 
         results = []
 
-        pickup_data = row.iloc[0].get("place_pickup_times")
-        if isinstance(pickup_data, str):
-            pickup_data = ast.literal_eval(pickup_data)
-
-        for entry in pickup_data:
-            place = entry.get("place")
-            pickup_time = entry.get("pickup_time")
-            match = self.trashpickupcoordinates[self.trashpickupcoordinates["Place Name"] == place]
-            lat = match.iloc[0]["Latitude"]
-            lon = match.iloc[0]["Longitude"]
-            
-            if lat is None or lon is None:
-                results.append({
-                    "Place": place,
-                    "Pickup Time": pickup_time,
-                    "Error": "Coordinates not found"
-                })
+        for item in self.collect_route_data(route):
+            if "Error" in item:
+                results.append(item)
                 continue
-            
-            aqi, congestion = self.get_AQI_TC(place)
+
+            aqi, congestion = item["AQI"], item["Traffic Congestion"]
 
             # Convert NumPy types to native Python types
             results.append({
-                "place": place,
+                "place": item["Place"],
                 "aqi": float(aqi) if hasattr(aqi, "item") else aqi,
                 "tc": float(congestion) if hasattr(congestion, "item") else congestion
             })
 
         return results
-        
-    def collect_route_data(self, row):
+
+    def collect_route_data(self, route: RouteRecord, schedule: RouteSchedule = None):
+        """
+        AQI and congestion at the scheduled pickup time for every stop of a route.
+
+        Args:
+            route (RouteRecord): The route.
+            schedule (RouteSchedule): Precomputed `route_schedule(route)`, if available.
+
+        Returns:
+            list: One dict per stop, in stop order.
+        """
         results = []
 
-        pickup_data = row.iloc[0].get("place_pickup_times")
-        if isinstance(pickup_data, str):
-            pickup_data = ast.literal_eval(pickup_data)
-
-        for entry in pickup_data:
-            place = entry.get("place")
-            pickup_time = entry.get("pickup_time")
-            match = self.trashpickupcoordinates[self.trashpickupcoordinates["Place Name"] == place]
-            lat = match.iloc[0]["Latitude"]
-            lon = match.iloc[0]["Longitude"]
-            
-            if lat is None or lon is None:
+        # Congestion of all stops comes from one batch prediction; AQI is looked up
+        # concurrently. Both come back in stop order.
+        located = [stop for stop in route.stops if stop.lat is not None]
+        if located and schedule is None:
+            schedule = self.route_schedule(route, window_minutes=0)
+        congestions = iter(schedule.congestion[schedule.scheduled] if located else ())
+        aqis = iter(self.get_air_pollution_many(located))
+
+        for stop in route.stops:
+            if stop.lat is None:
                 results.append({
-                    "Place": place,
-                    "Pickup Time": pickup_time,
+                    "Place": stop.place,
+                    "Pickup Time": stop.pickup_time,
                     "Error": "Coordinates not found"
                 })
                 continue
-            
-            aqi, congestion = self.get_AQI_TC(place)
+
+            aqi, congestion = next(aqis), next(congestions)
 
             results.append({
-                "Place": place,
-                "Pickup Time": pickup_time,
+                "Place": stop.place,
+                "Pickup Time": stop.pickup_time,
                 "AQI": aqi,
                 "Traffic Congestion": congestion
             })
 
         return results
-    
-    def analyze_pickup_route(self, results):
-        client = OpenAI(
-            base_url="https://openrouter.ai/api/v1",
-            api_key=OPENROUTER_API_KEY
+
+    def plan_pickup_route(self, route: RouteRecord, results):
+        """
+        Re-order the located stops of a route by distance weighted with their AQI and congestion.
+
+        Args:
+            route (RouteRecord): The route.
+            results (list): `collect_route_data(route)`.
+
+        Returns:
+            dict: Suggested and published stop order with their distance and weighted cost.
+        """
+        located = [(stop, item) for stop, item in zip(route.stops, results) if "Error" not in item]
+        plan = plan_route(
+            [stop.lat for stop, _ in located], [stop.lon for stop, _ in located],
+            [item["Traffic Congestion"] for _, item in located], [item["AQI"] for _, item in located],
+            ROUTE_OPTIMIZER_BUDGET_MS / 1000.0
         )
+        places = [stop.place for stop, _ in located]
+
+        return {
+            "order": [places[i] for i in plan.order],
+            "original_order": places,
+            "distance_km": round(plan.distance_km, 3),
+            "original_distance_km": round(plan.original_distance_km, 3),
+            "cost": round(plan.cost, 3),
+            "original_cost": round(plan.original_cost, 3),
+            "improvement": round(1 - plan.cost / plan.original_cost, 4) if plan.original_cost > 0 else 0.0,
+            "places_without_coordinates": [stop.place for stop in route.stops if stop.lat is None],
+        }
+
+    def summarize_pickup_route(self, results, schedule: RouteSchedule = None, plan: dict = None):
+        """
+        Templated recommendation for a pickup route (used when no LLM narrative is requested).
+        """
+        located = [item for item in results if "Error" not in item]
+        lines = []
+        if located:
+            aqis = [item["AQI"] for item in located]
+            congestions = [float(item["Traffic Congestion"]) for item in located]
+            lines.append(
+                f"Summary: {len(located)} pickup stops, average AQI {np.mean(aqis):.1f} (1 Good - 5 Very Poor), "
+                f"average Traffic Congestion {np.mean(congestions):.2f}."
+            )
+            avoid = [item for item in located if item["AQI"] >= 4 or float(item["Traffic Congestion"]) >= 4]
+            if avoid:
+                lines.append("Places to avoid or visit off-peak:")
+                lines.extend(
+                    f"- {item['Place']}: AQI = {item['AQI']}, Traffic Congestion = {float(item['Traffic Congestion']):.2f}"
+                    for item in avoid
+                )
+            else:
+                lines.append("The route is acceptable as-is: no stop has poor air quality or heavy congestion.")
+
+        if plan is not None and plan["improvement"] > 0:
+            lines.append(
+                f"Suggested order ({plan['improvement']:.0%} lower weighted cost, "
+                f"{plan['distance_km']:.1f} km instead of {plan['original_distance_km']:.1f} km): "
+                + " -> ".join(plan["order"])
+            )
+
+        if schedule is not None and schedule.best != schedule.scheduled:
+            mean = schedule.congestion.mean(axis=1)
+            lines.append(
+                f"Starting the route {int(schedule.offsets_minutes[schedule.best]):+d} minutes from its schedule "
+                f"lowers the average Traffic Congestion from {mean[schedule.scheduled]:.2f} to {mean[schedule.best]:.2f}."
+            )
+
+        errors = [item["Place"] for item in results if "Error" in item]
+        if errors:
+            lines.append("No coordinates for: " + ", ".join(errors))
+
+        return "\n".join(lines)
 
+    def pickup_route_prompt(self, results, schedule: RouteSchedule = None, plan: dict = None):
+        """
+        Chat completion arguments (model, extra_body, messages) for a pickup route analysis.
+        """
         dialogue = (
             "You are a route optimization assistant for waste management. "
             "You are given a list of pickup places along with their AQI (Air Quality Index) and Traffic Congestion level.\n"
@@ -510,43 +1488,204 @@ class ModelHost:
             else:
                 dialogue += f"- {item['Place']}: AQI = {item['AQI']}, Traffic Congestion = {item['Traffic Congestion']}\n"
 
+        if schedule is not None and schedule.best != schedule.scheduled:
+            mean = schedule.congestion.mean(axis=1)
+            dialogue += (
+                f"\nStarting the route {int(schedule.offsets_minutes[schedule.best]):+d} minutes from its schedule "
+                f"lowers the average Traffic Congestion from {mean[schedule.scheduled]:.2f} "
+                f"to {mean[schedule.best]:.2f}.\n"
+            )
+
+        if plan is not None and plan["improvement"] > 0:
+            dialogue += (
+                f"\nA local optimizer suggests visiting the places in this order "
+                f"({plan['improvement']:.0%} lower distance weighted by AQI and congestion): "
+                + " -> ".join(plan["order"]) + "\n"
+            )
+
         messages = [
             {"role": "system", "content": "You are an expert in environmental route optimization."},
             {"role": "user", "content": dialogue}
         ]
 
+        return {
+            "model": "meta-llama/llama-3-8b-instruct",
+            "extra_body": {
+                "models": [
+                    "meta-llama/llama-3-8b-instruct",
+                    "openai/gpt-4o",
+                    "gryphe/mythomax-l2-13b"
+                ]
+            },
+            "messages": messages,
+        }
+
+    def analyze_pickup_route(self, results, schedule: RouteSchedule = None, plan: dict = None):
         try:
-            completion = client.chat.completions.create(
-                model="meta-llama/llama-3-8b-instruct",
-                extra_body={
-                    "models": [
-                        "meta-llama/llama-3-8b-instruct",
-                        "openai/gpt-4o",
-                        "gryphe/mythomax-l2-13b"
-                    ]
-                },
-                messages=messages
-            )
-            print("\n===== Route Analysis =====\n")
-            print(completion.choices[0].message.content)
+            completion = self.chat_completion(**self.pickup_route_prompt(results, schedule, plan))
+            logger.debug("Route Analysis: %s", completion.choices[0].message.content)
             return completion.choices[0].message.content
         except Exception as e:
-            print("Error fetching response from OpenRouter:", e)
+            logger.log(failure_log_level(e, logging.ERROR), "Error fetching response from OpenRouter: %s", e)
+
+    def get_trash_pickup_recommendation(self, id, narrative: bool = None):
+        """
+        Recommendation and optimized stop order for a trash pickup route.
+
+        Args:
+            id (str): Route id.
+            narrative (bool): Ask the LLM for the recommendation text (default: TRASH_PICKUP_NARRATIVE);
+                otherwise, or if the LLM call fails, the text is a templated summary.
+
+        Returns:
+            tuple: (recommendation text, plan dict from plan_pickup_route)
+        """
+        # Get route by ID
+        route = self.route_index.route(id)
+        schedule = self.route_schedule(route) if any(stop.lat is not None for stop in route.stops) else None
+        results = self.collect_route_data(route, schedule)
+        plan = self.plan_pickup_route(route, results)
+
+        recommendation = None
+        if TRASH_PICKUP_NARRATIVE if narrative is None else narrative:
+            recommendation = self.analyze_pickup_route(results, schedule, plan)
+        if recommendation is None:
+            recommendation = self.summarize_pickup_route(results, schedule, plan)
+
+        return recommendation, plan
+
+
+    def stream_trash_pickup_recommendation(self, id, narrative: bool = None):
+        """
+        Streamed `get_trash_pickup_recommendation`: a "route" event, one "stop" event per
+        stop as its lookups complete, the "plan", the recommendation text as "token"
+        events (LLM tokens as they arrive, or the templated summary), then "done" with
+        the full text.
+        """
+        route = self.route_index.route(id)
+        yield "route", {"route_id": route.route_id, "stops": len(route.stops)}
+
+        schedule = self.route_schedule(route) if any(stop.lat is not None for stop in route.stops) else None
+        results = [None] * len(route.stops)
+        for item in self.route_stop_events(route, schedule):
+            if "error" in item:
+                results[item["index"]] = {"Place": item["place"], "Pickup Time": item["pickup_time"],
+                                          "Error": item["error"]}
+            else:
+                results[item["index"]] = {"Place": item["place"], "Pickup Time": item["pickup_time"],
+                                          "AQI": item["aqi"], "Traffic Congestion": item["tc"]}
+            yield "stop", item
+
+        plan = self.plan_pickup_route(route, results)
+        yield "plan", plan
+
+        text = []
+        if TRASH_PICKUP_NARRATIVE if narrative is None else narrative:
+            try:
+                for piece in self.chat_completion_stream(**self.pickup_route_prompt(results, schedule, plan)):
+                    text.append(piece)
+                    yield "token", piece
+            except Exception as e:
+                if text:
+                    raise
+                logger.log(failure_log_level(e, logging.ERROR), "Error fetching response from OpenRouter: %s", e)
+        if not text:
+            text.append(self.summarize_pickup_route(results, schedule, plan))
+            yield "token", text[0]
+
+        yield "done", {"recommendations": "".join(text)}
+
+    def stream_fleet_size(self, input_data: dict):
+        """
+        Streamed `get_fleet_size`: the "recommendations" table, the dialogue as "token"
+        events while the LLM generates it (or the templated dialogue if it fails), then
+        "done" with the full dialogue.
+        """
+        month, total_buses = self.get_fleet_recommendation_params(input_data)
+
+        recommendations = self.get_recommendations(month, total_buses)
+        recommendations = recommendations.rename(columns={"Scaled Recommended Buses" : "Recommended Buses"})
+        yield "recommendations", recommendations.to_dict(orient="records")
 
-    def get_trash_pickup_recommendation(self, id):
+        text = []
+        prompt = self.fleet_size_prompt(recommendations, month)
+        try:
+            for piece in self.chat_completion_stream(**prompt):
+                text.append(piece)
+                yield "token", piece
+        except Exception as e:
+            if text:
+                raise
+            logger.log(failure_log_level(e, logging.ERROR), "Error fetching response from OpenRouter: %s", e)
+            # The templated dialogue, as in `generate_dialogue_recommendations`.
+            text.append(prompt["messages"][-1]["content"])
+            yield "token", text[0]
 
-        # Get row by ID
-        row = self.trashpickuproutes[self.trashpickuproutes["route_id"] == id]
-        results = self.collect_route_data(row)
-        recommendation = self.analyze_pickup_route(results)
+        yield "done", {"dialogue": "".join(text)}
 
-        return recommendation
 
+# Instantiate a single ModelHost object (loads models & data once at startup).
+model_host = ModelHost(lazy=SERVER_LAZY_LOAD)
+
+
+def build_model_host(previous: ModelHost) -> ModelHost:
+    # A fully loaded and warmed generation, sharing the process-wide clients and caches.
+    host = ModelHost(lazy=False, shared=previous)
+    host.warm_caches()
+    return host
+
+
+def install_model_host(host: ModelHost):
+    # Endpoints look `model_host` up per request: requests already running keep the
+    # generation they started with.
+    global model_host
+    model_host = host
+
+
+model_reloader = ModelReloader(model_host, build_model_host, install_model_host)
+
+# Blocking work runs off the event loop; see executors.py.
+executors = EndpointExecutors({"predict": PREDICT_POOL_WORKERS, "upstream": UPSTREAM_POOL_WORKERS})
+traffic_limiter = executors.limiter("predict_traffic_congestion", "predict", PREDICT_CONCURRENCY, PREDICT_MAX_QUEUE)
+weather_limiter = executors.limiter("predict_weather", "predict", PREDICT_CONCURRENCY, PREDICT_MAX_QUEUE)
+traffic_batch_limiter = executors.limiter("predict_traffic_congestion_batch", "predict", PREDICT_CONCURRENCY,
+                                          PREDICT_MAX_QUEUE)
+weather_batch_limiter = executors.limiter("predict_weather_batch", "predict", PREDICT_CONCURRENCY, PREDICT_MAX_QUEUE)
+fleet_limiter = executors.limiter("recommend_fleetsize", "upstream", RECOMMEND_CONCURRENCY, RECOMMEND_MAX_QUEUE)
+fleet_scenario_limiter = executors.limiter("recommend_fleetsize_scenarios", "predict", RECOMMEND_CONCURRENCY,
+                                           RECOMMEND_MAX_QUEUE)
+trash_limiter = executors.limiter("recommend_trashpickup", "upstream", RECOMMEND_CONCURRENCY, RECOMMEND_MAX_QUEUE)
+aqi_tc_limiter = executors.limiter("predict_aqi_tc", "upstream", RECOMMEND_CONCURRENCY, RECOMMEND_MAX_QUEUE)
+schedule_limiter = executors.limiter("recommend_trashpickup_schedule", "predict", RECOMMEND_CONCURRENCY,
+                                     RECOMMEND_MAX_QUEUE)
+weather_forecast_limiter = executors.limiter("predict_weather_forecast", "predict", PREDICT_CONCURRENCY,
+                                             PREDICT_MAX_QUEUE)
+heatmap_limiter = executors.limiter("predict_traffic_congestion_heatmap", "predict", PREDICT_CONCURRENCY,
+                                    PREDICT_MAX_QUEUE)
 
 # Create the FastAPI application.
 # Initialize FastAPI app
 app = FastAPI()
 
+# Requests are shed with 503 while their endpoint's queue is full (innermost, so that the
+# responses still get CORS headers and are counted in the metrics).
+app.add_middleware(AdmissionMiddleware, limiters={
+    "/predict/trafficCongestion": traffic_limiter,
+    "/predict/trafficCongestion/heatmap": heatmap_limiter,
+    "/predict/trafficCongestion/batch": traffic_batch_limiter,
+    "/predict/weatherPred": weather_limiter,
+    "/predict/weatherPred/forecast": weather_forecast_limiter,
+    "/predict/weatherPred/batch": weather_batch_limiter,
+    "/predict/AQI_TC": aqi_tc_limiter,
+    "/predict/AQI_TC/stream": aqi_tc_limiter,
+    "/recommend/fleetsize": fleet_limiter,
+    "/recommend/fleetsize/stream": fleet_limiter,
+    "/recommend/fleetsize/scenarios": fleet_scenario_limiter,
+    "/recommend/trashpickup": trash_limiter,
+    "/recommend/trashpickup/stream": trash_limiter,
+    "/recommend/trashpickup/schedule": schedule_limiter,
+})
+
 # Allow CORS for all origins
 app.add_middleware(
     CORSMiddleware,
@@ -554,10 +1693,147 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allow all HTTP methods
     allow_headers=["*"],  # Allow all headers
+    expose_headers=["ETag", "X-Heatmap-Shape", "X-Heatmap-Bbox", "Retry-After"],
 )
 
-# Instantiate a single ModelHost object (loads models & data once at startup).
-model_host = ModelHost()
+# Per-endpoint latency and in-flight requests; see metrics.py.
+app.add_middleware(MetricsMiddleware, routes=app.routes)
+
+# Concurrent single-point predictions are grouped into batch predictions.
+traffic_batcher = MicroBatcher(
+    lambda input_data: model_host.predict_traffic_congestion_batch(input_data), traffic_limiter,
+    MICROBATCH_MAX_SIZE, MICROBATCH_MAX_WAIT_MS / 1000.0
+)
+weather_batcher = MicroBatcher(
+    lambda input_data: model_host.predict_weather_batch(input_data), weather_limiter,
+    MICROBATCH_MAX_SIZE, MICROBATCH_MAX_WAIT_MS / 1000.0
+)
+
+register_server_stats(
+    caches=lambda: dict(
+        {"aqi": model_host.aqi_cache, "llm": model_host.llm_cache, "heatmap": model_host.heatmap_cache},
+        **({"prediction": model_host.prediction_cache, "prediction_redis": model_host.prediction_cache.redis_stats}
+           if model_host.prediction_cache is not None else {})
+    ),
+    executors=executors,
+    batchers={"predict_traffic_congestion": traffic_batcher, "predict_weather": weather_batcher},
+    model_reloader=model_reloader,
+    breakers={"openweathermap": model_host.aqi_breaker, "openrouter": model_host.llm_breaker},
+)
+
+
+@app.on_event("startup")
+def start_warm_up():
+    # Serve /ready (and whatever is already loaded) while the rest loads in the background.
+    threading.Thread(target=warm_up_in_background, name="warm-up", daemon=True).start()
+    if MODEL_RELOAD_WATCH_SECONDS > 0:
+        model_reloader.watch(MODEL_RELOAD_WATCH_SECONDS)
+
+
+def warm_up_in_background():
+    for name in WARM_UP_ORDER:
+        try:
+            model_host.load_subsystem(name)
+        except Exception as e:
+            logger.error("[Startup] Failed to load %s: %s", name, e)
+
+
+@app.on_event("shutdown")
+def shutdown_executors():
+    model_reloader.stop()
+    executors.shutdown()
+
+
+@app.get("/ready")
+async def get_readiness(require: Optional[str] = None):
+    """
+    Readiness endpoint reporting the load state (cold/loading/warm/failed) of each subsystem.
+
+    Args:
+        require (str): Comma-separated subsystems that must be warm (default: all);
+            responds 503 otherwise.
+    """
+    required = require.split(",") if require else list(ModelHost.SUBSYSTEMS)
+    unknown = [name for name in required if name not in ModelHost.SUBSYSTEMS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown subsystems: {', '.join(unknown)}")
+
+    states = dict(model_host.subsystem_state)
+    ready = all(states[name] == "warm" for name in required)
+    if not ready:
+        raise HTTPException(status_code=503, detail={"ready": False, "subsystems": states})
+    return {"ready": True, "subsystems": states}
+
+
+@app.post("/admin/reload")
+async def reload_models(x_admin_token: Optional[str] = Header(None)):
+    """
+    Load the models and data again and swap them in once warm (see model_reload.py).
+
+    Requires the X-Admin-Token header to match MODEL_RELOAD_TOKEN. Under gunicorn only the
+    worker serving the request reloads; MODEL_RELOAD_WATCH_SECONDS reloads every worker.
+
+    Returns:
+        dict: The serving generation and the outcome of the reload (409 if a reload is
+        already running, 500 if the new generation failed to load).
+    """
+    if not MODEL_RELOAD_TOKEN:
+        raise HTTPException(status_code=403, detail="Reloading is disabled: MODEL_RELOAD_TOKEN is not set.")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token, MODEL_RELOAD_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token.")
+
+    try:
+        # Its own thread: loading must not hold up the prediction pools.
+        return await asyncio.to_thread(model_reloader.reload, "admin request")
+    except ReloadInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        logger.error("Error reloading the models: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/admin/reload")
+async def get_reload_status():
+    """
+    Serving generation, reload counts and the outcome of the last reload.
+    """
+    return model_reloader.status()
+
+
+@app.get("/stats/queues")
+async def get_queue_stats():
+    """
+    Endpoint reporting thread pool sizes, per-endpoint queueing and shedding statistics,
+    and the state of the upstream circuit breakers.
+    """
+    stats = executors.stats()
+    stats["microbatching"] = {
+        "enabled": MICROBATCH_ENABLED,
+        "predict_traffic_congestion": traffic_batcher.stats(),
+        "predict_weather": weather_batcher.stats(),
+    }
+    stats["circuit_breakers"] = {
+        "openweathermap": model_host.aqi_breaker.stats(),
+        "openrouter": model_host.llm_breaker.stats(),
+    }
+    return stats
+
+
+@app.get("/metrics")
+def get_metrics():
+    """
+    Prometheus metrics: request and stage latencies, caches, queues and batching.
+    """
+    body, content_type = metrics_response()
+    return Response(content=body, media_type=content_type)
+
+
+@app.get("/stats/memory")
+async def get_memory_stats():
+    """
+    Endpoint reporting RSS/PSS of this worker and, under gunicorn, of the master and all workers.
+    """
+    return worker_memory_report()
 
 
 @app.post("/predict/trafficCongestion")
@@ -581,17 +1857,58 @@ async def predict_traffic_congestion(request: CongestionRequest):
             'day': request.day,
         }
 
-        # Perform inference.
-        congestion_index = model_host.predict_traffic_congestion(input_data)
-        print("Congestion Index:", congestion_index)
+        # Perform inference (grouped with concurrent requests when micro-batching is on).
+        if MICROBATCH_ENABLED:
+            congestion_index = np.array([await traffic_batcher.submit(input_data)])
+        else:
+            congestion_index = await traffic_limiter.run(model_host.predict_traffic_congestion, input_data)
+        logger.debug("Congestion Index: %s", congestion_index)
 
         # Return the prediction in JSON format.
         return {"congestion_index": congestion_index.tolist()}
 
     except Exception as e:
-        print(f"Error during traffic congestion prediction: {str(e)}")
+        logger.error("Error during traffic congestion prediction: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/predict/trafficCongestion/heatmap")
+async def get_traffic_congestion_heatmap(
+    hour: int = Query(..., ge=0, le=23),
+    month: int = Query(..., ge=1, le=12),
+    day: int = Query(..., ge=1, le=31),
+    bbox: Optional[str] = None,
+    rows: int = Query(64, ge=1),
+    cols: int = Query(64, ge=1),
+    format: str = "json",
+    if_none_match: Optional[str] = Header(None),
+):
+    """
+    Endpoint for the congestion of every traffic site, or of a grid over a bounding box,
+    at one hour, day and month (see heatmap.py for the encodings).
+
+    Args:
+        bbox (str): "south,west,north,east"; rasterizes a rows x cols grid when given.
+        format (str): "json" (columnar) or "binary" (float32).
+
+    Responds 304 when If-None-Match carries the current ETag, and 400 for a date that does
+    not exist or an invalid bbox, grid size or format.
+    """
+    try:
+        heatmap = await heatmap_limiter.run(
+            model_host.get_congestion_heatmap, hour, month, day, bbox, rows, cols, format
+        )
+    except InvalidHeatmapRequest as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error("Error during heatmap generation: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+    headers = dict(heatmap.headers(), **{"Cache-Control": f"public, max-age={int(HEATMAP_CACHE_TTL_SECONDS)}"})
+    if if_none_match is not None and heatmap.etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=heatmap.body, media_type=heatmap.media_type, headers=headers)
+
 
 @app.post("/predict/weatherPred")
 async def predict_weather(request: WeatherRequest):
@@ -614,10 +1931,14 @@ async def predict_weather(request: WeatherRequest):
             'day': request.day,
         }
 
-        # Perform inference using the ModelHost.
+        # Perform inference using the ModelHost (grouped with concurrent requests when
+        # micro-batching is on).
         # Expecting shape (1, 4) from our multi-output model.
-        pred = model_host.predict_weather(input_data)
-        print("Weather Predictions:", pred)
+        if MICROBATCH_ENABLED:
+            pred = np.array([await weather_batcher.submit(input_data)])
+        else:
+            pred = await weather_limiter.run(model_host.predict_weather, input_data)
+        logger.debug("Weather Predictions: %s", pred)
 
         # Since 'pred' can be a 2D array (e.g., [[8.03, 75.76, 22.32, 1008.05]]),
         # handle the indexing accordingly.
@@ -632,24 +1953,110 @@ async def predict_weather(request: WeatherRequest):
         }
 
     except Exception as e:
-        print(f"Error during weather prediction: {str(e)}")
+        logger.error("Error during weather prediction: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/predict/trafficCongestion/batch")
+async def predict_traffic_congestion_batch(request: CongestionBatchRequest):
+    """
+    Endpoint for generating traffic congestion index predictions for many points at once.
+
+    Args:
+        request (CongestionBatchRequest): List of latitude, longitude, hour, month, and day.
+
+    Returns:
+        dict: A dictionary with one predicted congestion index per point, in request order.
+    """
+    if not request.points:
+        return {"congestion_index": []}
+
+    try:
+        input_data = [point.dict() for point in request.points]
+        congestion_index = await traffic_batch_limiter.run(model_host.predict_traffic_congestion_batch, input_data)
+
+        return {"congestion_index": congestion_index.tolist()}
+
+    except Exception as e:
+        logger.error("Error during batch traffic congestion prediction: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/predict/weatherPred/forecast")
+async def predict_weather_forecast(request: WeatherForecastRequest):
+    """
+    Endpoint for weather predictions at one location over a horizon or a date range.
+
+    Args:
+        request (WeatherForecastRequest): Location, start and either hours or end.
+
+    Returns:
+        dict: The nearest weather site's latitude and longitude, and columnar arrays
+        ("time", "temperature", "humidity", "wind_speed", "pressure").
+    """
+    try:
+        return await weather_forecast_limiter.run(
+            model_host.get_weather_forecast, request.latitude, request.longitude,
+            request.start, request.hours, request.end, request.step_hours
+        )
+    except Exception as e:
+        logger.error("Error during weather forecast: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/predict/weatherPred/batch")
+async def predict_weather_batch(request: WeatherBatchRequest):
+    """
+    Endpoint for generating weather predictions for many points at once.
+
+    Args:
+        request (WeatherBatchRequest): List of latitude, longitude, hour, month, and day.
+
+    Returns:
+        dict: A dictionary with one weather prediction per point, in request order.
+    """
+    if not request.points:
+        return {"predictions": []}
+
+    try:
+        input_data = [point.dict() for point in request.points]
+        pred = await weather_batch_limiter.run(model_host.predict_weather_batch, input_data)
+
+        return {
+            "predictions": [
+                {
+                    "temperature": float(result[0]),
+                    "humidity": float(result[1]),
+                    "wind_speed": float(result[2]),
+                    "pressure": float(result[3])
+                }
+                for result in pred
+            ]
+        }
+
+    except Exception as e:
+        logger.error("Error during batch weather prediction: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/recommend/fleetsize")
 async def get_fleet_size_recommendations(request: FleetRequest):
+    # Convert the request Pydantic model to a dictionary for the model host.
+    input_data = {
+        'month': request.month,
+        'total_buses': request.total_buses
+    }
     try:
-        # Convert the request Pydantic model to a dictionary for the model host.
-        input_data = {
-            'month': request.month
-        }
+        model_host.get_fleet_recommendation_params(input_data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        recommendations, dialogue_response = model_host.get_fleet_size(input_data)
+    try:
+        recommendations, dialogue_response = await fleet_limiter.run(model_host.get_fleet_size, input_data)
         
         # Convert recommendations DataFrame to a dictionary (which can be serialized by FastAPI)
         recommendations_dict = recommendations.to_dict(orient="records")
 
-        print("Recommendations:", recommendations_dict)
-        print("Dialogue:", dialogue_response)
+        logger.debug("Recommendations: %s", recommendations_dict)
+        logger.debug("Dialogue: %s", dialogue_response)
 
         return {
             "recommendations": recommendations_dict,  # Use dictionary format for serialization
@@ -657,44 +2064,127 @@ async def get_fleet_size_recommendations(request: FleetRequest):
         }
 
     except Exception as e:
-        print(f"Error during getting recommendations: {str(e)}")
+        logger.error("Error during getting recommendations: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
 
+@app.post("/recommend/fleetsize/scenarios")
+async def get_fleet_size_scenarios(request: FleetScenarioRequest):
+    """
+    Endpoint for recommended buses per month and operator over a grid of what-if scenarios
+    (totals x passenger growth x variability seeds), as one matrix.
+
+    Args:
+        request (FleetScenarioRequest): The scenario axes; e.g. totals 500-900, seeds
+            [null, 1, 2] and growth [{}, {"Dublin Bus": 0.05}].
+
+    Returns:
+        Response: JSON with the axes, their values, "shape" and the row-major "buses" matrix.
+    """
+    try:
+        body = await fleet_scenario_limiter.run(
+            model_host.get_fleet_scenarios, request.totals, request.seeds, request.growth, request.months
+        )
+    except Exception as e:
+        logger.error("Error during fleet scenario evaluation: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+    return Response(content=body, media_type="application/json")
+
+
+@app.post("/recommend/fleetsize/stream")
+async def stream_fleet_size_recommendations(request: FleetRequest, accept: Optional[str] = Header(None)):
+    """
+    Streaming variant of /recommend/fleetsize (NDJSON, or SSE with Accept: text/event-stream).
+    """
+    input_data = {
+        'month': request.month,
+        'total_buses': request.total_buses
+    }
+    try:
+        model_host.get_fleet_recommendation_params(input_data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await stream_events(fleet_limiter.stream(model_host.stream_fleet_size, input_data), accept)
+
+
 @app.post("/recommend/trashpickup")
 async def get_trash_pickup_recommendations_API(request: TrashPickupRecommendation):
     try:
         # Convert the request Pydantic model to a dictionary for the model host.
         id = request.route_id
-        recommendation = model_host.get_trash_pickup_recommendation(id)
+        recommendation, plan = await trash_limiter.run(
+            model_host.get_trash_pickup_recommendation, id, request.narrative
+        )
         
 
-        print("Recommendations:", recommendation)
+        logger.debug("Recommendations: %s", recommendation)
 
         return {
-            "recommendations": recommendation
+            "recommendations": recommendation,
+            "plan": plan
         }
 
     except Exception as e:
-        print(f"Error during getting recommendations: {str(e)}")
+        logger.error("Error during getting recommendations: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/recommend/trashpickup/stream")
+async def stream_trash_pickup_recommendations_API(request: TrashPickupRecommendation,
+                                                  accept: Optional[str] = Header(None)):
+    """
+    Streaming variant of /recommend/trashpickup (NDJSON, or SSE with Accept: text/event-stream).
+    """
+    return await stream_events(
+        trash_limiter.stream(model_host.stream_trash_pickup_recommendation, request.route_id, request.narrative),
+        accept
+    )
+
+@app.post("/recommend/trashpickup/schedule")
+async def get_trash_pickup_schedule_API(request: RouteScheduleRequest):
+    """
+    Endpoint for congestion at a route's scheduled pickup times and its least congested start.
+    """
+    try:
+        start_offsets(request.window_minutes, request.step_minutes)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        return await schedule_limiter.run(
+            model_host.get_route_schedule, request.route_id, request.date,
+            request.window_minutes, request.step_minutes
+        )
+
+    except Exception as e:
+        logger.error("Error during getting the route schedule: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+
 @app.post("/predict/AQI_TC")
 async def get_AQI_TC_API(request: TrashPickupRecommendation):
     try:
         route_id = str(request.route_id)
         
-        route_with_AQI_TC = model_host.get_list_of_AQI_TC(route_id)
+        route_with_AQI_TC = await aqi_tc_limiter.run(model_host.get_list_of_AQI_TC, route_id)
 
         return route_with_AQI_TC
 
     except Exception as e:
-        print(f"Error during getting AQI and Traffic Congestion: {str(e)}")
+        logger.error("Error during getting AQI and Traffic Congestion: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
     
 
 
+@app.post("/predict/AQI_TC/stream")
+async def stream_AQI_TC_API(request: TrashPickupRecommendation, accept: Optional[str] = Header(None)):
+    """
+    Streaming variant of /predict/AQI_TC: one event per stop as soon as its lookups complete
+    (NDJSON, or SSE with Accept: text/event-stream).
+    """
+    return await stream_events(aqi_tc_limiter.stream(model_host.stream_AQI_TC, str(request.route_id)), accept)
+
+
 # For development/debugging:
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
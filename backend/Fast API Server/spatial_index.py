@@ -0,0 +1,164 @@
+"""
+Nearest-site lookup over the fixed location tables used by the prediction models.
+
+The traffic and weather models only know about a fixed set of sites (Lat, Long).
+Every request has to be snapped to one of them, so this module builds a small
+in-memory index once at startup and answers nearest / k-nearest queries with
+vectorized NumPy haversine distances instead of a per-row Python loop.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Mean Earth radius in kilometers (IUGG).
+EARTH_RADIUS_KM = 6371.0088
+
+# Haversine (sphere) and geodesic (WGS-84 ellipsoid) distances differ by well under
+# half a percent, so every site within this relative slack of the haversine minimum is
+# re-ranked with geopy to return exactly the site the geodesic scan would pick.
+REFINE_SLACK = 0.005
+
+
+class SpatialIndex:
+    """
+    Vectorized nearest-neighbour index over a DataFrame with 'Lat' and 'Long' columns.
+    """
+
+    def __init__(self, location_df: pd.DataFrame, chunk_size: int = 1024):
+        """
+        Build the index from the location table.
+
+        Args:
+            location_df (pd.DataFrame): DataFrame containing columns 'Lat' and 'Long'.
+            chunk_size  (int):          Number of query points processed per distance matrix.
+        """
+        self.lats = location_df["Lat"].to_numpy(dtype=np.float64)
+        self.longs = location_df["Long"].to_numpy(dtype=np.float64)
+        self.chunk_size = chunk_size
+
+        self._lat_rad = np.radians(self.lats)
+        self._long_rad = np.radians(self.longs)
+        self._cos_lat = np.cos(self._lat_rad)
+
+    def __len__(self):
+        return len(self.lats)
+
+    def site(self, index: int):
+        """
+        Return the (Lat, Long) pair stored at a given position.
+        """
+        return self.lats[index], self.longs[index]
+
+    def _haversine(self, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+        """
+        Distance matrix in kilometers between query points (rows) and all sites (columns).
+        """
+        lat_rad = np.radians(latitudes)[:, None]
+        long_rad = np.radians(longitudes)[:, None]
+
+        a = (
+            np.sin((self._lat_rad - lat_rad) / 2.0) ** 2
+            + np.cos(lat_rad) * self._cos_lat * np.sin((self._long_rad - long_rad) / 2.0) ** 2
+        )
+        return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+    def query(self, latitudes, longitudes, k: int = 1):
+        """
+        Find the k nearest sites for each query point (haversine distance).
+
+        Args:
+            latitudes  (array-like): Query latitudes, shape (n,).
+            longitudes (array-like): Query longitudes, shape (n,).
+            k          (int):        Number of neighbours to return per point.
+
+        Returns:
+            tuple: (indices, distances_km), both of shape (n, k), sorted by distance.
+        """
+        latitudes = np.atleast_1d(np.asarray(latitudes, dtype=np.float64))
+        longitudes = np.atleast_1d(np.asarray(longitudes, dtype=np.float64))
+        if latitudes.shape != longitudes.shape:
+            raise ValueError("latitudes and longitudes must have the same shape.")
+
+        k = min(int(k), len(self))
+        if k < 1:
+            raise ValueError("k must be at least 1.")
+
+        indices = np.empty((len(latitudes), k), dtype=np.intp)
+        distances = np.empty((len(latitudes), k), dtype=np.float64)
+
+        for start in range(0, len(latitudes), self.chunk_size):
+            stop = start + self.chunk_size
+            dist = self._haversine(latitudes[start:stop], longitudes[start:stop])
+            rows = np.arange(dist.shape[0])[:, None]
+
+            if k < dist.shape[1]:
+                candidates = np.argpartition(dist, k - 1, axis=1)[:, :k]
+            else:
+                candidates = np.broadcast_to(np.arange(dist.shape[1]), dist.shape)
+
+            # Stable sort so that equal distances keep table order, like the original scan.
+            order = np.lexsort((candidates, dist[rows, candidates]), axis=1)
+            candidates = candidates[rows, order]
+
+            indices[start:stop] = candidates
+            distances[start:stop] = dist[rows, candidates]
+
+        return indices, distances
+
+    def nearest_many(self, latitudes, longitudes) -> np.ndarray:
+        """
+        Positions of the nearest site (by geodesic distance) for each query point.
+
+        Args:
+            latitudes  (array-like): Query latitudes, shape (n,).
+            longitudes (array-like): Query longitudes, shape (n,).
+
+        Returns:
+            np.ndarray: Integer positions into the location table, shape (n,).
+        """
+        latitudes = np.atleast_1d(np.asarray(latitudes, dtype=np.float64))
+        longitudes = np.atleast_1d(np.asarray(longitudes, dtype=np.float64))
+
+        # Repeated points (e.g. the same stop at several times) are looked up once.
+        if len(latitudes) > 1:
+            points, inverse = np.unique(np.column_stack([latitudes, longitudes]), axis=0, return_inverse=True)
+            if len(points) < len(latitudes):
+                return self.nearest_many(points[:, 0], points[:, 1])[inverse.ravel()]
+
+        result = np.empty(len(latitudes), dtype=np.intp)
+
+        for start in range(0, len(latitudes), self.chunk_size):
+            stop = start + self.chunk_size
+            dist = self._haversine(latitudes[start:stop], longitudes[start:stop])
+            threshold = dist.min(axis=1, keepdims=True) * (1.0 + REFINE_SLACK)
+
+            for row, (lat, long) in enumerate(zip(latitudes[start:stop], longitudes[start:stop])):
+                candidates = np.flatnonzero(dist[row] <= threshold[row])
+                if len(candidates) == 1:
+                    result[start + row] = candidates[0]
+                    continue
+
+                # Near-tie: re-rank the few candidates with the exact geodesic distance.
+                from geopy.distance import geodesic
+
+                best, min_distance = candidates[0], float("inf")
+                for candidate in candidates:
+                    distance = geodesic((lat, long), self.site(candidate)).kilometers
+                    if distance < min_distance:
+                        best, min_distance = candidate, distance
+                result[start + row] = best
+
+        return result
+
+    def nearest(self, latitude: float, longitude: float):
+        """
+        Find the nearest site to the given (latitude, longitude).
+
+        Args:
+            latitude  (float): Latitude of the user-provided location.
+            longitude (float): Longitude of the user-provided location.
+
+        Returns:
+            tuple: (nearest_lat, nearest_long)
+        """
+        return self.site(self.nearest_many([latitude], [longitude])[0])
@@ -0,0 +1,79 @@
+"""
+Streamed (NDJSON or server-sent events) responses.
+
+Streaming endpoints produce (event, data) pairs, e.g. ("stop", {...}) for each route
+stop as its lookups complete or ("token", "...") for each piece of LLM text. Clients
+get them as newline-delimited JSON ({"event": ..., "data": ...} per line) by default,
+or as server-sent events when they send `Accept: text/event-stream`.
+
+The first event is produced before the response starts, so requests that fail right
+away (e.g. an unknown route) still get an HTTP error status. Later failures end the
+stream with an "error" event.
+"""
+
+import json
+import logging
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+logger = logging.getLogger(__name__)
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+SSE_MEDIA_TYPE = "text/event-stream"
+
+
+def _json_default(value):
+    # NumPy scalars (AQI, congestion) serialize as their Python values.
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def encode_event(event: str, data, sse: bool) -> bytes:
+    """
+    One event as an NDJSON line or an SSE message.
+    """
+    if sse:
+        return f"event: {event}\ndata: {json.dumps(data, default=_json_default)}\n\n".encode("utf-8")
+    return (json.dumps({"event": event, "data": data}, default=_json_default) + "\n").encode("utf-8")
+
+
+async def stream_events(events, accept: str = None) -> StreamingResponse:
+    """
+    Stream an async iterator of (event, data) pairs.
+
+    Args:
+        events: Async iterator of (event, data) pairs, e.g. from EndpointLimiter.stream.
+        accept (str): The request's Accept header; "text/event-stream" selects SSE.
+
+    Returns:
+        StreamingResponse: The streamed response (raises HTTPException 500 if the
+        first event fails).
+    """
+    sse = accept is not None and SSE_MEDIA_TYPE in accept
+    try:
+        first = await events.__anext__()
+    except StopAsyncIteration:
+        first = None
+    except Exception as e:
+        logger.error("Error before the first streamed event: %s", e)
+        await events.aclose()
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def body():
+        try:
+            if first is not None:
+                yield encode_event(*first, sse)
+            async for event, data in events:
+                yield encode_event(event, data, sse)
+        except Exception as e:
+            logger.error("Error during streaming: %s", e)
+            yield encode_event("error", {"detail": str(e)}, sse)
+        finally:
+            await events.aclose()
+
+    return StreamingResponse(
+        body(), media_type=SSE_MEDIA_TYPE if sse else NDJSON_MEDIA_TYPE,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
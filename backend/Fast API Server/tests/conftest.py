@@ -0,0 +1,13 @@
+"""
+Tests run from the "Fast API Server" directory (python -m pytest tests), as the server
+reads ./data and ./models relative to its working directory. Their extra dependencies
+are in requirements-dev.txt.
+"""
+
+import os
+import sys
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, SERVER_DIR)
+os.chdir(SERVER_DIR)
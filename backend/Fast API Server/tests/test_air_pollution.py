@@ -0,0 +1,147 @@
+"""
+Tests for the per-stop AQI fan-out (ModelHost.get_air_pollution_many) against a local
+stub of the OpenWeatherMap air-pollution API.
+"""
+
+import http.server
+import logging
+import threading
+import time
+import urllib.parse
+
+import pytest
+
+import server
+from route_index import RouteStop
+
+STUB_DELAY_SECONDS = 0.2
+# Stops whose longitude is this value get an HTTP 500 from the stub.
+FAILING_LONGITUDE = -7.0
+
+
+class _AirPollutionHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Answers with an AQI derived from the latitude, so that every stop gets its own value.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        stub = self.server
+        query = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+        lat, lon = float(query["lat"][0]), float(query["lon"][0])
+        with stub.lock:
+            stub.requests += 1
+            stub.connections.add(self.client_address)
+            stub.in_flight += 1
+            stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+        try:
+            time.sleep(STUB_DELAY_SECONDS)
+            if lon == FAILING_LONGITUDE:
+                status, body = 500, b"{}"
+            else:
+                status, body = 200, b'{"list": [{"main": {"aqi": %d}}]}' % expected_aqi(lat)
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with stub.lock:
+                stub.in_flight -= 1
+
+
+def expected_aqi(lat: float) -> int:
+    return int(round((lat - 50.0) * 10)) + 2
+
+
+@pytest.fixture
+def stub():
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _AirPollutionHandler)
+    httpd.daemon_threads = True
+    httpd.lock = threading.Lock()
+    httpd.requests = 0
+    httpd.connections = set()
+    httpd.in_flight = 0
+    httpd.max_in_flight = 0
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def model_host(stub):
+    host = server.ModelHost(lazy=True)
+    host.AQI_API_URL_TEMPLATE = (
+        f"http://127.0.0.1:{stub.server_address[1]}/air_pollution?lat={{lat}}&lon={{lon}}&appid={{api_key}}"
+    )
+    yield host
+    host.route_stop_executor.shutdown(wait=False)
+
+
+def stops(n: int, failing=()):
+    # 0.1 degrees apart, so that every stop is in its own AQI cache cell.
+    return [
+        RouteStop(f"Place {i}", "08:00", 50.0 + i / 10, FAILING_LONGITUDE if i in failing else -6.0)
+        for i in range(n)
+    ]
+
+
+def test_lookups_run_concurrently_over_a_bounded_pool(model_host, stub):
+    n = 2 * server.ROUTE_STOP_CONCURRENCY
+    started = time.perf_counter()
+    model_host.get_air_pollution_many(stops(n))
+    elapsed = time.perf_counter() - started
+
+    assert stub.requests == n
+    assert 1 < stub.max_in_flight <= server.ROUTE_STOP_CONCURRENCY
+    # Two rounds of the pool, not one request after another.
+    assert elapsed < n * STUB_DELAY_SECONDS / 2
+
+
+def test_connections_are_reused_across_lookups(model_host, stub):
+    model_host.get_air_pollution_many(stops(server.ROUTE_STOP_CONCURRENCY))
+    model_host.aqi_cache.clear()
+    model_host.get_air_pollution_many(stops(server.ROUTE_STOP_CONCURRENCY))
+
+    assert stub.requests == 2 * server.ROUTE_STOP_CONCURRENCY
+    assert len(stub.connections) <= server.ROUTE_STOP_CONCURRENCY
+
+
+def test_results_are_in_stop_order(model_host):
+    route_stops = stops(12)
+    assert model_host.get_air_pollution_many(route_stops) == [expected_aqi(stop.lat) for stop in route_stops]
+
+
+def test_failed_lookups_fall_back_to_aqi_1(model_host):
+    route_stops = stops(6, failing={1, 4})
+    expected = [1 if stop.lon == FAILING_LONGITUDE else expected_aqi(stop.lat) for stop in route_stops]
+    assert model_host.get_air_pollution_many(route_stops) == expected
+    assert model_host.aqi_breaker.stats()["failures"] == 2
+
+
+def test_unreachable_api_falls_back_to_aqi_1(model_host):
+    model_host.AQI_API_URL_TEMPLATE = "http://127.0.0.1:9/air_pollution?lat={lat}&lon={lon}&appid={api_key}"
+    assert model_host.get_air_pollution_many(stops(3)) == [1, 1, 1]
+
+
+def test_open_breaker_does_not_log_every_lookup(model_host, stub, caplog):
+    n = 2 * server.CIRCUIT_FAILURE_THRESHOLD
+    all_failing = stops(n, failing=set(range(n)))
+    with caplog.at_level(logging.DEBUG):
+        model_host.get_air_pollution_many(all_failing)
+        assert model_host.aqi_breaker.state == "open"
+        opened = [record for record in caplog.records if "opened after" in record.getMessage()]
+        assert len(opened) == 1
+
+        caplog.clear()
+        requests_before = stub.requests
+        assert model_host.get_air_pollution_many(all_failing) == [1] * len(all_failing)
+
+    assert stub.requests == requests_before
+    assert [record.levelno for record in caplog.records] == [logging.DEBUG] * len(all_failing)
@@ -0,0 +1,83 @@
+"""
+Tests for micro-batching and load shedding on the batched endpoints.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from batching import MicroBatcher
+from executors import EndpointLimiter
+
+
+@pytest.fixture
+def pool():
+    pool = ThreadPoolExecutor(max_workers=2)
+    yield pool
+    pool.shutdown(wait=False)
+
+
+async def admitted_submit(limiter, batcher, item):
+    """
+    Submit `item` the way a request to a batched endpoint does (see AdmissionMiddleware).
+    """
+    if not limiter.admit_request():
+        return None
+    try:
+        return await batcher.submit(item)
+    finally:
+        limiter.release_request()
+
+
+def test_batches_resolve_every_request_in_order(pool):
+    batch_sizes = []
+
+    def predict_many(items):
+        batch_sizes.append(len(items))
+        return [item * 2 for item in items]
+
+    async def scenario():
+        limiter = EndpointLimiter("predict", pool, max_concurrency=1)
+        batcher = MicroBatcher(predict_many, limiter, max_batch_size=4, max_wait_seconds=0.01)
+        return await asyncio.gather(*[batcher.submit(i) for i in range(21)])
+
+    assert asyncio.run(scenario()) == [i * 2 for i in range(21)]
+    assert sum(batch_sizes) == 21
+    assert max(batch_sizes) <= 4
+
+
+def test_requests_waiting_in_the_batcher_count_towards_max_queue(pool):
+    release = threading.Event()
+
+    def predict_many(items):
+        release.wait(5)
+        return items
+
+    async def scenario():
+        limiter = EndpointLimiter("predict", pool, max_concurrency=1, max_queue=8)
+        batcher = MicroBatcher(predict_many, limiter, max_batch_size=64, max_wait_seconds=0.01)
+
+        # One request takes the only slot...
+        running = asyncio.ensure_future(admitted_submit(limiter, batcher, -1))
+        await asyncio.sleep(0.05)
+        # ...then a burst: every request is admitted or shed before any reaches the batcher.
+        tasks = [asyncio.ensure_future(admitted_submit(limiter, batcher, i)) for i in range(100)]
+        await asyncio.sleep(0.05)
+        stats = limiter.stats()
+
+        release.set()
+        results = await asyncio.gather(running, *tasks)
+        # Once the batches have run, requests are admitted again.
+        again = await admitted_submit(limiter, batcher, 100)
+        return stats, results, again, limiter
+
+    stats, results, again, limiter = asyncio.run(scenario())
+    assert results[0] == -1
+    assert [result for result in results[1:] if result is not None] == list(range(8))
+    assert limiter.shed == 92
+    assert stats["in_flight"] == 1
+    assert stats["waiting_requests"] == 8
+    assert again == 100
+    assert limiter.stats()["waiting_requests"] == 0
@@ -0,0 +1,75 @@
+"""
+Tests for the upstream circuit breaker's closed / open / half-open transitions.
+"""
+
+import pytest
+
+from circuit_breaker import CircuitBreaker, CircuitOpen
+
+
+def fail():
+    raise ConnectionError("upstream down")
+
+
+def open_breaker(reset_seconds: float) -> CircuitBreaker:
+    breaker = CircuitBreaker("upstream", failure_threshold=2, reset_seconds=reset_seconds)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+    assert breaker.state == "open"
+    return breaker
+
+
+def test_opens_after_consecutive_failures_and_rejects_calls():
+    breaker = open_breaker(reset_seconds=60.0)
+
+    with pytest.raises(CircuitOpen):
+        breaker.call(lambda: pytest.fail("called while open"))
+    assert breaker.stats() == {"state": "open", "calls": 2, "failures": 2, "rejected": 1, "opened": 1}
+
+
+def test_a_success_resets_the_failure_count():
+    breaker = CircuitBreaker("upstream", failure_threshold=2)
+
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+        assert breaker.call(lambda: "ok") == "ok"
+
+    assert breaker.state == "closed"
+
+
+def test_half_open_lets_one_trial_through():
+    breaker = open_breaker(reset_seconds=0.0)
+
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_failed_trial_opens_again():
+    breaker = open_breaker(reset_seconds=0.0)
+
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)
+
+    assert breaker.state == "open"
+    assert breaker.stats()["opened"] == 2
+
+
+@pytest.mark.parametrize("exception", [KeyboardInterrupt, SystemExit, GeneratorExit])
+def test_interrupted_trial_lets_the_next_trial_through(exception):
+    breaker = open_breaker(reset_seconds=0.0)
+
+    def interrupted():
+        raise exception
+
+    with pytest.raises(exception):
+        breaker.call(interrupted)
+
+    assert breaker.state == "half_open"
+    assert breaker.stats()["failures"] == 2
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.state == "closed"
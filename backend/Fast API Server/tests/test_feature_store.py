@@ -0,0 +1,129 @@
+"""
+Tests for the pre-encoded feature store with a small stand-in preprocessor, and for the
+DataFrame fallback of sites listed more than once.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import server
+from feature_store import SiteFeatureStore
+from spatial_index import SpatialIndex
+
+sklearn_compose = pytest.importorskip("sklearn.compose")
+sklearn_preprocessing = pytest.importorskip("sklearn.preprocessing")
+
+
+@pytest.fixture(scope="module")
+def store():
+    rng = np.random.default_rng(0)
+    dataset = pd.DataFrame({
+        "Lat": np.round(53.2 + rng.random(12) * 0.3, 4),
+        "Long": np.round(-6.4 + rng.random(12) * 0.3, 4),
+        "Area": rng.choice(["north", "south", "centre"], 12),
+        "Population": rng.integers(100, 5000, 12),
+    })
+    preprocessor = sklearn_compose.ColumnTransformer([
+        ("categorical", sklearn_preprocessing.OneHotEncoder(handle_unknown="ignore"), ["Area", "Hour"]),
+        ("numeric", sklearn_preprocessing.StandardScaler(), ["Lat", "Long", "Day", "Month", "Population"]),
+    ], sparse_threshold=0.0)
+    frame = dataset.assign(Hour=rng.integers(0, 24, 12), Day=rng.integers(1, 32, 12), Month=rng.integers(1, 13, 12))
+    preprocessor.fit(frame)
+    store = SiteFeatureStore(dataset, preprocessor)
+    assert store.enabled
+    return store
+
+
+def test_only_unsupported_rows_take_the_fallback(store):
+    n = 40
+    rng = np.random.default_rng(1)
+    positions = rng.integers(0, 12, n)
+    hours, months, days = rng.integers(0, 24, n), rng.integers(1, 13, n), rng.integers(1, 29, n)
+    hours[[3, 17]] = 24
+    positions[30] = -1
+
+    fallback_rows = []
+
+    def fallback(rows):
+        fallback_rows.append(rows.tolist())
+        safe_positions = np.where(positions[rows] < 0, 0, positions[rows])
+        return store.preprocessor.transform(store.frame(safe_positions, hours[rows], months[rows], days[rows]))
+
+    encoded = store.encode_rows(positions, hours, months, days, fallback)
+
+    assert fallback_rows == [[3, 17, 30]]
+    supported = np.setdiff1d(np.arange(n), [3, 17, 30])
+    np.testing.assert_allclose(
+        encoded[supported],
+        store.preprocessor.transform(store.frame(positions[supported], hours[supported], months[supported],
+                                                 days[supported])),
+        atol=1e-9,
+    )
+    np.testing.assert_array_equal(encoded[[3, 17, 30]], fallback(np.array([3, 17, 30])))
+
+
+def test_fully_supported_batches_do_not_call_the_fallback(store):
+    positions, hours, months, days = np.arange(12), np.arange(12), np.full(12, 6), np.full(12, 15)
+    encoded = store.encode_rows(positions, hours, months, days, lambda rows: pytest.fail("fallback called"))
+    np.testing.assert_array_equal(encoded, store.encode_many(positions, hours, months, days))
+
+
+def test_disabled_store_uses_the_fallback_for_every_row(store):
+    store.enabled = False
+    try:
+        marker = np.zeros((3, 1))
+        assert store.encode_rows([0, 1, 2], [1, 2, 3], [1, 1, 1], [1, 1, 1], lambda rows: marker) is marker
+    finally:
+        store.enabled = True
+
+
+@pytest.fixture(scope="module")
+def duplicated_sites():
+    """
+    Six sites, the first two listed again with other features, and a store over them.
+    """
+    rng = np.random.default_rng(2)
+    dataset = pd.DataFrame({
+        "Lat": np.round(53.2 + rng.random(6) * 0.3, 4),
+        "Long": np.round(-6.4 + rng.random(6) * 0.3, 4),
+        "Area": rng.choice(["north", "south", "centre"], 6),
+        "Population": rng.integers(100, 5000, 6),
+    })
+    duplicates = dataset.iloc[[0, 1]].assign(Area=["west", "east"], Population=[1, 2])
+    dataset = pd.concat([dataset, duplicates], ignore_index=True)
+
+    preprocessor = sklearn_compose.ColumnTransformer([
+        ("categorical", sklearn_preprocessing.OneHotEncoder(handle_unknown="ignore"), ["Area", "Hour"]),
+        ("numeric", sklearn_preprocessing.StandardScaler(), ["Lat", "Long", "Day", "Month", "Population"]),
+    ], sparse_threshold=0.0)
+    preprocessor.fit(dataset.assign(Hour=rng.integers(0, 24, 8), Day=rng.integers(1, 32, 8),
+                                    Month=rng.integers(1, 13, 8)))
+    store = SiteFeatureStore(dataset, preprocessor)
+    assert store.enabled
+    return dataset, preprocessor, store, SpatialIndex(dataset.drop_duplicates(["Lat", "Long"]))
+
+
+@pytest.mark.parametrize("hour", [8, 24])
+def test_duplicated_sites_encode_the_same_row_in_batch_and_single_point_paths(duplicated_sites, hour):
+    # Hour 24 is not tabulated, so both paths take the DataFrame fallback.
+    dataset, preprocessor, store, index = duplicated_sites
+    host = server.ModelHost(lazy=True)
+    sites = np.arange(len(index))
+
+    batch = host.encode_site_features(index, store, preprocessor, dataset, sites,
+                                      np.full(len(sites), hour), np.full(len(sites), 3), np.full(len(sites), 14))
+
+    assert batch.shape[0] == len(sites)
+    for site in sites:
+        lat, long = index.site(site)
+        single = host.encode_features(store, preprocessor, dataset, lat, long, hour, 3, 14)
+        assert single.shape[0] == 1
+        np.testing.assert_allclose(batch[site], single[0], atol=1e-9)
+        # The store, where it applies, encodes the same (first) row as well.
+        store.enabled = False
+        try:
+            fallback = host.encode_features(store, preprocessor, dataset, lat, long, hour, 3, 14)
+        finally:
+            store.enabled = True
+        np.testing.assert_allclose(single, fallback, atol=1e-9)
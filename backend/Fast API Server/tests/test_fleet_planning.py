@@ -0,0 +1,130 @@
+"""
+Tests for the largest-remainder fleet apportionment, the what-if scenario grid and the
+validation of /recommend/fleetsize.
+"""
+
+import json
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+from fleet_planning import DEFAULT_TOTAL_BUSES, apportion, scenario_allocations, variability
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_apportion_sums_to_total_and_stays_within_one_of_quota(seed):
+    rng = np.random.default_rng(seed)
+    weights = rng.uniform(0.1, 100.0, (200, 7))
+    totals = rng.integers(0, 2000, 200)
+
+    buses = apportion(weights, totals)
+
+    quotas = weights / weights.sum(axis=1, keepdims=True) * totals[:, None]
+    assert buses.dtype.kind == "i"
+    np.testing.assert_array_equal(buses.sum(axis=1), totals)
+    assert (np.abs(buses - quotas) < 1).all()
+    assert (buses >= 0).all()
+
+
+def test_apportion_broadcasts_totals_over_weights():
+    weights = np.array([3.0, 2.0, 1.0])
+
+    buses = apportion(weights[None, :], np.array([6, 7, 100]))
+
+    assert buses.shape == (3, 3)
+    np.testing.assert_array_equal(buses[0], [3, 2, 1])
+    np.testing.assert_array_equal(buses.sum(axis=-1), [6, 7, 100])
+
+
+def test_apportion_gives_nothing_to_nan_weights():
+    buses = apportion(np.array([np.nan, 1.0, np.nan, 3.0]), 10)
+
+    # Quotas 2.5 and 7.5: the tied leftover bus goes to the earlier operator.
+    assert buses.tolist() == [0, 3, 0, 7]
+
+
+@pytest.mark.parametrize("n_operators,total", [(3, 2), (4, 1), (5, 13), (7, 711)])
+def test_apportion_breaks_ties_towards_earlier_operators(n_operators, total):
+    buses = apportion(np.ones(n_operators), total)
+
+    base, leftover = divmod(total, n_operators)
+    expected = [base + 1] * leftover + [base] * (n_operators - leftover)
+    assert buses.tolist() == expected
+    assert apportion(np.ones(n_operators), total).tolist() == expected
+
+
+@pytest.mark.parametrize("path", ["/recommend/fleetsize", "/recommend/fleetsize/stream"])
+@pytest.mark.parametrize("body", [{"month": 13}, {"month": 0}, {"month": 1, "total_buses": -1}])
+def test_invalid_fleet_requests_are_bad_requests(path, body):
+    response = TestClient(server.app).post(path, json=body)
+
+    assert response.status_code == 400
+
+
+@pytest.fixture(scope="module")
+def fleet_host():
+    # Only the fleet subsystem (data/fleet_recommendation) is loaded.
+    return server.ModelHost(lazy=True)
+
+
+def scenarios(host, **axes) -> dict:
+    axes = dict({"totals": [DEFAULT_TOTAL_BUSES], "seeds": [None], "growth": [{}], "months": None}, **axes)
+    return json.loads(host.get_fleet_scenarios(axes["totals"], axes["seeds"], axes["growth"], axes["months"]))
+
+
+def recommended(host, month: int, total: int) -> list:
+    table = host.get_recommendations(month, total).set_index("Bus City Services")["Scaled Recommended Buses"]
+    return [int(table.get(operator, 0)) for operator in host.fleet_cities]
+
+
+@pytest.mark.parametrize("total", [0, 1, 500, DEFAULT_TOTAL_BUSES, 1234])
+def test_published_scenario_cells_match_the_recommendations(fleet_host, total):
+    result = scenarios(fleet_host, totals=[total])
+
+    buses = np.array(result["buses"]).reshape(result["shape"])
+    for m, month in enumerate(result["months"]):
+        assert buses[0, 0, 0, m].tolist() == recommended(fleet_host, month, total)
+
+
+def test_scenario_buses_are_row_major_over_the_axes(fleet_host):
+    operators = fleet_host.fleet_cities.tolist()
+    totals, seeds, months = [500, 711, 900], [None, 1, 7], [3, 1]
+    growth = [{}, {operators[1]: 0.5}]
+
+    result = scenarios(fleet_host, totals=totals, seeds=seeds, growth=growth, months=months)
+
+    assert result["axes"] == ["total", "growth", "seed", "month", "operator"]
+    assert result["shape"] == [3, 2, 3, 2, len(operators)]
+    assert result["months"] == months and result["operators"] == operators
+    assert len(result["buses"]) == int(np.prod(result["shape"]))
+
+    buses = np.array(result["buses"]).reshape(result["shape"])
+    np.testing.assert_array_equal(buses.sum(axis=-1), np.broadcast_to(np.array(totals)[:, None, None, None],
+                                                                      buses.shape[:-1]))
+    for t, total in enumerate(totals):
+        for m, month in enumerate(months):
+            assert buses[t, 0, 0, m].tolist() == recommended(fleet_host, month, total)
+    # Growth for one operator only ever adds buses to it; another seed changes the split.
+    assert (buses[:, 1, :, :, 1] >= buses[:, 0, :, :, 1]).all()
+    assert (buses[:, 1, :, :, 1] > buses[:, 0, :, :, 1]).any()
+    assert (buses[:, :, 1] != buses[:, :, 0]).any()
+
+
+def test_scenario_allocations_apportion_each_cell_independently():
+    rng = np.random.default_rng(0)
+    months = np.arange(1, 4)
+    demand = rng.uniform(100.0, 1000.0, (3, 4))
+    demand[1, 2] = np.nan
+    factors = np.stack([variability(months, demand), variability(months, demand, 5)])
+    growth = np.array([[0.0, 0.0, 0.0, 0.0], [0.1, 0.0, -0.2, 0.3]])
+    totals = [10, 711]
+
+    buses = scenario_allocations(demand, factors, growth, totals)
+
+    assert buses.shape == (2, 2, 2, 3, 4)
+    for t, g, s, m in np.ndindex(buses.shape[:-1]):
+        weights = demand[m] * factors[s, m] * (1.0 + growth[g])
+        np.testing.assert_array_equal(buses[t, g, s, m], apportion(weights, totals[t]))
+    assert (buses[..., 1, 2] == 0).all()
@@ -0,0 +1,134 @@
+"""
+Tests for the forecast cube: its day-of-year indexing, and a round trip (build, memory-
+mapped load, lookup) on a small location table against live traffic predictions of
+stand-in models.
+"""
+
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import server
+from benchmarks.environment import train_stand_in_models
+from forecast_cube import DAYS, HOURS, ForecastCube, build_forecast_cube, day_of_year
+
+N_SITES = 6
+
+
+@pytest.mark.parametrize("month,day,index", [(1, 1, 0), (1, 31, 30), (2, 1, 31), (2, 28, 58), (2, 29, 59),
+                                             (3, 1, 60), (12, 31, 365)])
+def test_day_of_year_uses_the_leap_year_calendar(month, day, index):
+    indices, valid = day_of_year([month], [day])
+
+    assert valid.tolist() == [True]
+    assert indices.tolist() == [index]
+
+
+@pytest.mark.parametrize("month,day", [(2, 30), (4, 31), (6, 31), (11, 31), (1, 32), (1, 0), (0, 1), (13, 1),
+                                       (-1, 5)])
+def test_day_of_year_flags_invalid_dates(month, day):
+    indices, valid = day_of_year([month], [day])
+
+    assert valid.tolist() == [False]
+    assert indices.tolist() == [0]
+
+
+def test_day_of_year_covers_every_slot_once():
+    months = np.repeat(np.arange(1, 13), 31)
+    days = np.tile(np.arange(1, 32), 12)
+
+    indices, valid = day_of_year(months, days)
+
+    assert valid.sum() == DAYS
+    assert sorted(indices[valid].tolist()) == list(range(DAYS))
+
+
+@pytest.fixture(scope="module")
+def workdir(tmp_path_factory):
+    """
+    A server working directory with the first N_SITES traffic sites and stand-in models.
+    """
+    workdir = tmp_path_factory.mktemp("cube")
+    traffic_dir = workdir / "data" / "traffic_congestion"
+    traffic_dir.mkdir(parents=True)
+
+    locations = pd.read_csv("./data/traffic_congestion/Final Lat Longl v1.csv")
+    features = pd.read_csv("./data/traffic_congestion/Additional Features Final v1.csv")
+    known = locations.merge(features[["Lat", "Long"]].drop_duplicates(), on=["Lat", "Long"])
+    sites = known.head(N_SITES)
+    sites.to_csv(traffic_dir / "Final Lat Longl v1.csv", index=False)
+    features.merge(sites, on=["Lat", "Long"]).to_csv(traffic_dir / "Additional Features Final v1.csv", index=False)
+
+    models_dir = workdir / "stand_in_models"
+    train_stand_in_models("./data", str(models_dir), n_rows=500)
+    shutil.copytree(models_dir / "traffic_congestion", workdir / "models" / "traffic_congestion")
+    return workdir
+
+
+@pytest.fixture
+def cube_path(workdir, monkeypatch):
+    path = workdir / "models" / "traffic_congestion" / "forecast_cube.npy"
+    for stale in (path, path.with_name(path.name + ".json")):
+        if stale.exists():
+            stale.unlink()
+    monkeypatch.chdir(workdir)
+    monkeypatch.setattr(server, "TRAFFIC_FORECAST_CUBE", str(path))
+    return str(path)
+
+
+def traffic_inputs(n: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    # Days 1-28 exist in every month.
+    inputs = list(zip(rng.integers(0, N_SITES, n), rng.integers(0, HOURS, n),
+                      rng.integers(1, 13, n), rng.integers(1, 29, n)))
+    # The leap day and the last hour of the year have their own slots.
+    return inputs + [(0, 12, 2, 29), (N_SITES - 1, 23, 12, 31)]
+
+
+def test_round_trip_matches_live_predictions(cube_path):
+    live = server.ModelHost(lazy=True)
+    assert live.traffic_forecast_cube is None
+
+    # A chunk size that does not divide the number of sites.
+    build_forecast_cube(live, cube_path, chunk_sites=4)
+
+    index = live.traffic_location_index
+    cube = ForecastCube.load(cube_path, live.traffic_model_version, index.lats, index.longs)
+    assert isinstance(cube.values, np.memmap)
+    assert cube.values.shape == (N_SITES, DAYS, HOURS)
+
+    served = server.ModelHost(lazy=True)
+    assert served.traffic_forecast_cube is not None
+
+    for site, hour, month, day in traffic_inputs(40):
+        lat, lon = index.site(site)
+        query = {"latitude": lat, "longitude": lon, "hour": hour, "month": month, "day": day}
+        expected = float(live.predict_traffic_congestion(query)[0])
+        assert cube.lookup(site, hour, month, day) == pytest.approx(expected, rel=1e-5, abs=1e-6)
+        assert float(served.predict_traffic_congestion(query)[0]) == pytest.approx(expected, rel=1e-5, abs=1e-6)
+
+
+def test_lookup_flags_times_outside_the_cube(cube_path):
+    host = server.ModelHost(lazy=True)
+    build_forecast_cube(host, cube_path)
+    index = host.traffic_location_index
+    cube = ForecastCube.load(cube_path, host.traffic_model_version, index.lats, index.longs)
+
+    _, valid = cube.lookup_many([0, 0, 0, 0], [0, 24, 5, 5], [2, 1, 2, 4], [29, 1, 30, 31])
+
+    assert valid.tolist() == [True, False, False, False]
+    assert cube.lookup(0, 5, 2, 30) is None
+
+
+def test_cube_of_another_model_or_site_table_is_ignored(cube_path):
+    host = server.ModelHost(lazy=True)
+    build_forecast_cube(host, cube_path)
+    index = host.traffic_location_index
+
+    assert ForecastCube.load(cube_path, "another model", index.lats, index.longs) is None
+    assert ForecastCube.load(cube_path, host.traffic_model_version, index.lats[::-1], index.longs[::-1]) is None
+    assert ForecastCube.load(cube_path + ".missing", host.traffic_model_version, index.lats, index.longs) is None
+    assert not os.path.exists(cube_path + ".tmp.npy")
@@ -0,0 +1,155 @@
+"""
+Tests for heatmap rasterization, the binary encodings and the ETag / 304 handling of
+/predict/trafficCongestion/heatmap.
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+from heatmap import (MAX_SITE_DISTANCE_KM, InvalidHeatmapRequest, check_time_slice, encode_grid, encode_sites,
+                     grid_centres, parse_bbox, rasterize)
+from spatial_index import EARTH_RADIUS_KM, SpatialIndex
+
+BBOX = (53.30, -6.35, 53.40, -6.20)
+
+
+def haversine_km(lat, lon, site_lats, site_lons):
+    lat, lon, site_lats, site_lons = map(np.radians, (lat, lon, site_lats, site_lons))
+    a = np.sin((site_lats - lat) / 2) ** 2 + np.cos(lat) * np.cos(site_lats) * np.sin((site_lons - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+@pytest.fixture
+def sites():
+    rng = np.random.default_rng(0)
+    lats = rng.uniform(53.32, 53.38, 12)
+    lons = rng.uniform(-6.33, -6.22, 12)
+    return SpatialIndex(pd.DataFrame({"Lat": lats, "Long": lons})), rng.uniform(0, 10, 12)
+
+
+def test_rasterize_matches_brute_force_inverse_distance_weighting(sites):
+    index, values = sites
+    rows, cols = 9, 13
+
+    grid = rasterize(index, values, BBOX, rows, cols)
+
+    lats, lons = grid_centres(BBOX, rows, cols)
+    expected = np.empty((rows, cols))
+    for row in range(rows):
+        for col in range(cols):
+            distances = haversine_km(lats[row, col], lons[row, col], index.lats, index.longs)
+            nearest = np.argsort(distances)[:4]
+            weights = 1 / np.maximum(distances[nearest], 1e-3) ** 2
+            expected[row, col] = (weights * values[nearest]).sum() / weights.sum()
+    assert grid.shape == (rows, cols) and grid.dtype == np.float32
+    np.testing.assert_allclose(grid, expected, rtol=1e-5)
+
+
+def test_rasterize_leaves_cells_far_from_every_site_empty(sites):
+    index, values = sites
+    # One degree of latitude is ~111 km, so the southern half is far from every site.
+    bbox = (52.35, -6.35, 53.40, -6.20)
+
+    grid = rasterize(index, values, bbox, 20, 4)
+
+    lats, lons = grid_centres(bbox, 20, 4)
+    nearest = np.array([[haversine_km(lat, lon, index.lats, index.longs).min()
+                         for lat, lon in zip(lat_row, lon_row)] for lat_row, lon_row in zip(lats, lons)])
+    np.testing.assert_array_equal(np.isnan(grid), nearest > MAX_SITE_DISTANCE_KM)
+    assert np.isnan(grid).any() and not np.isnan(grid).all()
+
+
+def test_binary_sites_are_little_endian_float32_rows_of_lat_lon_congestion():
+    lats, lons, values = np.array([53.1, 53.2]), np.array([-6.1, -6.2]), np.array([1.5, 2.5])
+
+    heatmap = encode_sites(lats, lons, values, "binary")
+
+    decoded = np.frombuffer(heatmap.body, dtype="<f4").reshape(heatmap.shape)
+    assert heatmap.shape == (3, 2)
+    assert heatmap.media_type == "application/octet-stream"
+    np.testing.assert_allclose(decoded, np.stack([lats, lons, values]), rtol=1e-6)
+
+
+def test_binary_grid_is_row_major_with_nan_cells():
+    grid = np.array([[1.0, np.nan, 3.0], [4.0, 5.0, 6.0]], dtype=np.float32)
+
+    heatmap = encode_grid(grid, BBOX, "binary")
+
+    decoded = np.frombuffer(heatmap.body, dtype="<f4").reshape(heatmap.shape)
+    np.testing.assert_array_equal(decoded, grid)
+    assert heatmap.headers()["X-Heatmap-Shape"] == "2,3"
+    assert heatmap.headers()["X-Heatmap-Bbox"] == ",".join(str(value) for value in BBOX)
+
+
+def test_json_grid_has_null_for_empty_cells():
+    grid = np.array([[1.0, np.nan]], dtype=np.float32)
+
+    body = json.loads(encode_grid(grid, BBOX, "json").body)
+
+    assert body == {"bbox": list(BBOX), "shape": [1, 2], "congestion": [1.0, None]}
+
+
+def test_etag_follows_the_body():
+    lats, lons = np.array([53.1]), np.array([-6.1])
+
+    first = encode_sites(lats, lons, np.array([1.0]), "json")
+    same = encode_sites(lats, lons, np.array([1.0]), "json")
+    other = encode_sites(lats, lons, np.array([2.0]), "json")
+
+    assert first.etag == same.etag != other.etag
+
+
+@pytest.mark.parametrize("hour,month,day", [(0, 2, 30), (0, 4, 31), (0, 13, 1), (0, 1, 0), (24, 1, 1)])
+def test_invalid_time_slices_are_rejected(hour, month, day):
+    with pytest.raises(InvalidHeatmapRequest):
+        check_time_slice(hour, month, day)
+
+
+def test_leap_day_is_a_valid_time_slice():
+    check_time_slice(23, 2, 29)
+
+
+@pytest.mark.parametrize("bbox", ["1,2,3", "a,b,c,d", "53.4,-6.3,53.3,-6.2", "53.3,-6.2,53.4,-6.3"])
+def test_invalid_bboxes_are_rejected(bbox):
+    with pytest.raises(InvalidHeatmapRequest):
+        parse_bbox(bbox)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    heatmap = encode_sites(np.array([53.1]), np.array([-6.1]), np.array([1.0]), "json")
+    monkeypatch.setattr(server.model_host, "get_congestion_heatmap", lambda *args: heatmap)
+    return TestClient(server.app), heatmap
+
+
+def test_matching_if_none_match_is_not_modified(client):
+    client, heatmap = client
+
+    response = client.get("/predict/trafficCongestion/heatmap?hour=8&month=3&day=14")
+    assert response.status_code == 200
+    assert response.headers["ETag"] == heatmap.etag
+    assert response.content == heatmap.body
+
+    cached = client.get("/predict/trafficCongestion/heatmap?hour=8&month=3&day=14",
+                        headers={"If-None-Match": f'"stale", {heatmap.etag}'})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["ETag"] == heatmap.etag
+
+    stale = client.get("/predict/trafficCongestion/heatmap?hour=8&month=3&day=14",
+                       headers={"If-None-Match": '"stale"'})
+    assert stale.status_code == 200
+
+
+@pytest.mark.parametrize("query", ["month=2&day=30", "month=4&day=31", "month=1&day=1&format=png",
+                                   "month=1&day=1&bbox=53.4,-6.3,53.3,-6.2"])
+def test_invalid_requests_are_bad_requests(query, caplog):
+    response = TestClient(server.app).get(f"/predict/trafficCongestion/heatmap?hour=8&{query}")
+
+    assert response.status_code == 400
+    assert not [record for record in caplog.records if record.levelname == "ERROR"]
@@ -0,0 +1,84 @@
+"""
+Tests for /metrics in multi-worker mode: gunicorn.conf.py sets up PROMETHEUS_MULTIPROC_DIR,
+a scrape adds up the metrics of every worker process, and exited workers leave the live
+gauges. Workers and scrapes run as separate processes, as under gunicorn.
+"""
+
+import os
+import runpy
+import subprocess
+import sys
+import types
+
+import pytest
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKER = """
+import metrics
+with metrics.stage("predict"):
+    pass
+metrics.REQUESTS_IN_FLIGHT.labels("/predict/trafficCongestion").inc()
+"""
+
+SCRAPE = """
+import metrics
+assert metrics.MULTIPROCESS
+print(metrics.metrics_response()[0].decode())
+"""
+
+
+def run(code: str) -> str:
+    result = subprocess.run([sys.executable, "-c", code], cwd=SERVER_DIR, env=dict(os.environ),
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+
+def start_worker() -> int:
+    process = subprocess.Popen([sys.executable, "-c", WORKER], cwd=SERVER_DIR, env=dict(os.environ))
+    assert process.wait(timeout=60) == 0
+    return process.pid
+
+
+def sample(metrics_text: str, prefix: str) -> float:
+    values = [float(line.rsplit(" ", 1)[1]) for line in metrics_text.splitlines() if line.startswith(prefix)]
+    return sum(values)
+
+
+@pytest.fixture
+def gunicorn_conf(tmp_path, monkeypatch):
+    # Restored afterwards; loading the config sets them for the master process.
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    monkeypatch.setenv("SERVER_LAZY_LOAD", "true")
+    monkeypatch.setenv("SERVER_WORKER_MODE", "single")
+    (tmp_path / "histogram_1.db").write_bytes(b"from a previous run")
+
+    conf = runpy.run_path(os.path.join(SERVER_DIR, "gunicorn.conf.py"))
+
+    assert not (tmp_path / "histogram_1.db").exists()
+    return conf, tmp_path
+
+
+def test_scrapes_add_up_every_worker_and_drop_exited_workers_gauges(gunicorn_conf):
+    conf, directory = gunicorn_conf
+    workers = [start_worker(), start_worker()]
+
+    scraped = run(SCRAPE)
+    assert sample(scraped, 'model_host_stage_duration_seconds_count{stage="predict"}') == 2
+    assert sample(scraped, 'http_requests_in_flight{endpoint="/predict/trafficCongestion"}') == 2
+
+    conf["child_exit"](None, types.SimpleNamespace(pid=workers[0]))
+
+    assert not (directory / f"gauge_livesum_{workers[0]}.db").exists()
+    scraped = run(SCRAPE)
+    assert sample(scraped, 'model_host_stage_duration_seconds_count{stage="predict"}') == 2
+    assert sample(scraped, 'http_requests_in_flight{endpoint="/predict/trafficCongestion"}') == 1
+
+
+def test_single_process_mode_uses_the_default_registry(monkeypatch):
+    monkeypatch.delenv("PROMETHEUS_MULTIPROC_DIR", raising=False)
+
+    scraped = run(SCRAPE.replace("assert metrics.MULTIPROCESS", "assert not metrics.MULTIPROCESS"))
+
+    assert "model_host_stage_duration_seconds" in scraped
@@ -0,0 +1,151 @@
+"""
+Tests for hot reloading: the /admin/reload token check, the swap to a new generation and
+keeping the serving generation when a new one fails to load.
+"""
+
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+from model_reload import ModelReloader, ReloadInProgress
+
+TOKEN = "reload-secret"
+
+
+class Generation:
+    def __init__(self, number: int):
+        self.number = number
+
+
+@pytest.fixture
+def installed(monkeypatch):
+    """
+    Generations installed through `server.install_model_host`; `server.model_host` is restored afterwards.
+    """
+    monkeypatch.setattr(server, "model_host", Generation(1))
+    installed = []
+
+    def install(host):
+        installed.append(host)
+        server.install_model_host(host)
+
+    return installed, install
+
+
+@pytest.fixture
+def admin(monkeypatch, installed):
+    """
+    A client for /admin/reload with MODEL_RELOAD_TOKEN set and a reloader building `Generation`s.
+    """
+    installed, install = installed
+    monkeypatch.setattr(server, "MODEL_RELOAD_TOKEN", TOKEN)
+    reloader = ModelReloader(server.model_host, lambda previous: Generation(previous.number + 1), install,
+                             watch_directories=())
+    monkeypatch.setattr(server, "model_reloader", reloader)
+    return TestClient(server.app), reloader, installed
+
+
+def test_reload_is_disabled_without_a_token(admin, monkeypatch):
+    client, _, installed = admin
+    monkeypatch.setattr(server, "MODEL_RELOAD_TOKEN", None)
+
+    response = client.post("/admin/reload", headers={"X-Admin-Token": TOKEN})
+
+    assert response.status_code == 403
+    assert "disabled" in response.json()["detail"]
+    assert installed == []
+
+
+@pytest.mark.parametrize("headers", [{}, {"X-Admin-Token": "wrong"}, {"X-Admin-Token": TOKEN + "x"}])
+def test_reload_requires_the_admin_token(admin, headers):
+    client, reloader, installed = admin
+
+    response = client.post("/admin/reload", headers=headers)
+
+    assert response.status_code == 403
+    assert installed == [] and reloader.generation == 1
+    assert server.model_host.number == 1
+
+
+def test_reload_swaps_in_the_new_generation(admin):
+    client, reloader, installed = admin
+    serving = server.model_host
+
+    response = client.post("/admin/reload", headers={"X-Admin-Token": TOKEN})
+
+    assert response.status_code == 200
+    assert response.json()["generation"] == 2
+    assert response.json()["last_reload"]["succeeded"] is True
+    assert server.model_host is reloader.current is installed[0]
+    assert server.model_host is not serving and server.model_host.number == 2
+    assert client.get("/admin/reload").json()["succeeded"] == 1
+
+
+def test_failed_load_keeps_the_serving_generation(admin):
+    client, reloader, installed = admin
+    serving = server.model_host
+
+    def fail(previous):
+        raise FileNotFoundError("./models/traffic_congestion/model.joblib")
+
+    reloader._build = fail
+    response = client.post("/admin/reload", headers={"X-Admin-Token": TOKEN})
+
+    assert response.status_code == 500
+    assert "model.joblib" in response.json()["detail"]
+    assert server.model_host is serving and reloader.current is serving
+    assert installed == []
+    status = client.get("/admin/reload").json()
+    assert status["generation"] == 1 and status["failed"] == 1
+    assert status["last_reload"]["succeeded"] is False
+
+
+def test_generation_is_installed_only_once_fully_built(installed):
+    installed, install = installed
+    serving = server.model_host
+    building, release = threading.Event(), threading.Event()
+
+    def build(previous):
+        building.set()
+        release.wait(5)
+        return Generation(previous.number + 1)
+
+    reloader = ModelReloader(serving, build, install, watch_directories=())
+    thread = threading.Thread(target=reloader.reload)
+    thread.start()
+    try:
+        assert building.wait(5)
+        # While the new generation loads, the old one keeps serving and other reloads are refused.
+        assert server.model_host is serving and installed == []
+        assert reloader.status()["reloading"] is True
+        with pytest.raises(ReloadInProgress):
+            reloader.reload()
+    finally:
+        release.set()
+        thread.join(5)
+
+    assert [host.number for host in installed] == [2]
+    assert server.model_host is installed[0]
+    assert reloader.status()["reloading"] is False
+
+
+def test_changed_files_are_reloaded_once_stable(tmp_path, installed):
+    installed, install = installed
+    model_file = tmp_path / "model.joblib"
+    model_file.write_bytes(b"v1")
+    reloader = ModelReloader(server.model_host, lambda previous: Generation(previous.number + 1), install,
+                             watch_directories=(str(tmp_path),))
+    reloader.watch(0.02)
+    try:
+        model_file.write_bytes(b"version 2")
+        deadline = time.monotonic() + 5
+        while not installed and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        reloader.stop()
+
+    assert [host.number for host in installed] == [2]
+    assert reloader.last_reload["reason"] == "files changed"
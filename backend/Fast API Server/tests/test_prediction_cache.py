@@ -0,0 +1,221 @@
+"""
+Tests for the two-level prediction cache against Redis.
+
+The Redis level runs against, in order of preference: the server at TEST_REDIS_URL
+(its database is flushed), a redis-server started on a free port, or an in-memory
+fakeredis server (see requirements-dev.txt). The tests are skipped only when none of
+them is available.
+"""
+
+import os
+import shutil
+import socket
+import subprocess
+import time
+
+import numpy as np
+import pytest
+
+from prediction_cache import PredictionCache
+
+redis = pytest.importorskip("redis")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for_redis(url: str, timeout_seconds: float = 5.0):
+    client = redis.Redis.from_url(url)
+    deadline = time.monotonic() + timeout_seconds
+    while True:
+        try:
+            client.ping()
+            return
+        except redis.ConnectionError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+
+
+@pytest.fixture(scope="module")
+def redis_server():
+    """
+    Function returning a new client of a Redis server shared by the module's tests.
+    """
+    url = os.getenv("TEST_REDIS_URL")
+    if url:
+        yield lambda: redis.Redis.from_url(url)
+        return
+
+    if shutil.which("redis-server"):
+        port = _free_port()
+        process = subprocess.Popen(
+            ["redis-server", "--port", str(port), "--save", "", "--appendonly", "no"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        url = f"redis://127.0.0.1:{port}/0"
+        try:
+            _wait_for_redis(url)
+            yield lambda: redis.Redis.from_url(url)
+        finally:
+            process.terminate()
+            process.wait()
+        return
+
+    try:
+        import fakeredis
+    except ImportError:
+        pytest.skip("No Redis to test against: set TEST_REDIS_URL, install redis-server, "
+                    "or pip install -r requirements-dev.txt (fakeredis).")
+    server = fakeredis.FakeServer()
+    yield lambda: fakeredis.FakeRedis(server=server)
+
+
+@pytest.fixture
+def connect(redis_server):
+    redis_server().flushdb()
+    return redis_server
+
+
+def unreachable_redis():
+    """
+    Client of a port nothing listens on, standing in for a Redis outage.
+    """
+    from redis.backoff import NoBackoff
+    from redis.retry import Retry
+
+    return redis.Redis(host="127.0.0.1", port=_free_port(), socket_connect_timeout=0.2, socket_timeout=0.2,
+                       retry=Retry(NoBackoff(), 0))
+
+
+def counting(redis_client):
+    """
+    Count the client's MGET calls and executed pipelines (as `mget_calls` / `pipelines_executed`).
+    """
+    redis_client.mget_calls = 0
+    redis_client.pipelines_executed = 0
+    mget, pipeline = redis_client.mget, redis_client.pipeline
+
+    def counted_mget(*args, **kwargs):
+        redis_client.mget_calls += 1
+        return mget(*args, **kwargs)
+
+    def counted_pipeline(*args, **kwargs):
+        new_pipeline = pipeline(*args, **kwargs)
+        execute = new_pipeline.execute
+
+        def counted_execute(*execute_args, **execute_kwargs):
+            redis_client.pipelines_executed += 1
+            return execute(*execute_args, **execute_kwargs)
+
+        new_pipeline.execute = counted_execute
+        return new_pipeline
+
+    redis_client.mget, redis_client.pipeline = counted_mget, counted_pipeline
+    return redis_client
+
+
+def cache(redis_client, max_size=1024):
+    return PredictionCache(max_size=max_size, ttl_seconds=60, redis_client=redis_client)
+
+
+def keys(version, n):
+    return PredictionCache.keys("traffic", version, np.arange(n), np.full(n, 8), np.full(n, 3), np.full(n, 14))
+
+
+def test_batch_is_stored_with_one_pipeline_and_read_with_one_mget(connect):
+    writer_client = counting(connect())
+    batch = keys("v1", 50)
+    cache(writer_client).set_many({key: [float(i)] for i, key in enumerate(batch)})
+    assert writer_client.pipelines_executed == 1
+
+    # A second worker: empty in-process cache, shared Redis.
+    reader_client = counting(connect())
+    reader = cache(reader_client)
+    found = reader.get_many(batch)
+    assert reader_client.mget_calls == 1
+    assert [float(found[key][0]) for key in batch] == list(range(50))
+    assert reader.redis_stats.hits == 50
+
+    # Now served from the reader's in-process cache without touching Redis.
+    reader.get_many(batch)
+    assert reader_client.mget_calls == 1
+
+
+def test_lookup_computes_only_missing_rows_in_row_order(connect):
+    batch = keys("v1", 6)
+    cache(connect()).set_many({batch[1]: [10.0], batch[4]: [40.0]})
+
+    computed = []
+
+    def compute(rows):
+        computed.append(rows.tolist())
+        return rows * 100.0
+
+    rows = [batch[0], batch[1], batch[4], batch[0], batch[5]]
+    result = cache(connect()).lookup(rows, compute)
+    # Rows 0 and 4 of `rows` are new keys (row 3 repeats row 0's key).
+    assert computed == [[0, 4]]
+    assert result.tolist() == [0.0, 10.0, 40.0, 0.0, 400.0]
+
+
+def test_multi_output_rows_round_trip_through_redis(connect):
+    batch = keys("v1", 3)
+    values = np.arange(12, dtype=float).reshape(3, 4)
+    cache(connect()).lookup(batch, lambda rows: values[rows], multi_output=True)
+
+    result = cache(connect()).lookup(
+        batch, lambda rows: pytest.fail("should be served from Redis"), multi_output=True
+    )
+    np.testing.assert_array_equal(result, values)
+
+
+def test_model_versions_use_separate_keys(connect):
+    cache(connect()).set_many({key: [1.0] for key in keys("v1", 5)})
+
+    assert cache(connect()).get_many(keys("v2", 5)) == {}
+    assert len(cache(connect()).get_many(keys("v1", 5))) == 5
+
+
+def test_entries_expire_in_redis(connect):
+    redis_client = connect()
+    cache(redis_client).set_many({key: [1.0] for key in keys("v1", 3)})
+    assert all(0 < redis_client.ttl(key) <= 60 for key in keys("v1", 3))
+
+
+def test_falls_back_to_in_process_cache_when_redis_is_down(connect):
+    prediction_cache = cache(connect())
+    batch = keys("v1", 4)
+    prediction_cache.set_many({key: [float(i)] for i, key in enumerate(batch)})
+
+    prediction_cache.redis = unreachable_redis()
+    found = prediction_cache.get_many(batch)
+    assert [float(found[key][0]) for key in batch] == [0.0, 1.0, 2.0, 3.0]
+
+    # Misses are computed and still cached in-process; the failure is counted once and
+    # Redis is skipped until the retry time.
+    new_keys = keys("v2", 4)
+    result = prediction_cache.lookup(new_keys, lambda rows: rows + 0.5)
+    assert result.tolist() == [0.5, 1.5, 2.5, 3.5]
+    assert prediction_cache.redis_stats.errors == 1
+    assert len(prediction_cache.get_many(new_keys)) == 4
+    assert prediction_cache.redis_stats.errors == 1
+
+
+def test_redis_is_retried_after_an_outage(connect, monkeypatch):
+    import prediction_cache as module
+
+    monkeypatch.setattr(module, "REDIS_RETRY_SECONDS", 0.0)
+    redis_client = connect()
+    prediction_cache = cache(unreachable_redis())
+
+    prediction_cache.set_many({key: [1.0] for key in keys("v1", 2)})
+    assert prediction_cache.redis_stats.errors == 1
+
+    prediction_cache.redis = redis_client
+    prediction_cache.set_many({key: [2.0] for key in keys("v1", 2)})
+    found = cache(connect()).get_many(keys("v1", 2))
+    assert [float(value[0]) for value in found.values()] == [2.0, 2.0]
@@ -0,0 +1,107 @@
+"""
+Tests for the trash pickup route re-ordering: the plan keeps the first stop and every
+stop, and is never more expensive than the published order.
+"""
+
+import itertools
+import time
+
+import numpy as np
+import pytest
+
+from route_optimizer import (cost_matrix, distance_matrix, nearest_neighbour_order, or_opt, path_cost, plan_route,
+                             two_opt)
+
+
+def random_route(seed: int, n: int):
+    rng = np.random.default_rng(seed)
+    return (rng.uniform(53.30, 53.40, n), rng.uniform(-6.35, -6.20, n),
+            rng.uniform(0.0, 3.0, n), rng.integers(1, 6, n))
+
+
+def assert_valid_plan(plan, route):
+    latitudes, longitudes, congestion, aqi = route
+    n = len(latitudes)
+    cost = cost_matrix(distance_matrix(latitudes, longitudes), congestion, aqi)
+
+    assert plan.order[0] == 0
+    assert sorted(plan.order.tolist()) == list(range(n))
+    assert plan.cost <= plan.original_cost + 1e-9
+    assert plan.cost == pytest.approx(path_cost(cost, plan.order))
+    assert plan.original_cost == pytest.approx(path_cost(cost, np.arange(n)))
+    assert plan.distance_km == pytest.approx(path_cost(distance_matrix(latitudes, longitudes), plan.order))
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_random_routes_are_never_worse_than_published(seed):
+    route = random_route(seed, 3 + seed % 25)
+
+    assert_valid_plan(plan_route(*route), route)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_an_expired_time_budget_still_returns_a_valid_plan(seed):
+    route = random_route(seed, 30)
+
+    assert_valid_plan(plan_route(*route, time_budget_seconds=0.0), route)
+
+
+@pytest.mark.parametrize("n", [0, 1, 2])
+def test_short_routes_keep_their_order(n):
+    route = random_route(0, n)
+
+    plan = plan_route(*route)
+
+    assert plan.order.tolist() == list(range(n))
+    assert plan.cost == plan.original_cost
+
+
+def test_stops_on_a_street_are_visited_in_street_order():
+    # Stop 0 is the western end; the others are further east in scrambled order.
+    longitudes = np.array([-6.30, -6.22, -6.28, -6.20, -6.26, -6.24, -6.29])
+    latitudes = np.full(len(longitudes), 53.35)
+    flat = np.zeros(len(longitudes))
+
+    plan = plan_route(latitudes, longitudes, flat, np.ones(len(longitudes)), time_budget_seconds=1.0)
+
+    assert plan.order.tolist() == np.argsort(longitudes).tolist()
+    assert plan.distance_km < plan.original_distance_km
+
+
+def test_congested_stops_are_kept_off_long_legs():
+    # A square: 0 -> 1 -> 2 -> 3 and 0 -> 3 -> 2 -> 1 have the same length, but stop 1 is congested.
+    latitudes = np.array([53.35, 53.35, 53.36, 53.36])
+    longitudes = np.array([-6.30, -6.28, -6.28, -6.30])
+    congestion = np.array([0.0, 5.0, 0.0, 0.0])
+
+    plan = plan_route(latitudes, longitudes, congestion, np.ones(4), time_budget_seconds=1.0)
+
+    assert plan.order[-1] == 1
+    assert plan.cost < plan.original_cost
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_small_routes_lie_between_the_optimum_and_the_published_order(seed):
+    route = random_route(seed, 7)
+    cost = cost_matrix(distance_matrix(route[0], route[1]), route[2], route[3])
+
+    plan = plan_route(*route, time_budget_seconds=1.0)
+
+    best = min(path_cost(cost, (0,) + rest) for rest in itertools.permutations(range(1, 7)))
+    assert best - 1e-9 <= plan.cost <= plan.original_cost + 1e-9
+    assert plan.cost <= path_cost(cost, nearest_neighbour_order(cost)) + 1e-9
+
+
+@pytest.mark.parametrize("move", [two_opt, or_opt])
+@pytest.mark.parametrize("seed", range(10))
+def test_moves_keep_the_start_and_every_stop_and_never_worsen(move, seed):
+    route = random_route(seed, 12)
+    cost = cost_matrix(distance_matrix(route[0], route[1]), route[2], route[3])
+    start = np.random.default_rng(seed).permutation(np.arange(1, 12))
+    order = np.concatenate([[0], start])
+
+    improved = move(cost, order, time.perf_counter() + 1.0)
+
+    assert improved[0] == 0
+    assert sorted(improved.tolist()) == list(range(12))
+    assert path_cost(cost, improved) <= path_cost(cost, order) + 1e-9
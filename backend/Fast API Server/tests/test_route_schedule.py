@@ -0,0 +1,43 @@
+"""
+Tests for the start offset scan of a route schedule and the validation of its window
+at /recommend/trashpickup/schedule.
+"""
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+from route_schedule import MAX_WINDOW_MINUTES, start_offsets
+
+
+def test_start_offsets_are_symmetric_and_include_zero():
+    assert start_offsets(120, 15).tolist() == list(range(-120, 121, 15))
+    assert start_offsets(50, 20).tolist() == [-40, -20, 0, 20, 40]
+
+
+def test_zero_window_is_the_scheduled_start_only():
+    np.testing.assert_array_equal(start_offsets(0, 15), [0])
+
+
+@pytest.mark.parametrize("window_minutes,step_minutes", [
+    (-15, 15),
+    (MAX_WINDOW_MINUTES + 1, 15),
+    (120, 0),
+    (120, -15),
+])
+def test_invalid_window_raises(window_minutes, step_minutes):
+    with pytest.raises(ValueError):
+        start_offsets(window_minutes, step_minutes)
+
+
+@pytest.mark.parametrize("window_minutes,step_minutes", [(-15, 15), (120, 0)])
+def test_invalid_window_is_a_bad_request(window_minutes, step_minutes):
+    client = TestClient(server.app)
+
+    response = client.post("/recommend/trashpickup/schedule", json={
+        "route_id": "1", "window_minutes": window_minutes, "step_minutes": step_minutes
+    })
+
+    assert response.status_code == 400
+    assert "window_minutes" in response.json()["detail"]
@@ -0,0 +1,83 @@
+"""
+Tests for SpatialIndex against brute-force scans: nearest sites by geodesic distance (as
+the original per-row geopy scan picked them) and k-nearest by haversine distance.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from geopy.distance import geodesic
+
+from spatial_index import EARTH_RADIUS_KM, SpatialIndex
+
+# Roughly the island of Ireland.
+LAT_RANGE = (51.4, 55.4)
+LON_RANGE = (-10.5, -5.5)
+
+
+def geodesic_nearest(lat: float, lon: float, sites: pd.DataFrame) -> int:
+    """
+    First site with the smallest geodesic distance, scanning the table in order.
+    """
+    best, min_distance = 0, float("inf")
+    for position, (site_lat, site_lon) in enumerate(zip(sites["Lat"], sites["Long"])):
+        distance = geodesic((lat, lon), (site_lat, site_lon)).kilometers
+        if distance < min_distance:
+            best, min_distance = position, distance
+    return best
+
+
+@pytest.fixture(scope="module")
+def sites():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({"Lat": rng.uniform(*LAT_RANGE, 80), "Long": rng.uniform(*LON_RANGE, 80)})
+
+
+def test_nearest_matches_a_brute_force_geodesic_scan(sites):
+    rng = np.random.default_rng(1)
+    # Half uniform points, half points close to the midpoint of two sites, where the
+    # haversine and geodesic rankings can disagree.
+    lats, lons = list(rng.uniform(*LAT_RANGE, 150)), list(rng.uniform(*LON_RANGE, 150))
+    for _ in range(150):
+        first, second = sites.iloc[rng.choice(len(sites), 2, replace=False)].to_numpy()
+        lat, lon = (first + second) / 2 + rng.normal(0, 1e-3, 2)
+        lats.append(lat)
+        lons.append(lon)
+
+    nearest = SpatialIndex(sites, chunk_size=64).nearest_many(lats, lons)
+
+    expected = [geodesic_nearest(lat, lon, sites) for lat, lon in zip(lats, lons)]
+    mismatches = [(lat, lon) for lat, lon, got, want in zip(lats, lons, nearest, expected) if got != want]
+    assert not mismatches
+
+
+def test_repeated_points_get_the_same_site(sites):
+    index = SpatialIndex(sites)
+    lats, lons = [53.35, 52.66, 53.35], [-6.26, -8.63, -6.26]
+
+    nearest = index.nearest_many(lats, lons)
+
+    assert nearest[0] == nearest[2] == index.nearest_many([53.35], [-6.26])[0]
+    assert index.nearest(52.66, -8.63) == index.site(nearest[1])
+
+
+def test_equidistant_sites_resolve_to_the_first_in_table_order():
+    sites = pd.DataFrame({"Lat": [53.0, 53.5, 53.0], "Long": [-7.0, -6.0, -7.0]})
+
+    assert SpatialIndex(sites).nearest_many([53.01], [-7.0]).tolist() == [0]
+
+
+@pytest.mark.parametrize("k", [1, 3, 80, 200])
+def test_query_matches_a_brute_force_haversine_sort(sites, k):
+    rng = np.random.default_rng(2)
+    lats, lons = rng.uniform(*LAT_RANGE, 100), rng.uniform(*LON_RANGE, 100)
+
+    indices, distances = SpatialIndex(sites, chunk_size=32).query(lats, lons, k=k)
+
+    site_lat, site_lon = np.radians(sites["Lat"].to_numpy()), np.radians(sites["Long"].to_numpy())
+    lat, lon = np.radians(lats)[:, None], np.radians(lons)[:, None]
+    a = np.sin((site_lat - lat) / 2) ** 2 + np.cos(lat) * np.cos(site_lat) * np.sin((site_lon - lon) / 2) ** 2
+    brute = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+    expected = np.argsort(brute, axis=1, kind="stable")[:, :min(k, len(sites))]
+    np.testing.assert_array_equal(indices, expected)
+    np.testing.assert_allclose(distances, np.take_along_axis(brute, expected, axis=1))
@@ -0,0 +1,113 @@
+"""
+Tests for streamed responses: NDJSON and SSE framing, and how failures before and after
+the first event reach the client.
+"""
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import numpy as np
+import pytest
+from fastapi import FastAPI, Header
+from fastapi.testclient import TestClient
+
+import server
+from executors import EndpointLimiter
+from streaming import NDJSON_MEDIA_TYPE, SSE_MEDIA_TYPE, stream_events
+
+EVENTS = [
+    ("route", {"route_id": "7", "stops": 2}),
+    # NumPy scalars, as the AQI and congestion lookups return them.
+    ("stop", {"index": 0, "aqi": np.int64(3), "tc": np.float32(0.5)}),
+    ("token", "Pick up "),
+    ("done", {"recommendation": "Pick up early."}),
+]
+DECODED = json.loads(json.dumps(EVENTS, default=lambda value: value.item()))
+
+
+def recommendation_events(fail_at: int = None):
+    for position, event in enumerate(EVENTS):
+        if position == fail_at:
+            raise ValueError("upstream failed")
+        yield event
+
+
+@pytest.fixture
+def client():
+    pool = ThreadPoolExecutor(max_workers=2)
+    limiter = EndpointLimiter("stream", pool, max_concurrency=2)
+    app = FastAPI()
+
+    @app.get("/stream")
+    async def stream(fail_at: Optional[int] = None, accept: Optional[str] = Header(None)):
+        return await stream_events(limiter.stream(recommendation_events, fail_at), accept)
+
+    yield TestClient(app), limiter
+    pool.shutdown(wait=False)
+
+
+def parse_sse(text: str) -> list:
+    messages = []
+    for block in text.split("\n\n")[:-1]:
+        event, data = block.split("\n")
+        assert event.startswith("event: ") and data.startswith("data: ")
+        messages.append([event[len("event: "):], json.loads(data[len("data: "):])])
+    return messages
+
+
+def test_ndjson_is_one_event_object_per_line(client):
+    client, limiter = client
+
+    response = client.get("/stream")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith(NDJSON_MEDIA_TYPE)
+    assert response.headers["cache-control"] == "no-cache"
+    assert response.text.endswith("\n")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines == [{"event": event, "data": data} for event, data in DECODED]
+    assert limiter.stats()["in_flight"] == 0
+
+
+def test_sse_is_selected_by_the_accept_header(client):
+    client, _ = client
+
+    response = client.get("/stream", headers={"Accept": f"{SSE_MEDIA_TYPE}, */*"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith(SSE_MEDIA_TYPE)
+    assert parse_sse(response.text) == DECODED
+
+
+def test_error_before_the_first_event_is_an_http_error(client):
+    client, limiter = client
+
+    response = client.get("/stream?fail_at=0")
+
+    assert response.status_code == 500
+    assert response.json() == {"detail": "upstream failed"}
+    assert limiter.stats()["in_flight"] == 0
+
+
+@pytest.mark.parametrize("sse", [False, True])
+def test_error_after_the_first_event_ends_the_stream_with_an_error_event(client, sse):
+    client, limiter = client
+
+    response = client.get("/stream?fail_at=2", headers={"Accept": SSE_MEDIA_TYPE} if sse else {})
+
+    assert response.status_code == 200
+    if sse:
+        events = parse_sse(response.text)
+    else:
+        events = [[line["event"], line["data"]] for line in map(json.loads, response.text.splitlines())]
+    assert events == DECODED[:2] + [["error", {"detail": "upstream failed"}]]
+    assert limiter.stats()["in_flight"] == 0
+    assert limiter.stats()["failed"] == 1
+
+
+def test_unknown_route_fails_before_the_stream_starts():
+    response = TestClient(server.app).post("/predict/AQI_TC/stream", json={"route_id": "no such route"})
+
+    assert response.status_code == 500
+    assert "no such route" in response.json()["detail"]
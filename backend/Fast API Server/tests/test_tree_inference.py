@@ -0,0 +1,80 @@
+"""
+Parity of the native tree inference engine with the sklearn wrappers' `predict`.
+"""
+
+import numpy as np
+import pytest
+
+from tree_inference import NativeTreeModel, compile_model, inference_model
+
+lightgbm = pytest.importorskip("lightgbm")
+multioutput = pytest.importorskip("sklearn.multioutput")
+
+TOLERANCE = 1e-9
+
+
+def encoded_rows(n_rows: int, n_features: int = 12, seed: int = 0) -> np.ndarray:
+    """
+    Random rows shaped like preprocessor output: one-hot blocks next to scaled numeric columns.
+    """
+    rng = np.random.default_rng(seed)
+    one_hot = np.eye(4)[rng.integers(0, 4, n_rows)]
+    numeric = rng.normal(size=(n_rows, n_features - 4))
+    return np.hstack([one_hot, numeric])
+
+
+def targets(X: np.ndarray, n_targets: int, seed: int = 1) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    base = X @ rng.normal(size=X.shape[1]) + np.sin(X[:, -1] * 3)
+    return base[:, None] * np.arange(1, n_targets + 1) + rng.normal(0, 0.1, (len(X), n_targets))
+
+
+@pytest.fixture(scope="module")
+def regressor():
+    X = encoded_rows(2000)
+    return lightgbm.LGBMRegressor(n_estimators=60, num_leaves=15, verbose=-1).fit(X, targets(X, 1)[:, 0])
+
+
+@pytest.fixture(scope="module")
+def multi_output_regressor():
+    X = encoded_rows(2000)
+    return multioutput.MultiOutputRegressor(
+        lightgbm.LGBMRegressor(n_estimators=60, num_leaves=15, verbose=-1)
+    ).fit(X, targets(X, 4))
+
+
+@pytest.mark.parametrize("n_rows", [1, 7, 500])
+def test_lightgbm_regressor_matches_predict(regressor, n_rows):
+    compiled = compile_model(regressor)
+    assert isinstance(compiled, NativeTreeModel)
+
+    X = encoded_rows(n_rows, seed=n_rows)
+    np.testing.assert_allclose(compiled.predict(X), regressor.predict(X), rtol=0, atol=TOLERANCE)
+
+
+@pytest.mark.parametrize("n_rows", [1, 7, 500])
+def test_multi_output_regressor_matches_predict(multi_output_regressor, n_rows):
+    compiled = compile_model(multi_output_regressor)
+    assert isinstance(compiled, NativeTreeModel)
+
+    X = encoded_rows(n_rows, seed=n_rows)
+    predictions = compiled.predict(X)
+    assert predictions.shape == (n_rows, 4)
+    np.testing.assert_allclose(predictions, multi_output_regressor.predict(X), rtol=0, atol=TOLERANCE)
+
+
+def test_non_contiguous_float32_input_matches_predict(regressor):
+    X = np.asfortranarray(encoded_rows(100, seed=3).astype(np.float32))
+    np.testing.assert_allclose(compile_model(regressor).predict(X), regressor.predict(X), rtol=0, atol=TOLERANCE)
+
+
+def test_unsupported_models_keep_their_own_predict():
+    linear_model = pytest.importorskip("sklearn.linear_model")
+    X = encoded_rows(50)
+    model = linear_model.LinearRegression().fit(X, targets(X, 1)[:, 0])
+
+    assert compile_model(model) is None
+    assert inference_model(model, "native") is model
+    assert inference_model(model, "sklearn") is model
+    with pytest.raises(ValueError):
+        inference_model(model, "onnx")
@@ -0,0 +1,108 @@
+"""
+Tests for the forecast time axis: hourly ranges, time zones and DST (wall-clock times,
+offsets dropped) and month rollovers of the (hour, month, day) model inputs.
+"""
+
+import datetime
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pytest
+
+from route_schedule import time_features
+from weather_forecast import DEFAULT_HORIZON_HOURS, columnar, forecast_times
+
+DUBLIN = ZoneInfo("Europe/Dublin")
+
+
+def iso(times: np.ndarray) -> list:
+    return np.datetime_as_string(times).tolist()
+
+
+@pytest.mark.parametrize("kwargs,expected", [
+    ({"hours": 3}, ["2024-06-01T10", "2024-06-01T11", "2024-06-01T12"]),
+    ({"end": datetime.datetime(2024, 6, 1, 12, 59)}, ["2024-06-01T10", "2024-06-01T11", "2024-06-01T12"]),
+    ({"end": datetime.datetime(2024, 6, 1, 10)}, ["2024-06-01T10"]),
+    ({"hours": 7, "step_hours": 3}, ["2024-06-01T10", "2024-06-01T13", "2024-06-01T16"]),
+    ({"hours": 1}, ["2024-06-01T10"]),
+])
+def test_hourly_range_from_the_truncated_start(kwargs, expected):
+    times = forecast_times(datetime.datetime(2024, 6, 1, 10, 45, 30), **kwargs)
+
+    assert times.dtype == np.dtype("datetime64[h]")
+    assert iso(times) == expected
+
+
+def test_default_horizon_starts_at_the_current_hour():
+    before = np.datetime64(datetime.datetime.now(), "h")
+    times = forecast_times()
+    after = np.datetime64(datetime.datetime.now(), "h")
+
+    assert len(times) == DEFAULT_HORIZON_HOURS
+    assert before <= times[0] <= after
+    assert (np.diff(times) == np.timedelta64(1, "h")).all()
+
+
+@pytest.mark.parametrize("start", [
+    datetime.datetime(2024, 6, 1, 10, 30, tzinfo=datetime.timezone(datetime.timedelta(hours=5))),
+    datetime.datetime(2024, 6, 1, 10, 30, tzinfo=datetime.timezone.utc),
+    datetime.datetime(2024, 6, 1, 10, 30, tzinfo=DUBLIN),
+])
+def test_utc_offsets_are_dropped_not_converted(start):
+    assert iso(forecast_times(start, hours=2)) == ["2024-06-01T10", "2024-06-01T11"]
+
+
+@pytest.mark.parametrize("start,end", [
+    # Clocks go forward (01:00 -> 02:00) and back (02:00 -> 01:00) in Dublin.
+    (datetime.datetime(2024, 3, 31, 0, tzinfo=DUBLIN), datetime.datetime(2024, 3, 31, 3, tzinfo=DUBLIN)),
+    (datetime.datetime(2024, 10, 27, 0, tzinfo=DUBLIN), datetime.datetime(2024, 10, 27, 3, tzinfo=DUBLIN)),
+])
+def test_dst_changes_keep_one_entry_per_wall_clock_hour(start, end):
+    times = forecast_times(start, end=end)
+
+    assert [hour.item().hour for hour in times] == [0, 1, 2, 3]
+    assert iso(times) == iso(forecast_times(start.replace(tzinfo=None), hours=4))
+
+
+@pytest.mark.parametrize("year,dates", [
+    (2023, [(2, 28), (2, 28), (3, 1), (3, 1)]),
+    (2024, [(2, 28), (2, 28), (2, 29), (2, 29)]),
+])
+def test_end_of_february_rolls_over_by_the_calendar(year, dates):
+    times = forecast_times(datetime.datetime(year, 2, 28, 22), hours=4)
+
+    hours, months, days = time_features(times.astype("datetime64[m]"))
+
+    assert hours.tolist() == [22, 23, 0, 1]
+    assert list(zip(months.tolist(), days.tolist())) == dates
+
+
+def test_year_end_rolls_over_to_january():
+    times = forecast_times(datetime.datetime(2024, 12, 31, 23), hours=2)
+
+    hours, months, days = time_features(times.astype("datetime64[m]"))
+
+    assert (hours.tolist(), months.tolist(), days.tolist()) == ([23, 0], [12, 1], [31, 1])
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"hours": 3, "end": datetime.datetime(2024, 6, 2)},
+    {"hours": 0},
+    {"hours": -1},
+    {"step_hours": 0},
+    {"end": datetime.datetime(2024, 6, 1, 9)},
+    {"hours": 169, "max_hours": 168},
+])
+def test_invalid_ranges_are_rejected(kwargs):
+    with pytest.raises(ValueError):
+        forecast_times(datetime.datetime(2024, 6, 1, 10), **kwargs)
+
+
+def test_columnar_output_has_iso_times_and_one_column_per_variable():
+    times = forecast_times(datetime.datetime(2024, 2, 29, 23), hours=2)
+    predictions = np.arange(8, dtype=np.float32).reshape(2, 4)
+
+    assert columnar(times, predictions) == {
+        "time": ["2024-02-29T23:00", "2024-03-01T00:00"],
+        "temperature": [0.0, 4.0], "humidity": [1.0, 5.0], "wind_speed": [2.0, 6.0], "pressure": [3.0, 7.0],
+    }
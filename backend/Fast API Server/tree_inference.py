@@ -0,0 +1,159 @@
+"""
+Native inference for the boosted tree models.
+
+The models in ./models/*/model.joblib are sklearn wrappers (LGBMRegressor, XGBRegressor,
+or a MultiOutputRegressor of them). Their `predict` validates and converts its input
+on every call, which costs far more than evaluating the trees for a single row. The
+"native" engine calls the underlying boosters directly on a contiguous array: LightGBM
+`Booster.predict` on float64 (its split thresholds are doubles) and XGBoost
+`Booster.inplace_predict` on float32 (XGBoost evaluates in float32), so the results
+match the wrappers exactly. Models of other types keep using their own `predict`.
+
+The engine is selected with INFERENCE_ENGINE ("native" or "sklearn"). Check parity
+against the sklearn path with:
+    python tree_inference.py check
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+
+ENGINES = ("native", "sklearn")
+
+
+def _dense(X, dtype):
+    # Sparse matrices are accepted by both boosters as they are.
+    return X if hasattr(X, "tocsr") else np.ascontiguousarray(X, dtype=dtype)
+
+
+def booster_predictor(estimator):
+    """
+    Function predicting with the booster of a fitted LightGBM or XGBoost regressor, or None.
+    """
+    if type(estimator).__module__.startswith("lightgbm") and hasattr(estimator, "booster_"):
+        booster = estimator.booster_
+        return lambda X: booster.predict(_dense(X, np.float64))
+    if type(estimator).__module__.startswith("xgboost") and hasattr(estimator, "get_booster"):
+        booster = estimator.get_booster()
+        # Like XGBModel.predict: only the trees up to the best iteration when early stopping was used.
+        best_iteration = getattr(estimator, "best_iteration", None)
+        iteration_range = (0, best_iteration + 1) if best_iteration is not None else (0, 0)
+        return lambda X: booster.inplace_predict(_dense(X, np.float32), iteration_range=iteration_range)
+    return None
+
+
+class NativeTreeModel:
+    """
+    Predicts with the boosters of a fitted tree model, bypassing the sklearn wrappers.
+    """
+
+    def __init__(self, predictors: list, multi_output: bool):
+        self.predictors = predictors
+        self.multi_output = multi_output
+
+    def predict(self, X) -> np.ndarray:
+        if not self.multi_output:
+            return np.asarray(self.predictors[0](X), dtype=np.float64)
+        return np.column_stack([predictor(X) for predictor in self.predictors]).astype(np.float64)
+
+
+def compile_model(model):
+    """
+    Native predictor for a LightGBM/XGBoost regressor or a MultiOutputRegressor of them.
+
+    Returns:
+        NativeTreeModel | None: None if the model (or one of its estimators) is not supported.
+    """
+    estimators = getattr(model, "estimators_", None)
+    if type(model).__name__ == "MultiOutputRegressor" and estimators:
+        predictors = [booster_predictor(estimator) for estimator in estimators]
+        if None in predictors:
+            return None
+        return NativeTreeModel(predictors, multi_output=True)
+
+    predictor = booster_predictor(model)
+    return None if predictor is None else NativeTreeModel([predictor], multi_output=False)
+
+
+def inference_model(model, engine: str):
+    """
+    The object whose `predict` serves the model under the given engine.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown inference engine {engine}; expected one of {', '.join(ENGINES)}.")
+    if engine == "native":
+        compiled = compile_model(model)
+        if compiled is not None:
+            return compiled
+    return model
+
+
+def check_parity(model_host, n_points: int = 2000, seed: int = 0, tolerance: float = 1e-9) -> bool:
+    """
+    Compare predict_traffic_congestion / predict_weather (and their batch variants) under
+    the native engine with the sklearn models, over random points and times.
+
+    Returns:
+        bool: True if every difference is within `tolerance`.
+    """
+    rng = np.random.default_rng(seed)
+    ok = True
+    for name, model_attribute, predictor_attribute, location_index, single, batch in (
+        ("traffic", "traffic_congestion_model", "traffic_congestion_predictor", model_host.traffic_location_index,
+         model_host.predict_traffic_congestion, model_host.predict_traffic_congestion_batch_live),
+        ("weather", "weather_prediction_model", "weather_prediction_predictor", model_host.weather_location_index,
+         model_host.predict_weather, model_host.predict_weather_batch),
+    ):
+        model = getattr(model_host, model_attribute)
+        compiled = compile_model(model)
+        if compiled is None:
+            print(f"{name}: {type(model).__name__} is not supported by the native engine (sklearn is used).")
+            continue
+
+        # Points near random sites at random times.
+        sites = rng.integers(0, len(location_index), n_points)
+        points = [
+            {"latitude": float(lat), "longitude": float(lon), "hour": int(hour), "month": int(month), "day": int(day)}
+            for lat, lon, hour, month, day in zip(
+                location_index.lats[sites] + rng.normal(0, 0.01, n_points),
+                location_index.longs[sites] + rng.normal(0, 0.01, n_points),
+                rng.integers(0, 24, n_points), rng.integers(1, 13, n_points), rng.integers(1, 29, n_points),
+            )
+        ]
+
+        # The forecast cube and the prediction cache would answer without the model.
+        cube, model_host.traffic_forecast_cube = model_host.traffic_forecast_cube, None
+        prediction_cache, model_host.prediction_cache = model_host.prediction_cache, None
+        results = {}
+        try:
+            for engine, predictor in (("sklearn", model), ("native", compiled)):
+                setattr(model_host, predictor_attribute, predictor)
+                results[engine] = (
+                    np.concatenate([np.ravel(single(point)) for point in points[:200]]),
+                    np.ravel(batch(points)),
+                )
+        finally:
+            model_host.traffic_forecast_cube = cube
+            model_host.prediction_cache = prediction_cache
+            setattr(model_host, predictor_attribute, inference_model(model, model_host.inference_engine))
+
+        for label, index in (("single", 0), ("batch", 1)):
+            difference = float(np.max(np.abs(results["native"][index] - results["sklearn"][index])))
+            print(f"{name} {label}: max abs difference {difference:.3g} over {results['native'][index].size} values")
+            ok &= difference <= tolerance
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Native tree model inference.")
+    parser.add_argument("command", choices=["check"])
+    parser.add_argument("--points", type=int, default=2000)
+    parser.add_argument("--tolerance", type=float, default=1e-9)
+    args = parser.parse_args()
+
+    os.environ["SERVER_LAZY_LOAD"] = "false"
+    from server import model_host
+
+    sys.exit(0 if check_parity(model_host, args.points, tolerance=args.tolerance) else 1)
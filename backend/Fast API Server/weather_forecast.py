@@ -0,0 +1,65 @@
+"""
+Multi-hour weather forecasts at one location.
+
+A forecast is the weather model's prediction at one site for a range of hours, e.g. the
+next 24 or 72 hours for a chart. The time axis is built as one datetime64 array and
+turned into (hour, month, day) model inputs together (see route_schedule.time_features),
+so the whole range is a single batch prediction.
+
+Times are wall-clock times at hour resolution, like the hour, day and month inputs of
+/predict/weatherPred; a UTC offset in a requested time is dropped, not converted.
+"""
+
+import datetime
+
+import numpy as np
+
+# Output columns of the weather model, in order.
+WEATHER_VARIABLES = ("temperature", "humidity", "wind_speed", "pressure")
+
+DEFAULT_HORIZON_HOURS = 24
+
+
+def forecast_times(start: datetime.datetime = None, hours: int = None, end: datetime.datetime = None,
+                   step_hours: int = 1, max_hours: int = None) -> np.ndarray:
+    """
+    Hourly timestamps of a forecast.
+
+    Args:
+        start (datetime): First hour (truncated to the hour); the current hour if None.
+        hours (int): Horizon in hours (DEFAULT_HORIZON_HOURS if neither it nor `end` is given).
+        end (datetime): Last hour (inclusive), instead of `hours`.
+        step_hours (int): Hours between forecast times.
+        max_hours (int): Longest allowed horizon.
+
+    Returns:
+        np.ndarray: datetime64[h] timestamps from start, `step_hours` apart.
+    """
+    if hours is not None and end is not None:
+        raise ValueError("Give either hours or end, not both.")
+    if step_hours <= 0:
+        raise ValueError("step_hours must be positive.")
+
+    start = np.datetime64((start or datetime.datetime.now()).replace(tzinfo=None), "h")
+    if end is not None:
+        span = int((np.datetime64(end.replace(tzinfo=None), "h") - start).astype(int)) + 1
+        if span <= 0:
+            raise ValueError("end must not be before start.")
+    else:
+        span = DEFAULT_HORIZON_HOURS if hours is None else hours
+        if span <= 0:
+            raise ValueError("hours must be positive.")
+    if max_hours is not None and span > max_hours:
+        raise ValueError(f"The forecast may cover at most {max_hours} hours.")
+
+    return start + np.arange(0, span, step_hours).astype("timedelta64[h]")
+
+
+def columnar(times: np.ndarray, predictions: np.ndarray) -> dict:
+    """
+    Forecast as columns: "time" (ISO 8601) and one array per weather variable.
+    """
+    columns = {"time": np.datetime_as_string(times.astype("datetime64[m]")).tolist()}
+    for column, variable in enumerate(WEATHER_VARIABLES):
+        columns[variable] = predictions[:, column].astype(float).tolist()
+    return columns